@@ -0,0 +1,159 @@
+import contextvars
+import threading
+from collections import Counter
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Ticket
+from .occupancy import lock_journeys, save_seat_maps
+
+DEFAULTS = {
+    "ENABLED": False,
+    # while a batch on the same journeys is running, the next leader
+    # waits this long (seconds) for concurrent orders to join its batch,
+    # batches are closed early past MAX_BATCH orders
+    "MAX_WAIT": 0.005,
+    "MAX_BATCH": 50,
+}
+
+
+def booking_settings() -> dict:
+    return {
+        **DEFAULTS,
+        **getattr(settings, "STATION_APP_BOOKING_COORDINATOR", {}),
+    }
+
+
+class Booking:
+    def __init__(self, apply: Callable):
+        self.apply = apply
+        # apply runs on the leader's thread, but sees the context
+        # variables of the request that booked it
+        self.context = contextvars.copy_context()
+        self.result = None
+        self.error = None
+        self.retry = False
+        self.done = threading.Event()
+
+
+class Batch:
+    def __init__(self, journey_ids: tuple[int, ...]):
+        self.journey_ids = journey_ids
+        self.bookings = []
+        self.full = threading.Event()
+
+
+class BookingCoordinator:
+    """Group commit of concurrent orders on the same journeys.
+
+    The first order to arrive for a set of journeys leads a batch. An
+    order alone runs at once; while a batch on the same journeys is
+    running, the leader waits up to MAX_WAIT for others to join. Every
+    booking of the batch then runs in one transaction, on the leader's
+    thread and connection, with the journeys locked once and each
+    booking in its own savepoint. Seats are taken in the locked seat
+    maps in arrival order, so conflicting orders fail validation in
+    memory instead of on the unique index, and all tickets are written
+    with a single insert. Followers block until the leader reports
+    their result.
+
+    Batches are per process; across processes the journey row locks
+    still serialize them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._batches: dict[tuple[int, ...], Batch] = {}
+        self._running = Counter()
+
+    def book(
+        self,
+        journey_ids: Iterable[int],
+        apply: Callable,
+        fallback: Callable,
+    ):
+        """Return apply(journeys) run in a shared transaction.
+
+        apply takes seats in the locked journeys' seat maps and returns
+        (result, tickets to insert); an error it raises is the
+        booking's own and leaves the rest of the batch unaffected. When
+        the batch as a whole fails, fallback() books the order on its
+        own instead.
+        """
+        options = booking_settings()
+        key = tuple(sorted(set(journey_ids)))
+        booking = Booking(apply)
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._batches[key] = Batch(key)
+            batch.bookings.append(booking)
+            if len(batch.bookings) >= options["MAX_BATCH"]:
+                del self._batches[key]
+                batch.full.set()
+
+        if leader:
+            with self._lock:
+                busy = self._running[key] > 0
+            if busy:
+                batch.full.wait(options["MAX_WAIT"])
+            with self._lock:
+                if self._batches.get(key) is batch:
+                    del self._batches[key]
+                self._running[key] += 1
+            try:
+                self.run(batch)
+            finally:
+                with self._lock:
+                    self._running[key] -= 1
+                    if not self._running[key]:
+                        del self._running[key]
+        else:
+            booking.done.wait()
+
+        if booking.retry:
+            return fallback()
+        if booking.error is not None:
+            raise booking.error
+        return booking.result
+
+    @staticmethod
+    def run(batch: Batch) -> None:
+        try:
+            with transaction.atomic():
+                journeys = lock_journeys(batch.journey_ids)
+                tickets = []
+                for booking in batch.bookings:
+                    seat_maps = {
+                        journey_id: journey.seat_map.to_bytes()
+                        for journey_id, journey in journeys.items()
+                    }
+                    try:
+                        with transaction.atomic():
+                            result, booking_tickets = booking.context.run(
+                                booking.apply, journeys
+                            )
+                    except Exception as error:
+                        # undo the seats it may have taken in memory
+                        for journey_id, bits in seat_maps.items():
+                            journeys[journey_id].seat_map.bits[:] = bits
+                        booking.error = error
+                        continue
+                    booking.result = result
+                    tickets.extend(booking_tickets)
+                Ticket.objects.bulk_create(tickets)
+                save_seat_maps(journeys.values())
+        except Exception:
+            # the shared part failed, so book each order on its own
+            for booking in batch.bookings:
+                if booking.error is None:
+                    booking.retry = True
+        finally:
+            for booking in batch.bookings:
+                booking.done.set()
+
+
+booking_coordinator = BookingCoordinator()
@@ -0,0 +1,215 @@
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+    "LRU_SIZE": 1024,
+}
+
+MISSING = object()
+
+
+def cache_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "STATION_APP_CACHE", {})}
+
+
+def get_cache():
+    return caches[cache_settings()["ALIAS"]]
+
+
+class LRUCache:
+    """Bounded process-local map in front of the Django cache backend"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(cache_settings()["LRU_SIZE"])
+
+
+def version_key(model) -> str:
+    return f"station_app:version:{model._meta.label_lower}"
+
+
+def get_versions(models: Iterable) -> dict[str, int]:
+    """Current version of every model's table.
+
+    A version is the time (ns) of the last write to the table, missing
+    versions are started at now so no stale entry can match them.
+    """
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return {key: versions[key] for key in keys}
+
+
+def bump_versions(*models) -> None:
+    """Invalidate everything cached for the models' tables"""
+    get_cache().set_many(
+        {version_key(model): time.time_ns() for model in models}, None
+    )
+
+
+def invalidate(sender, **kwargs) -> None:
+    """Save/delete signal receiver: bump the sender's version now and
+    after commit, so nothing read mid-transaction outlives it"""
+    bump_versions(sender)
+    transaction.on_commit(lambda: bump_versions(sender))
+
+
+def cached(key: str, models: Iterable, compute: Callable):
+    """Read-through lookup of key, valid until any of models is written"""
+    versions = get_versions(models)
+    full_key = (
+        "station_app:cached:"
+        + hashlib.sha1(
+            ":".join([key, *map(str, versions.values())]).encode()
+        ).hexdigest()
+    )
+    value = local_cache.get(full_key)
+    if value is not MISSING:
+        return value
+    cache = get_cache()
+    value = cache.get(full_key, MISSING)
+    if value is MISSING:
+        value = compute()
+        cache.set(full_key, value, cache_settings()["TIMEOUT"])
+    local_cache.set(full_key, value)
+    return value
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve responses from cache until any of
+    response_models is written; permissions are still checked per request"""
+
+    response_models = ()
+
+    def response_cache_key(self, request) -> str:
+        return f"{self.basename}:{self.action}:{request.build_absolute_uri()}"
+
+    def list(self, request, *args, **kwargs):
+        handler = super().list
+        return Response(
+            cached(
+                self.response_cache_key(request),
+                self.response_models,
+                lambda: handler(request, *args, **kwargs).data,
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = super().retrieve
+        return Response(
+            cached(
+                self.response_cache_key(request),
+                self.response_models,
+                lambda: handler(request, *args, **kwargs).data,
+            )
+        )
+
+
+class ConditionalGetMixin:
+    """ETag and Last-Modified for list and retrieve, derived from the
+    versions of response_models without touching the database.
+
+    A matching If-None-Match (or, without it, a recent enough
+    If-Modified-Since) is answered with 304 before any queryset or
+    serializer runs.
+
+    Last-Modified has one second resolution: it is the second after
+    the last write, and it is left out until that second is over, as
+    a later write within it would get the same date.
+    """
+
+    response_models = ()
+
+    def conditional_headers(self, request) -> dict[str, str]:
+        versions = get_versions(self.response_models)
+        etag = hashlib.sha1(
+            ":".join(
+                [
+                    request.build_absolute_uri(),
+                    request.META.get("HTTP_ACCEPT", ""),
+                    *map(str, versions.values()),
+                ]
+            ).encode()
+        ).hexdigest()
+        headers = {"ETag": quote_etag(etag)}
+        modified = max(versions.values(), default=0) // 10**9 + 1
+        if time.time_ns() >= modified * 10**9:
+            headers["Last-Modified"] = formatdate(modified, usegmt=True)
+        return headers
+
+    @staticmethod
+    def is_not_modified(request, headers: dict[str, str]) -> bool:
+        if if_none_match := request.META.get("HTTP_IF_NONE_MATCH"):
+            # weak comparison: compressed responses carry W/ ETags
+            etags = [
+                etag.removeprefix("W/") for etag in parse_etags(if_none_match)
+            ]
+            return "*" in etags or headers["ETag"] in etags
+        if (
+            if_modified_since := request.META.get("HTTP_IF_MODIFIED_SINCE")
+        ) and "Last-Modified" in headers:
+            since = parse_http_date_safe(if_modified_since)
+            modified = parse_http_date_safe(headers["Last-Modified"])
+            return since is not None and modified <= since
+        return False
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        headers = self.conditional_headers(request)
+        if self.is_not_modified(request, headers):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,119 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+DEFAULTS = {
+    # responses smaller than this (bytes) are sent as they are
+    "MIN_SIZE": 1024,
+    # server preference when the client accepts several equally
+    "ENCODINGS": ("br", "gzip"),
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+    # API payloads only: compressed HTML pages carrying a CSRF token
+    # (the browsable API, the admin) would be open to BREACH
+    "CONTENT_TYPES": (
+        "application/json",
+        "application/vnd.oai.openapi",
+    ),
+}
+
+
+def compression_settings() -> dict:
+    return {
+        **DEFAULTS,
+        **getattr(settings, "REST_FRAMEWORK", {}).get("COMPRESSION", {}),
+    }
+
+
+def available_encodings(options) -> list[str]:
+    return [
+        encoding
+        for encoding in options["ENCODINGS"]
+        if encoding == "gzip" or (encoding == "br" and brotli is not None)
+    ]
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding as {coding: q}"""
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = item.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate(header: str, encodings: list[str]) -> str | None:
+    """Encoding the client prefers, the server's order breaking ties"""
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    ranked = [
+        (accepted.get(encoding, wildcard), -index, encoding)
+        for index, encoding in enumerate(encodings)
+    ]
+    quality, _, encoding = max(ranked, default=(0.0, 0, None))
+    return encoding if quality > 0 else None
+
+
+def compress(content: bytes, encoding: str, options) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=options["BROTLI_QUALITY"])
+    return gzip.compress(content, compresslevel=options["GZIP_LEVEL"], mtime=0)
+
+
+class CompressionMiddleware:
+    """gzip or brotli (when the brotli package is installed) response
+    bodies, negotiated with Accept-Encoding and configured by
+    REST_FRAMEWORK["COMPRESSION"]. Small, streaming, already encoded
+    and non JSON responses are left alone."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        options = compression_settings()
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(
+                tuple(options["CONTENT_TYPES"])
+            )
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < options["MIN_SIZE"]:
+            return response
+        encoding = negotiate(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            available_encodings(options),
+        )
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding, options)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # the body differs from the identity one, a strong ETag must not
+        # be shared between them
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
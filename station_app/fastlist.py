@@ -0,0 +1,215 @@
+from collections import defaultdict
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.relations import (
+    HyperlinkedRelatedField,
+    ManyRelatedField,
+    PKOnlyObject,
+    PrimaryKeyRelatedField,
+    RelatedField,
+    SlugRelatedField,
+)
+
+from .metrics import timed
+
+DEFAULTS = {
+    # opt-in: output is the same, but custom fields a serializer grows
+    # later are only covered once ValuesSerializer learns them
+    "ENABLED": False,
+}
+
+
+def fast_list_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "STATION_APP_FAST_LIST", {})}
+
+
+class Column:
+    """One serializer field read from a values() lookup"""
+
+    __slots__ = ("name", "lookup", "convert")
+
+    def __init__(self, name: str, lookup: str, convert: Optional[Callable]):
+        self.name = name
+        self.lookup = lookup
+        self.convert = convert
+
+
+class ManyColumn:
+    """A many=True primary key field of a forward many to many
+    relation, read with one values_list() query per page"""
+
+    __slots__ = ("name", "related_model", "query_name")
+
+    def __init__(self, name: str, related_model, query_name: str):
+        self.name = name
+        self.related_model = related_model
+        self.query_name = query_name
+
+    def fetch(self, ids: list) -> dict:
+        # the related manager's default ordering, as prefetch_related
+        related = defaultdict(list)
+        for owner_id, related_id in self.related_model.objects.filter(
+            **{f"{self.query_name}__in": ids}
+        ).values_list(self.query_name, "pk"):
+            related[owner_id].append(related_id)
+        return related
+
+
+def hyperlink(field: HyperlinkedRelatedField) -> Callable:
+    return lambda pk: field.to_representation(PKOnlyObject(pk=pk))
+
+
+class ValuesSerializer:
+    """List representation of a flat ModelSerializer built from
+    values() rows instead of model instances.
+
+    The serializer stays the source of truth: its fields are compiled
+    once per request into lookups and converters (the fields' own
+    to_representation, or nothing for primary keys and slugs), so the
+    output is the same as serializing instances. Serializers with
+    fields that need an instance (method fields, nested serializers,
+    source="*") don't compile and keep the regular path.
+    """
+
+    def __init__(self, columns: list, many_columns: list):
+        self.columns = columns
+        self.many_columns = many_columns
+
+    @classmethod
+    def compile(cls, serializer) -> Optional["ValuesSerializer"]:
+        if (
+            not isinstance(serializer, serializers.ModelSerializer)
+            or type(serializer).to_representation
+            is not serializers.Serializer.to_representation
+        ):
+            return None
+        model = serializer.Meta.model
+        columns, many_columns = [], []
+        for field in serializer._readable_fields:
+            if field.source == "*":
+                return None
+            lookup = "__".join(field.source_attrs)
+            if isinstance(field, ManyRelatedField):
+                many_column = cls.compile_many(field, model)
+                if many_column is None:
+                    return None
+                many_columns.append(many_column)
+                columns.append(Column(field.field_name, "pk", None))
+                continue
+            convert = cls.converter(field)
+            if convert is False:
+                return None
+            if isinstance(field, SlugRelatedField):
+                lookup = f"{lookup}__{field.slug_field}"
+            columns.append(Column(field.field_name, lookup, convert))
+        return cls(columns, many_columns)
+
+    @staticmethod
+    def converter(field):
+        """Callable turning a column value into the field's output, None
+        when the value is output as is, False when not supported"""
+        if isinstance(field, HyperlinkedRelatedField):
+            return hyperlink(field) if field.lookup_field == "pk" else False
+        if isinstance(field, PrimaryKeyRelatedField):
+            return None if field.pk_field is None else False
+        if isinstance(field, SlugRelatedField):
+            return None
+        if isinstance(
+            field,
+            (
+                RelatedField,
+                serializers.BaseSerializer,
+                serializers.SerializerMethodField,
+                serializers.HiddenField,
+            ),
+        ):
+            return False
+        if type(field).get_attribute is not serializers.Field.get_attribute:
+            return False
+        return field.to_representation
+
+    @staticmethod
+    def compile_many(field, model) -> Optional[ManyColumn]:
+        child = field.child_relation
+        if (
+            not isinstance(child, PrimaryKeyRelatedField)
+            or child.pk_field is not None
+            or len(field.source_attrs) != 1
+        ):
+            return None
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not isinstance(model_field, models.ManyToManyField):
+            return None
+        return ManyColumn(
+            field.field_name,
+            model_field.related_model,
+            model_field.related_query_name(),
+        )
+
+    def queryset(self, queryset, *extra) -> Optional[models.QuerySet]:
+        """values() rows of queryset, None if a lookup isn't a column
+        or an annotation of it; extra lookups (the keyset pagination
+        key) are fetched too"""
+        lookups = {"pk", *extra, *(column.lookup for column in self.columns)}
+        try:
+            return queryset.prefetch_related(None).values(*lookups)
+        except FieldError:
+            return None
+
+    @timed
+    def to_representation(self, rows) -> list[dict]:
+        rows = list(rows)
+        many = {
+            column.name: column.fetch([row["pk"] for row in rows])
+            for column in self.many_columns
+        }
+        data = []
+        for row in rows:
+            item = {}
+            for column in self.columns:
+                if column.name in many:
+                    item[column.name] = many[column.name].get(row["pk"], [])
+                    continue
+                value = row[column.lookup]
+                if value is not None and column.convert is not None:
+                    value = column.convert(value)
+                item[column.name] = value
+            data.append(item)
+        return data
+
+
+class FastListMixin:
+    """Serve list actions from values() rows through ValuesSerializer.
+
+    Pagination (page numbers or keyset cursors) runs on the values()
+    queryset. Viewsets whose list serializer doesn't compile are served
+    as usual.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not fast_list_settings()["ENABLED"]:
+            return super().list(request, *args, **kwargs)
+        values_serializer = ValuesSerializer.compile(
+            self.get_serializer_class()(context=self.get_serializer_context())
+        )
+        queryset = values_serializer and values_serializer.queryset(
+            self.filter_queryset(self.get_queryset()),
+            getattr(self, "keyset_ordering", "pk").lstrip("-"),
+        )
+        if queryset is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                values_serializer.to_representation(page)
+            )
+        return Response(values_serializer.to_representation(queryset))
@@ -0,0 +1,182 @@
+import heapq
+import math
+from typing import NamedTuple, Optional
+
+from .indexes import ReferenceIndex
+from .models import Station
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_unit_vector(lat: float, lon: float) -> tuple[float, float, float]:
+    """Point on the unit sphere: straight-line (chord) distance between
+    two such points grows with great-circle distance, so a plain 3-d
+    KD-tree answers spherical nearest-neighbour queries"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (
+        math.cos(lat) * math.cos(lon),
+        math.cos(lat) * math.sin(lon),
+        math.sin(lat),
+    )
+
+
+def chord_for_km(distance_km: float) -> float:
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+class StationPoint(NamedTuple):
+    id: int
+    name: str
+    latitude: float
+    longitude: float
+    vector: tuple[float, float, float]
+
+
+class Node(NamedTuple):
+    point: StationPoint
+    axis: int
+    left: Optional["Node"]
+    right: Optional["Node"]
+
+
+def squared_distance(a, b) -> float:
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class KDTree:
+    def __init__(self, points: list[StationPoint]):
+        self.size = len(points)
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth) -> Optional[Node]:
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda point: point.vector[axis])
+        median = len(points) // 2
+        return Node(
+            points[median],
+            axis,
+            self._build(points[:median], depth + 1),
+            self._build(points[median + 1 :], depth + 1),
+        )
+
+    def nearest(self, target, k: int) -> list[tuple[float, StationPoint]]:
+        """k closest points as (squared chord, point), closest first"""
+        heap = []  # max-heap by squared distance: (-distance, id, point)
+
+        def visit(node):
+            if node is None:
+                return
+            distance = squared_distance(node.point.vector, target)
+            if len(heap) < k:
+                heapq.heappush(heap, (-distance, node.point.id, node.point))
+            elif distance < -heap[0][0]:
+                heapq.heapreplace(heap, (-distance, node.point.id, node.point))
+            delta = target[node.axis] - node.point.vector[node.axis]
+            near, far = (
+                (node.left, node.right)
+                if delta < 0
+                else (node.right, node.left)
+            )
+            visit(near)
+            if len(heap) < k or delta**2 < -heap[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self.root)
+        return sorted((-distance, point) for distance, _, point in heap)
+
+    def within(self, target, chord: float) -> list[StationPoint]:
+        limit = chord**2
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if squared_distance(node.point.vector, target) <= limit:
+                found.append(node.point)
+            delta = target[node.axis] - node.point.vector[node.axis]
+            if delta <= chord:
+                stack.append(node.left)
+            if delta >= -chord:
+                stack.append(node.right)
+        return found
+
+
+class StationGeoIndex(ReferenceIndex):
+    """KD-tree over station coordinates for "stations near me" queries"""
+
+    def build(self) -> KDTree:
+        return KDTree(
+            [
+                StationPoint(
+                    station_id,
+                    name,
+                    latitude,
+                    longitude,
+                    to_unit_vector(latitude, longitude),
+                )
+                for station_id, name, latitude, longitude in (
+                    Station.objects.values_list(
+                        "id", "name", "latitude", "longitude"
+                    )
+                )
+            ]
+        )
+
+    @staticmethod
+    def _with_distance(points, latitude, longitude) -> list[dict]:
+        return sorted(
+            (
+                {
+                    "id": point.id,
+                    "name": point.name,
+                    "latitude": point.latitude,
+                    "longitude": point.longitude,
+                    "distance_km": round(
+                        haversine_km(
+                            latitude,
+                            longitude,
+                            point.latitude,
+                            point.longitude,
+                        ),
+                        3,
+                    ),
+                }
+                for point in points
+            ),
+            key=lambda station: (station["distance_km"], station["id"]),
+        )
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> list[dict]:
+        target = to_unit_vector(latitude, longitude)
+        return self._with_distance(
+            [point for _, point in self.data.nearest(target, k)],
+            latitude,
+            longitude,
+        )
+
+    def within(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> list[dict]:
+        target = to_unit_vector(latitude, longitude)
+        return self._with_distance(
+            self.data.within(target, chord_for_km(radius_km)),
+            latitude,
+            longitude,
+        )
+
+
+station_geo_index = StationGeoIndex()
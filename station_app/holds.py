@@ -0,0 +1,277 @@
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .cache import get_cache
+from .seatmap import SeatMap
+
+DEFAULTS = {
+    # seconds a seat stays reserved before it has to be confirmed
+    "TTL": 600,
+    "MAX_SEATS": 10,
+    # seats one user may hold at once, on a journey and overall
+    "MAX_SEATS_PER_JOURNEY": 10,
+    "MAX_SEATS_PER_USER": 30,
+    # seconds to wait for another hold of the same user to be placed
+    "USER_LOCK_WAIT": 2,
+}
+# a user lock left by a crashed worker expires after this many seconds
+USER_LOCK_TTL = 10
+
+Seat = tuple[int, int, int]  # journey id, carriage, seat
+
+
+def hold_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "STATION_APP_SEAT_HOLDS", {})}
+
+
+def seat_key(journey_id: int, carriage: int, seat: int) -> str:
+    return f"station_app:hold:seat:{journey_id}:{carriage}:{seat}"
+
+
+def hold_key(hold_id: str) -> str:
+    return f"station_app:hold:{hold_id}"
+
+
+def user_holds_key(user_id: int) -> str:
+    return f"station_app:hold:user:{user_id}"
+
+
+def user_lock_key(user_id: int) -> str:
+    return f"station_app:hold:user-lock:{user_id}"
+
+
+class SeatsHeld(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the seats are held by another booking."
+    default_code = "seats_held"
+
+
+class TooManyHolds(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "Too many seats are held already."
+    default_code = "too_many_holds"
+
+
+class HoldsBusy(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Another hold of yours is being placed, retry."
+    default_code = "holds_busy"
+
+
+@contextmanager
+def user_lock(user_id: int):
+    """Serialize changes to a user's holds, so concurrent holds can't
+    both pass the limits on the same count. cache.add is atomic on
+    shared backends, like the seat claims."""
+    cache = get_cache()
+    key, token = user_lock_key(user_id), uuid.uuid4().hex
+    deadline = time.monotonic() + hold_settings()["USER_LOCK_WAIT"]
+    while not cache.add(key, token, USER_LOCK_TTL):
+        if time.monotonic() >= deadline:
+            raise HoldsBusy()
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def user_holds(user_id: int) -> list[dict]:
+    """Live holds of a user, with only the seats they still claim"""
+    cache = get_cache()
+    hold_ids = cache.get(user_holds_key(user_id), [])
+    holds = cache.get_many([hold_key(hold_id) for hold_id in hold_ids])
+    keys = {
+        seat_key(hold["journey"], carriage, seat): hold["id"]
+        for hold in holds.values()
+        for carriage, seat in hold["seats"]
+    }
+    holders = cache.get_many(keys)
+    return [
+        {
+            **hold,
+            "seats": [
+                [carriage, seat]
+                for carriage, seat in hold["seats"]
+                if holders.get(seat_key(hold["journey"], carriage, seat))
+                == hold["id"]
+            ],
+        }
+        for hold in holds.values()
+    ]
+
+
+def check_hold_limits(holds: list[dict], journey_id: int, count: int):
+    """Raise when count more seats would take a user past the limits"""
+    options = hold_settings()
+    held = sum(len(hold["seats"]) for hold in holds)
+    held_on_journey = sum(
+        len(hold["seats"]) for hold in holds if hold["journey"] == journey_id
+    )
+    errors = []
+    if held_on_journey + count > options["MAX_SEATS_PER_JOURNEY"]:
+        errors.append(
+            f"at most {options['MAX_SEATS_PER_JOURNEY']} seats of a journey "
+            f"can be held, {held_on_journey} are held already"
+        )
+    if held + count > options["MAX_SEATS_PER_USER"]:
+        errors.append(
+            f"at most {options['MAX_SEATS_PER_USER']} seats can be held, "
+            f"{held} are held already"
+        )
+    if errors:
+        raise TooManyHolds({"seats": errors})
+
+
+def place_hold(user_id: int, journey_id: int, seats: Iterable) -> dict:
+    """Reserve (carriage, seat) pairs of a journey for the TTL.
+
+    Every seat is claimed with cache.add, atomic on shared backends
+    such as Redis or Memcached, so of two concurrent holds on a seat
+    exactly one wins. A hold is all or nothing, and refused when it
+    would take the user past MAX_SEATS_PER_JOURNEY or MAX_SEATS_PER_USER,
+    counted under the user's lock.
+    """
+    seats = list(seats)
+    with user_lock(user_id):
+        return _place_hold(user_id, journey_id, seats)
+
+
+def _place_hold(user_id: int, journey_id: int, seats: list) -> dict:
+    active = user_holds(user_id)
+    check_hold_limits(active, journey_id, len(seats))
+    ttl = hold_settings()["TTL"]
+    hold_id = uuid.uuid4().hex
+    cache = get_cache()
+    placed, conflicts = [], []
+    for carriage, seat in seats:
+        key = seat_key(journey_id, carriage, seat)
+        if cache.add(key, hold_id, ttl):
+            placed.append(key)
+        else:
+            conflicts.append(
+                f"seat {seat} in carriage {carriage} is already held"
+            )
+    if conflicts:
+        cache.delete_many(placed)
+        raise SeatsHeld({"seats": conflicts})
+
+    hold = {
+        "id": hold_id,
+        "user_id": user_id,
+        "journey": journey_id,
+        "seats": [[carriage, seat] for carriage, seat in seats],
+        "expires_at": timezone.now() + timedelta(seconds=ttl),
+    }
+    cache.set(hold_key(hold_id), hold, ttl)
+    cache.set(
+        user_holds_key(user_id),
+        [*(active_hold["id"] for active_hold in active), hold_id],
+        ttl,
+    )
+    return hold
+
+
+def get_hold(hold_id: str) -> Optional[dict]:
+    return get_cache().get(hold_key(hold_id))
+
+
+def release_hold(hold: dict) -> None:
+    release_seats(
+        hold["id"],
+        [
+            (hold["journey"], carriage, seat)
+            for carriage, seat in hold["seats"]
+        ],
+    )
+    cache = get_cache()
+    cache.delete(hold_key(hold["id"]))
+    key = user_holds_key(hold["user_id"])
+    with user_lock(hold["user_id"]):
+        hold_ids = cache.get(key, [])
+        if hold["id"] in hold_ids:
+            cache.set(
+                key,
+                [hold_id for hold_id in hold_ids if hold_id != hold["id"]],
+                hold_settings()["TTL"],
+            )
+
+
+def release_seats(hold_id: str, seats: Iterable[Seat]) -> None:
+    """Free seats still claimed by hold_id"""
+    cache = get_cache()
+    keys = [seat_key(*seat) for seat in seats]
+    cache.delete_many(
+        [
+            key
+            for key, holder in cache.get_many(keys).items()
+            if holder == hold_id
+        ]
+    )
+
+
+def seat_holds(seats: Iterable[Seat]) -> dict[Seat, dict]:
+    """Live holds on seats, two cache round trips whatever the count"""
+    cache = get_cache()
+    keys = {seat_key(*seat): seat for seat in seats}
+    holders = cache.get_many(keys)
+    if not holders:
+        return {}
+    holds = cache.get_many({hold_key(hold_id) for hold_id in holders.values()})
+    return {
+        keys[key]: holds[hold_key(hold_id)]
+        for key, hold_id in holders.items()
+        if hold_key(hold_id) in holds
+    }
+
+
+def check_holds(user_id: int, seats: Iterable[Seat], error_to_raise):
+    """Raise when another user holds any of seats, return the user's
+    own holds on them so they can be released once the seats are sold"""
+    holds = seat_holds(seats)
+    held = [
+        f"seat {seat} in carriage {carriage} of journey {journey_id} "
+        f"is held by another booking"
+        for (journey_id, carriage, seat), hold in holds.items()
+        if hold["user_id"] != user_id
+    ]
+    if held:
+        raise error_to_raise({"tickets": held})
+    return holds
+
+
+def release_held(holds: dict[Seat, dict]) -> None:
+    """Free the seats of check_holds' result once they are sold"""
+    by_hold = defaultdict(list)
+    for seat, hold in holds.items():
+        by_hold[hold["id"]].append(seat)
+    for hold_id, seats in by_hold.items():
+        release_seats(hold_id, seats)
+
+
+def available_seat_map(journey, user_id: int) -> SeatMap:
+    """Copy of the journey's seat map with the seats held by other
+    users marked as taken"""
+    seat_map = journey.seat_map
+    available = SeatMap(
+        seat_map.carriage_num,
+        seat_map.places_in_carriage,
+        seat_map.to_bytes(),
+    )
+    held = seat_holds(
+        (journey.id, carriage, seat) for carriage, seat in seat_map.free()
+    )
+    for (_, carriage, seat), hold in held.items():
+        if hold["user_id"] != user_id:
+            available.take(carriage, seat)
+    return available
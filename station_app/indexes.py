@@ -0,0 +1,56 @@
+import threading
+import time
+
+from django.db import transaction
+
+
+class ReferenceIndex:
+    """Process-local structure built from a small, rarely written table.
+
+    The structure is built lazily on first use and dropped by the
+    table's save/delete signals. It is also rebuilt once it is older than
+    max_age seconds, so writes made by other processes are picked up.
+    """
+
+    max_age = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._built_at = 0.0
+        self._generation = 0
+
+    def build(self):
+        raise NotImplementedError
+
+    def _is_fresh(self, data) -> bool:
+        return (
+            data is not None
+            and time.monotonic() - self._built_at < self.max_age
+        )
+
+    @property
+    def data(self):
+        # read self._data once: invalidate() may set it to None any time
+        data = self._data
+        if self._is_fresh(data):
+            return data
+        with self._lock:
+            data = self._data
+            if not self._is_fresh(data):
+                generation = self._generation
+                data = self.build()
+                if generation == self._generation:
+                    self._data = data
+                    self._built_at = time.monotonic()
+            return data
+
+    def _drop(self) -> None:
+        self._generation += 1
+        self._data = None
+
+    def invalidate(self, *args, **kwargs) -> None:
+        """Drop the structure now and once the current transaction
+        commits, usable directly as a signal receiver"""
+        self._drop()
+        transaction.on_commit(self._drop)
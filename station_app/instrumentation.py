@@ -0,0 +1,149 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    # fraction of requests whose queries are counted and timed
+    "SAMPLE_RATE": 1.0,
+    # requests slower than this are logged as warnings, sampled or not
+    "SLOW_REQUEST_MS": 500,
+    # same statement this many times in one request is an N+1 pattern
+    "DUPLICATE_THRESHOLD": 3,
+    # Server-Timing header for every client; staff users always get it,
+    # and so does everyone when DEBUG is on
+    "SERVER_TIMING": False,
+}
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_LISTS = re.compile(r"\(\s*%s(\s*,\s*%s)*\s*\)")
+NUMBERS = re.compile(r"\b\d+\b")
+
+
+def instrumentation_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "STATION_APP_INSTRUMENTATION", {})}
+
+
+def normalize_sql(sql: str) -> str:
+    """Statement shape: IN lists and inlined numbers (LIMIT 21) collapsed,
+    so the same query with other parameters counts as a duplicate"""
+    return NUMBERS.sub("N", PLACEHOLDER_LISTS.sub("(%s, ...)", sql))
+
+
+class QueryCollector:
+    """Connection execute wrapper counting and timing every statement"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[normalize_sql(sql)] += 1
+
+    @property
+    def duplicates(self) -> int:
+        return sum(count - 1 for count in self.statements.values())
+
+    def repeated(self, threshold: int) -> list[dict]:
+        return [
+            {"sql": sql[:300], "count": count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+class SQLInstrumentationMiddleware:
+    """Per-request query count, DB time and N+1 patterns as a
+    Server-Timing header (see sends_server_timing) and a JSON log line.
+
+    Only a SAMPLE_RATE share of requests wrap the connections, the rest
+    just measure total time to report slow requests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = instrumentation_settings()
+        collector = (
+            QueryCollector()
+            if random.random() < options["SAMPLE_RATE"]
+            else None
+        )
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            if collector is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        slow = total_ms >= options["SLOW_REQUEST_MS"]
+        if collector is None:
+            if slow:
+                self.log(logging.WARNING, request, response, total_ms)
+            return response
+
+        db_ms = collector.duration * 1000
+        repeated = collector.repeated(options["DUPLICATE_THRESHOLD"])
+        if self.sends_server_timing(request, options):
+            response["Server-Timing"] = ", ".join(
+                (
+                    f'db;dur={db_ms:.2f};desc="{collector.count} queries"',
+                    f"app;dur={total_ms - db_ms:.2f}",
+                    f'dup;desc="{collector.duplicates} duplicate queries"',
+                    f"total;dur={total_ms:.2f}",
+                )
+            )
+        self.log(
+            logging.WARNING if slow or repeated else logging.INFO,
+            request,
+            response,
+            total_ms,
+            queries=collector.count,
+            db_ms=round(db_ms, 2),
+            duplicates=collector.duplicates,
+            repeated=repeated,
+        )
+        return response
+
+    @staticmethod
+    def sends_server_timing(request, options) -> bool:
+        """The header tells how the request was served, so by default
+        it only goes to staff; request.user is set by DRF's
+        authentication by the time the response is back"""
+        if options["SERVER_TIMING"] or settings.DEBUG:
+            return True
+        user = getattr(request, "user", None)
+        return bool(user and user.is_staff)
+
+    @staticmethod
+    def log(level, request, response, total_ms, **stats) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(
+            level,
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round(total_ms, 2),
+                    **stats,
+                }
+            ),
+        )
@@ -0,0 +1,310 @@
+import json
+import os
+import subprocess
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, F, Max
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from station_app.models import Journey, Order, Ticket
+from station_app.occupancy import manual_sync, rebuild_seat_maps
+from station_app.stats import summarize
+
+ROWS_SCANNED_SQL = (
+    "SELECT COALESCE(SUM(seq_tup_read + COALESCE(idx_tup_fetch, 0)), 0) "
+    "FROM pg_stat_xact_user_tables"
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rows_scanned() -> int | None:
+    """Rows read by this transaction so far, PostgreSQL only"""
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(ROWS_SCANNED_SQL)
+        return int(cursor.fetchone()[0])
+
+
+class Command(BaseCommand):
+    # scenarios whose transactions really commit, with the fsync and
+    # on_commit hooks (cache invalidation, planner updates) that brings
+    committed_scenarios = ("order_create",)
+
+    help = (
+        "Benchmark the main API endpoints against the current database "
+        "(see generate_dataset) and store p50/p95 latency, SQL query "
+        "count and rows scanned as JSON. Reads run in a rolled back "
+        "transaction; writes are committed as in production and the "
+        "orders they create are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--user",
+            help="Email of the user to benchmark as, "
+            "defaults to the user with most orders",
+        )
+        parser.add_argument(
+            "--output",
+            help="Result file, defaults to benchmarks/<timestamp>.json",
+        )
+        parser.add_argument(
+            "--compare", help="Previous result file to compare against"
+        )
+        parser.add_argument(
+            "--accept-encoding",
+            default="",
+            help="Accept-Encoding sent with every request, e.g. gzip, br",
+        )
+
+    def handle(self, *args, **options):
+        self.iterations = options["iterations"]
+        self.warmup = options["warmup"]
+        user = self.get_user(options["user"])
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION="Bearer "
+            f"{RefreshToken.for_user(user).access_token}",
+            HTTP_ACCEPT_ENCODING=options["accept_encoding"],
+        )
+
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            for name, make_request in self.scenarios().items():
+                if name in self.committed_scenarios:
+                    results[name] = self.run_committed(
+                        client, make_request, user
+                    )
+                else:
+                    results[name] = self.run_rolled_back(client, make_request)
+                self.report(name, results[name])
+
+        run = {
+            "meta": {
+                "revision": git_revision(),
+                "created_at": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "iterations": self.iterations,
+                "warmup": self.warmup,
+                "accept_encoding": options["accept_encoding"],
+                "rows": {
+                    "journeys": Journey.objects.count(),
+                    "orders": Order.objects.count(),
+                    "tickets": Ticket.objects.count(),
+                },
+            },
+            "results": results,
+        }
+        output = options["output"] or os.path.join(
+            "benchmarks", f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as result_file:
+            json.dump(run, result_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def get_user(self, email):
+        users = get_user_model().objects
+        if email:
+            try:
+                return users.get(email=email)
+            except users.model.DoesNotExist:
+                raise CommandError(f"No user {email}")
+        user = (
+            users.annotate(order_count=Count("orders"))
+            .order_by("-order_count")
+            .first()
+        )
+        if user is None:
+            raise CommandError("No users, run generate_dataset first")
+        return user
+
+    def scenarios(self) -> dict:
+        """name -> callable returning (method, url, data) of a request"""
+        journey = (
+            Journey.objects.select_related("route__source", "train")
+            .filter(departure_time__gt=timezone.now())
+            .order_by("-seats_taken")
+            .first()
+        )
+        if journey is None:
+            raise CommandError("No upcoming journeys, run generate_dataset")
+        bookable = (
+            Journey.objects.select_related("train")
+            .filter(departure_time__gt=timezone.now())
+            .filter(
+                seats_taken__lt=F("train__carriage_num")
+                * F("train__places_in_carriage")
+                - self.iterations
+                - self.warmup
+            )
+            .order_by("-seats_taken")
+            .first()
+        )
+        if bookable is None:
+            raise CommandError("No journey has enough free seats to book")
+        self.bookable = bookable
+        free_seats = bookable.seat_map.free()
+
+        def order_create():
+            carriage, seat = next(free_seats)
+            return (
+                "post",
+                reverse("station_app:orders-list"),
+                {
+                    "tickets": [
+                        {
+                            "carriage": carriage,
+                            "seat": seat,
+                            "journey": bookable.id,
+                        }
+                    ]
+                },
+            )
+
+        journeys_url = reverse("station_app:journeys-list")
+        search_params = {
+            "source": journey.route.source.name,
+            "departure-date": timezone.localtime(
+                journey.departure_time
+            ).date(),
+        }
+        return {
+            "journey_search": lambda: ("get", journeys_url, search_params),
+            "journey_detail": lambda: (
+                "get",
+                reverse("station_app:journeys-detail", args=[journey.id]),
+                None,
+            ),
+            "order_create": order_create,
+            "order_list": lambda: (
+                "get",
+                reverse("station_app:orders-list"),
+                None,
+            ),
+            "ticket_list": lambda: (
+                "get",
+                reverse("station_app:tickets-list"),
+                None,
+            ),
+        }
+
+    def run_rolled_back(self, client, make_request) -> dict:
+        try:
+            with transaction.atomic():
+                result = self.run(client, make_request)
+                raise Rollback
+        except Rollback:
+            return result
+
+    def run_committed(self, client, make_request, user) -> dict:
+        """Run outside any transaction of ours, then delete the orders
+        the user created on the scratch journey meanwhile"""
+        last_id = Order.objects.aggregate(last_id=Max("id"))["last_id"]
+        try:
+            return self.run(client, make_request, count_rows=False)
+        finally:
+            created = Order.objects.filter(
+                user=user,
+                id__gt=last_id or 0,
+                id__in=Ticket.objects.filter(
+                    journey_id=self.bookable.id
+                ).values("order_id"),
+            )
+            with transaction.atomic(), manual_sync():
+                created.delete()
+            rebuild_seat_maps([self.bookable.id])
+
+    def run(self, client, make_request, count_rows=True) -> dict:
+        """count_rows needs a surrounding transaction, PostgreSQL keeps
+        the counters per transaction"""
+        latencies, queries, scanned, sizes = [], [], [], []
+        statuses = set()
+        for iteration in range(self.warmup + self.iterations):
+            method, url, data = make_request()
+            rows_before = rows_scanned() if count_rows else None
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data, format="json")
+                elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{method.upper()} {url}: {response.status_code} "
+                    f"{response.content[:200]!r}"
+                )
+            if iteration < self.warmup:
+                continue
+            latencies.append(elapsed)
+            queries.append(len(captured))
+            sizes.append(len(response.content))
+            statuses.add(response.status_code)
+            if rows_before is not None:
+                scanned.append(rows_scanned() - rows_before)
+        return {
+            "latency_ms": summarize(latencies),
+            "queries": summarize(queries),
+            "rows_scanned": summarize(scanned) if scanned else None,
+            "response_bytes": summarize(sizes),
+            "status": sorted(statuses),
+        }
+
+    def report(self, name, result):
+        latency = result["latency_ms"]
+        self.stdout.write(
+            f"{name:16} p50 {latency['p50']:9.2f} ms  "
+            f"p95 {latency['p95']:9.2f} ms  "
+            f"queries {result['queries']['p50']:g}  "
+            f"bytes {result['response_bytes']['p50']:g}"
+        )
+
+    def compare(self, path, results):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)["results"]
+        self.stdout.write(f"Compared with {path}:")
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]["latency_ms"]
+            after = result["latency_ms"]
+            changes = "  ".join(
+                f"{stat} {(after[stat] - before[stat]) / before[stat]:+.1%}"
+                for stat in ("p50", "p95")
+                if before.get(stat)
+            )
+            queries = (
+                result["queries"]["p50"] - previous[name]["queries"]["p50"]
+            )
+            self.stdout.write(f"{name:16} {changes}  queries {queries:+g}")
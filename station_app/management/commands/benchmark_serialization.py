@@ -0,0 +1,121 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from station_app.serializers import TemplatedHyperlinkedRelatedField
+from station_app.stats import summarize
+from station_app.views import JourneyViewSet, OrderViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Time list serialization of /journeys/ and /orders/ pages with "
+        "hyperlinks formatted from URL templates against one reverse() "
+        "per link, and check that both give the same output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument(
+            "--user",
+            help="Email of the user whose orders are serialized, "
+            "defaults to the user with most orders",
+        )
+        parser.add_argument("--output", help="Write the results as JSON")
+
+    def handle(self, *args, **options):
+        self.iterations = options["iterations"]
+        self.warmup = options["warmup"]
+        user = self.get_user(options["user"])
+        query = {"page_size": options["page_size"]}
+
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            for name, viewset_class in (
+                ("journeys.list", JourneyViewSet),
+                ("orders.list", OrderViewSet),
+            ):
+                view = self.view(viewset_class, user, query)
+                page = view.paginate_queryset(
+                    view.filter_queryset(view.get_queryset())
+                )
+                # evaluated once, only serialization is timed
+                page = list(page)
+                results[name] = self.compare(name, view, page)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    def get_user(self, email):
+        users = get_user_model().objects
+        if email:
+            try:
+                return users.get(email=email)
+            except users.model.DoesNotExist:
+                raise CommandError(f"No user {email}")
+        user = (
+            users.annotate(order_count=Count("orders"))
+            .order_by("-order_count")
+            .first()
+        )
+        if user is None:
+            raise CommandError("No users, run generate_dataset first")
+        return user
+
+    @staticmethod
+    def view(viewset_class, user, query):
+        """A list viewset set up as it would be for a request"""
+        request = Request(APIRequestFactory().get("/", query))
+        request.user = user
+        view = viewset_class(
+            request=request,
+            action="list",
+            format_kwarg=None,
+            args=(),
+            kwargs={},
+        )
+        return view
+
+    def serialize(self, view, page, use_templates: bool):
+        TemplatedHyperlinkedRelatedField.use_templates = use_templates
+        try:
+            timings, data = [], None
+            for iteration in range(self.warmup + self.iterations):
+                start = time.perf_counter()
+                data = view.get_serializer(page, many=True).data
+                elapsed = (time.perf_counter() - start) * 1000
+                if iteration >= self.warmup:
+                    timings.append(elapsed)
+            return summarize(timings), data
+        finally:
+            TemplatedHyperlinkedRelatedField.use_templates = True
+
+    def compare(self, name, view, page) -> dict:
+        reversed_ms, reversed_data = self.serialize(view, page, False)
+        templated_ms, templated_data = self.serialize(view, page, True)
+        if json.dumps(reversed_data) != json.dumps(templated_data):
+            raise CommandError(f"{name}: templated links differ")
+        speedup = reversed_ms["p50"] / templated_ms["p50"]
+        self.stdout.write(
+            f"{name:14} rows {len(page):<5} reverse p50 "
+            f"{reversed_ms['p50']:9.2f} ms  template p50 "
+            f"{templated_ms['p50']:9.2f} ms  x{speedup:.2f}"
+        )
+        return {
+            "rows": len(page),
+            "reverse_ms": reversed_ms,
+            "template_ms": templated_ms,
+            "speedup": round(speedup, 3),
+        }
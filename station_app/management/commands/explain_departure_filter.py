@@ -0,0 +1,130 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from station_app.models import Journey, Route, Station, Train, TrainType
+from station_app.views import JourneyViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed journeys inside a rolled back transaction and compare query "
+        "plans of the departure_time__date filter and the half-open "
+        "datetime range used by JourneyViewSet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=1_000_000)
+        parser.add_argument("--routes", type=int, default=2_000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Commit seeded rows instead of rolling them back",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                start = self.seed(options)
+                self.compare_plans(
+                    start + timedelta(days=options["days"] // 2)
+                )
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Seeded rows rolled back.")
+
+    def seed(self, options) -> datetime:
+        self.stdout.write(f"Seeding {options['journeys']} journeys...")
+        stations = Station.objects.bulk_create(
+            Station(name=f"Explain station {i}", latitude=0, longitude=0)
+            for i in range(100)
+        )
+        routes = Route.objects.bulk_create(
+            Route(
+                source=source,
+                destination=random.choice(
+                    [station for station in stations if station != source]
+                ),
+                distance=random.uniform(50, 1500),
+            )
+            for source in random.choices(stations, k=options["routes"])
+        )
+        train_type = TrainType.objects.create(name="Explain type")
+        trains = Train.objects.bulk_create(
+            Train(
+                name=f"Explain train {i}",
+                carriage_num=10,
+                places_in_carriage=50,
+                train_type=train_type,
+            )
+            for i in range(200)
+        )
+
+        start = timezone.now().replace(hour=0, minute=0, second=0)
+        minutes = options["days"] * 24 * 60
+        created = 0
+        while created < options["journeys"]:
+            batch = []
+            for _ in range(
+                min(options["batch_size"], options["journeys"] - created)
+            ):
+                departure_time = start + timedelta(
+                    minutes=random.randrange(minutes)
+                )
+                batch.append(
+                    Journey(
+                        route=random.choice(routes),
+                        train=random.choice(trains),
+                        departure_time=departure_time,
+                        arrival_time=departure_time + timedelta(hours=6),
+                    )
+                )
+            Journey.objects.bulk_create(batch)
+            created += len(batch)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Journey._meta.db_table}")
+        return start
+
+    def compare_plans(self, day: datetime):
+        day = timezone.localtime(day).date()
+        day_start, day_end = JourneyViewSet.day_bounds(day)
+        querysets = {
+            "departure_time__date": Journey.objects.filter(
+                departure_time__date=day
+            ),
+            "half-open range": Journey.objects.filter(
+                departure_time__gte=day_start, departure_time__lt=day_end
+            ),
+        }
+        explain_options = (
+            {"analyze": True, "buffers": True}
+            if connection.vendor == "postgresql"
+            else {}
+        )
+        for name, queryset in querysets.items():
+            started = time.perf_counter()
+            plan = queryset.explain(**explain_options)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            self.stdout.write(plan)
+            self.stdout.write(
+                f"index used: {self.uses_index(plan)}, "
+                f"explain took {elapsed:.1f} ms"
+            )
+
+    @staticmethod
+    def uses_index(plan: str) -> bool:
+        return "Index" in plan or "USING INDEX" in plan
@@ -0,0 +1,328 @@
+import io
+import json
+import os
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from station_app.instrumentation import normalize_sql
+from station_app.models import Journey
+from station_app.views import JourneyViewSet, OrderViewSet, TicketViewSet
+
+SNAPSHOT_FILE = os.path.join(
+    settings.BASE_DIR, "station_app", "snapshots", "explain_plans.json"
+)
+SEED_DATASET = {
+    "stations": 300,
+    "routes": 2_000,
+    "trains": 300,
+    "crew": 600,
+    "journeys": 20_000,
+    "users": 200,
+    "orders": 30_000,
+    "seed": 17,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def postgres_shape(node, depth=0) -> list[str]:
+    """Plan tree as node types, join types, relations and indexes only"""
+    parts = [node["Node Type"]]
+    for key in ("Join Type", "Strategy", "Scan Direction"):
+        if key in node and node[key] not in ("Plain", "Forward"):
+            parts.append(node[key])
+    if "Relation Name" in node:
+        parts.append(f"on {node['Relation Name']}")
+    if "Index Name" in node:
+        parts.append(f"using {node['Index Name']}")
+    lines = ["  " * depth + " ".join(parts)]
+    for child in node.get("Plans", ()):
+        lines.extend(postgres_shape(child, depth + 1))
+    return lines
+
+
+def postgres_buffers(node) -> int:
+    return (
+        node.get("Shared Hit Blocks", 0)
+        + node.get("Shared Read Blocks", 0)
+        + sum(map(postgres_buffers, node.get("Plans", ())))
+    )
+
+
+def sqlite_shape(plan: str) -> list[str]:
+    """EXPLAIN QUERY PLAN rows (id, parent, -, detail) as an indented tree"""
+    depths, lines = {"0": -1}, []
+    for row in plan.splitlines():
+        node_id, parent, _, detail = row.split(" ", 3)
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append("  " * depths[node_id] + detail)
+    return lines
+
+
+def explain(queryset) -> dict:
+    sql, params = queryset.query.sql_with_params()
+    return explain_sql(sql, params)
+
+
+def explain_sql(sql: str, params) -> dict:
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS) {sql}", params
+            )
+            result = cursor.fetchone()[0]
+        else:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            result = cursor.fetchall()
+    sql = normalize_sql(sql)
+    if connection.vendor == "postgresql":
+        (plan,) = json.loads(result) if isinstance(result, str) else result
+        return {
+            "shape": postgres_shape(plan["Plan"]),
+            "cost": plan["Plan"]["Total Cost"],
+            "buffers": postgres_buffers(plan["Plan"]),
+            "time_ms": plan.get("Execution Time"),
+            "sql": sql,
+        }
+    return {
+        "shape": sqlite_shape(
+            "\n".join(" ".join(map(str, row)) for row in result)
+        ),
+        "cost": None,
+        "buffers": None,
+        "time_ms": None,
+        "sql": sql,
+    }
+
+
+def prefetch_queries(queryset) -> list[tuple[str, object]]:
+    """(sql, params) of the prefetch_related queries run for the rows
+    of queryset, after its own query"""
+    if not queryset._prefetch_related_lookups:
+        return []
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        list(queryset._chain())
+    return queries[1:]
+
+
+def prefetch_name(sql: str) -> str:
+    match = re.search(r'FROM "?(\w+)"?', sql)
+    return match.group(1) if match else "query"
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the canonical querysets of JourneyViewSet, OrderViewSet "
+        "and TicketViewSet and compare normalized plans and costs with "
+        "stored snapshots. Fails on plan shape changes and cost blowups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--snapshot-file", default=SNAPSHOT_FILE)
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Store the current plans as the new snapshots",
+        )
+        parser.add_argument(
+            "--cost-threshold",
+            type=float,
+            default=1.5,
+            help="Fail when a plan's total cost grows by this factor",
+        )
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Run against a generate_dataset dataset seeded in a rolled "
+            "back transaction instead of the current data",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["seed"]:
+                    self.seed()
+                plans = {}
+                for name, queryset in self.cases().items():
+                    plans[name] = explain(queryset)
+                    for sql, params in prefetch_queries(queryset):
+                        plans[
+                            f"{name}.prefetch.{prefetch_name(sql)}"
+                        ] = explain_sql(sql, params)
+                raise Rollback
+        except Rollback:
+            pass
+        if options["seed"]:
+            self.vacuum()
+
+        path = options["snapshot_file"]
+        snapshots = self.load(path)
+        stored = snapshots.get(connection.vendor, {})
+        failures = []
+        for name, plan in plans.items():
+            failures += self.compare(
+                name,
+                stored.get(name),
+                plan,
+                options["cost_threshold"],
+                options["update"],
+            )
+
+        if options["update"]:
+            snapshots[connection.vendor] = plans
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as snapshot_file:
+                json.dump(snapshots, snapshot_file, indent=2, sort_keys=True)
+                snapshot_file.write("\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Snapshots written to {path}")
+            )
+        elif failures:
+            raise CommandError(
+                f"{len(failures)} plan regression(s): " + "; ".join(failures)
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Plans match the snapshots."))
+
+    def seed(self):
+        self.stdout.write("Seeding dataset...")
+        call_command("generate_dataset", **SEED_DATASET, stdout=io.StringIO())
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    @staticmethod
+    def vacuum():
+        """Reclaim the rolled back seed rows on PostgreSQL; left in
+        place, their pages would inflate the costs of every later run"""
+        if connection.vendor != "postgresql":
+            return
+        tables = [
+            model._meta.db_table
+            for model in apps.get_models(include_auto_created=True)
+            if model._meta.app_label == "station_app"
+            or model is get_user_model()
+        ]
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(
+                    f"VACUUM ANALYZE {connection.ops.quote_name(table)}"
+                )
+
+    @staticmethod
+    def load(path) -> dict:
+        try:
+            with open(path) as snapshot_file:
+                return json.load(snapshot_file)
+        except FileNotFoundError:
+            return {}
+
+    def view(self, viewset_class, action, user, query=None, pk=None):
+        """A viewset set up as it would be for a request"""
+        request = APIRequestFactory().get("/", query or {})
+        view = viewset_class(
+            request=Request(request),
+            action=action,
+            format_kwarg=None,
+            args=(),
+            kwargs={"pk": pk} if pk else {},
+        )
+        view.request.user = user
+        return view
+
+    def page(self, viewset_class, user, query=None):
+        view = self.view(viewset_class, "list", user, query)
+        queryset = view.filter_queryset(view.get_queryset())
+        if view.use_keyset_pagination():
+            queryset = queryset.order_by(view.keyset_ordering)
+        return queryset[: view.paginator.page_size]
+
+    def detail(self, viewset_class, user, pk):
+        view = self.view(viewset_class, "retrieve", user, pk=pk)
+        return view.filter_queryset(view.get_queryset()).filter(pk=pk)
+
+    def cases(self) -> dict:
+        """Canonical querysets with representative parameters"""
+        journey = (
+            Journey.objects.select_related("route__source")
+            .filter(departure_time__gt=timezone.now())
+            .order_by("-seats_taken", "id")
+            .first()
+        )
+        user = (
+            get_user_model()
+            .objects.annotate(order_count=Count("orders"))
+            .order_by("-order_count", "id")
+            .first()
+        )
+        if journey is None or user is None:
+            raise CommandError("No data to explain, use --seed")
+        order = user.orders.order_by("-id").first()
+        search = {
+            "source": journey.route.source.name,
+            "departure-date": timezone.localtime(
+                journey.departure_time
+            ).date(),
+        }
+        return {
+            "journeys.list": self.page(JourneyViewSet, user),
+            "journeys.list.search": self.page(JourneyViewSet, user, search),
+            "journeys.list.cursor": self.page(
+                JourneyViewSet, user, {"pagination": "cursor"}
+            ),
+            "journeys.retrieve": self.detail(JourneyViewSet, user, journey.pk),
+            "orders.list": self.page(OrderViewSet, user),
+            "orders.retrieve": self.detail(
+                OrderViewSet, user, order.pk if order else 0
+            ),
+            "tickets.list": self.page(TicketViewSet, user),
+        }
+
+    def compare(self, name, stored, plan, threshold, update) -> list[str]:
+        if stored is None:
+            # without a snapshot there is nothing to guard the plan with
+            if update:
+                self.stdout.write(f"{name}: new")
+                return []
+            self.stdout.write(self.style.ERROR(f"{name}: no snapshot"))
+            return [f"{name}: no snapshot, record one with --update"]
+        failures = []
+        if stored["shape"] != plan["shape"]:
+            failures.append(f"{name}: plan shape changed")
+            self.stdout.write(self.style.ERROR(f"{name}: plan shape changed"))
+            self.stdout.write(
+                "  before:\n    " + "\n    ".join(stored["shape"])
+            )
+            self.stdout.write("  after:\n    " + "\n    ".join(plan["shape"]))
+        if stored["cost"] and plan["cost"]:
+            ratio = plan["cost"] / stored["cost"]
+            if ratio > threshold:
+                failures.append(f"{name}: cost x{ratio:.2f}")
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"{name}: cost {stored['cost']} -> {plan['cost']}"
+                    )
+                )
+        if stored["sql"] != plan["sql"]:
+            self.stdout.write(self.style.WARNING(f"{name}: SQL changed"))
+        if not failures:
+            self.stdout.write(f"{name}: ok")
+        return failures
@@ -0,0 +1,317 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from station_app.cache import bump_versions
+from station_app.geo import station_geo_index
+from station_app.models import (
+    Crew,
+    Journey,
+    Order,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+)
+from station_app.occupancy import manual_sync, rebuild_seat_maps
+from station_app.planner import connection_planner
+from station_app.search import station_search
+
+BENCHMARK_PASSWORD = "benchmark"
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """Popularity by rank, a few hot items and a long tail"""
+    return [1 / rank**exponent for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a production-sized synthetic dataset: Zipf distributed "
+        "route popularity, so hot routes get more journeys and their "
+        "journeys are close to full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=500)
+        parser.add_argument("--routes", type=int, default=5_000)
+        parser.add_argument("--train-types", type=int, default=10)
+        parser.add_argument("--trains", type=int, default=1_000)
+        parser.add_argument("--crew", type=int, default=2_000)
+        parser.add_argument("--journeys", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--orders", type=int, default=200_000)
+        parser.add_argument(
+            "--max-tickets-per-order",
+            type=int,
+            default=6,
+            help="Order sizes are geometric, most orders have one ticket",
+        )
+        parser.add_argument("--days", type=int, default=60)
+        parser.add_argument("--zipf", type=float, default=1.1)
+        parser.add_argument("--chunk-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete a dataset generated earlier with the same seed",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options["seed"])
+        self.chunk_size = options["chunk_size"]
+        self.prefix = f"Gen{options['seed']}"
+
+        with transaction.atomic():
+            if options["flush"]:
+                self.flush()
+            elif Station.objects.filter(
+                name__startswith=f"{self.prefix} "
+            ).exists():
+                raise CommandError(
+                    f"A dataset with seed {options['seed']} exists, "
+                    "rerun with --flush to replace it"
+                )
+            stations = self.create_stations()
+            routes = self.create_routes(stations)
+            trains = self.create_trains()
+            crew = self.create_crew()
+            journeys = self.create_journeys(routes, trains, crew)
+            users = self.create_users()
+        self.create_orders(journeys, users)
+
+        self.stdout.write("Rebuilding seat maps...")
+        rebuild_seat_maps([journey["id"] for journey in journeys])
+        bump_versions(
+            Station, Route, Train, TrainType, Crew, Journey, Order, Ticket
+        )
+        for index in (station_search, station_geo_index, connection_planner):
+            index.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done, benchmark users: {self.prefix.lower()}-user-N"
+                f"@example.com / {BENCHMARK_PASSWORD}"
+            )
+        )
+
+    def flush(self) -> None:
+        """Delete what an earlier run with this seed generated; routes,
+        journeys, orders and tickets go with their stations and users"""
+        deleted = 0
+        with manual_sync():
+            for queryset in (
+                get_user_model().objects.filter(
+                    email__startswith=f"{self.prefix.lower()}-user-"
+                ),
+                Station.objects.filter(name__startswith=f"{self.prefix} "),
+                Train.objects.filter(name__startswith=f"{self.prefix} "),
+                TrainType.objects.filter(name__startswith=f"{self.prefix} "),
+                Crew.objects.filter(last_name=self.prefix),
+            ):
+                deleted += queryset.delete()[0]
+        self.stdout.write(f"Deleted {deleted} objects of seed {self.prefix}")
+
+    def log(self, model, count):
+        self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+
+    def create_stations(self) -> list[Station]:
+        stations = Station.objects.bulk_create(
+            (
+                Station(
+                    name=f"{self.prefix} station {i}",
+                    latitude=self.random.uniform(44.4, 52.3),
+                    longitude=self.random.uniform(22.1, 40.2),
+                )
+                for i in range(self.options["stations"])
+            ),
+            batch_size=self.chunk_size,
+        )
+        self.log(Station, len(stations))
+        return stations
+
+    def create_routes(self, stations) -> list[Route]:
+        hubs = stations[: max(2, len(stations) // 20)]
+        routes = []
+        for _ in range(self.options["routes"]):
+            # most routes touch a hub station, like real networks
+            source = self.random.choice(
+                hubs if self.random.random() < 0.6 else stations
+            )
+            destination = source
+            while destination == source:
+                destination = self.random.choice(stations)
+            routes.append(
+                Route(
+                    source=source,
+                    destination=destination,
+                    distance=round(self.random.uniform(40, 1400), 2),
+                )
+            )
+        routes = Route.objects.bulk_create(routes, batch_size=self.chunk_size)
+        self.log(Route, len(routes))
+        return routes
+
+    def create_trains(self) -> list[Train]:
+        train_types = TrainType.objects.bulk_create(
+            TrainType(name=f"{self.prefix} type {i}")
+            for i in range(self.options["train_types"])
+        )
+        trains = Train.objects.bulk_create(
+            (
+                Train(
+                    name=f"{self.prefix} train {i}",
+                    carriage_num=self.random.randint(4, 20),
+                    places_in_carriage=self.random.choice((36, 54, 64, 80)),
+                    train_type=self.random.choice(train_types),
+                )
+                for i in range(self.options["trains"])
+            ),
+            batch_size=self.chunk_size,
+        )
+        self.log(Train, len(trains))
+        return trains
+
+    def create_crew(self) -> list[Crew]:
+        crew = Crew.objects.bulk_create(
+            (
+                Crew(first_name=f"Crew {i}", last_name=self.prefix)
+                for i in range(self.options["crew"])
+            ),
+            batch_size=self.chunk_size,
+        )
+        self.log(Crew, len(crew))
+        return crew
+
+    def create_journeys(self, routes, trains, crew) -> list[dict]:
+        """Journeys per route follow route popularity"""
+        weights = zipf_weights(len(routes), self.options["zipf"])
+        cumulative = list(accumulate(weights))
+        start = timezone.now() + timedelta(hours=1)
+        minutes = self.options["days"] * 24 * 60
+        journeys, batch = [], []
+
+        def flush():
+            created = Journey.objects.bulk_create(batch)
+            Journey.crew.through.objects.bulk_create(
+                Journey.crew.through(journey_id=journey.id, crew_id=member.id)
+                for journey in created
+                for member in self.random.sample(crew, k=min(2, len(crew)))
+            )
+            journeys.extend(
+                {
+                    "id": journey.id,
+                    "rank": journey.popularity_rank,
+                    "capacity": journey.train.carriage_num
+                    * journey.train.places_in_carriage,
+                    "places": journey.train.places_in_carriage,
+                }
+                for journey in created
+            )
+            batch.clear()
+
+        for _ in range(self.options["journeys"]):
+            rank = self.random.choices(
+                range(len(routes)), cum_weights=cumulative
+            )[0]
+            route = routes[rank]
+            departure_time = start + timedelta(
+                minutes=self.random.randrange(minutes)
+            )
+            journey = Journey(
+                route=route,
+                train=self.random.choice(trains),
+                departure_time=departure_time,
+                arrival_time=departure_time
+                + timedelta(hours=route.distance / 90 + 0.25),
+            )
+            journey.popularity_rank = rank
+            batch.append(journey)
+            if len(batch) >= self.chunk_size:
+                flush()
+        if batch:
+            flush()
+        self.log(Journey, len(journeys))
+        return journeys
+
+    def create_users(self) -> list:
+        password = make_password(BENCHMARK_PASSWORD)
+        user_model = get_user_model()
+        users = user_model.objects.bulk_create(
+            (
+                user_model(
+                    email=f"{self.prefix.lower()}-user-{i}@example.com",
+                    password=password,
+                )
+                for i in range(self.options["users"])
+            ),
+            batch_size=self.chunk_size,
+        )
+        self.log(user_model, len(users))
+        return users
+
+    def create_orders(self, journeys, users) -> None:
+        """Tickets go to journeys of popular routes first, filling their
+        seats in order; hot journeys end up close to full"""
+        journey_weights = list(
+            accumulate(
+                1 / (journey["rank"] + 1) ** self.options["zipf"]
+                for journey in journeys
+            )
+        )
+        # users ordering is skewed too: some travel a lot
+        user_weights = list(accumulate(zipf_weights(len(users), 0.8)))
+        sold = dict.fromkeys((journey["id"] for journey in journeys), 0)
+        orders_left, tickets_total = self.options["orders"], 0
+
+        orders_total = 0
+
+        while orders_left:
+            size = min(orders_left, self.chunk_size)
+            with transaction.atomic():
+                orders, tickets = [], []
+                for _ in range(size):
+                    user = self.random.choices(
+                        users, cum_weights=user_weights
+                    )[0]
+                    journey = self.random.choices(
+                        journeys, cum_weights=journey_weights
+                    )[0]
+                    party = 1
+                    while (
+                        party < self.options["max_tickets_per_order"]
+                        and self.random.random() < 0.35
+                    ):
+                        party += 1
+                    party = min(
+                        party, journey["capacity"] - sold[journey["id"]]
+                    )
+                    if not party:  # journey sold out, skip the order
+                        continue
+                    order = Order(user=user)
+                    orders.append(order)
+                    for _ in range(party):
+                        seat_index = sold[journey["id"]]
+                        sold[journey["id"]] += 1
+                        tickets.append(
+                            Ticket(
+                                order=order,
+                                journey_id=journey["id"],
+                                carriage=seat_index // journey["places"] + 1,
+                                seat=seat_index % journey["places"] + 1,
+                            )
+                        )
+                Order.objects.bulk_create(orders, batch_size=self.chunk_size)
+                Ticket.objects.bulk_create(tickets, batch_size=self.chunk_size)
+            orders_total += len(orders)
+            tickets_total += len(tickets)
+            orders_left -= size
+        self.log(Order, orders_total)
+        self.log(Ticket, tickets_total)
@@ -0,0 +1,329 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from station_app.cache import bump_versions
+from station_app.geo import station_geo_index
+from station_app.models import Ticket
+from station_app.occupancy import rebuild_seat_maps
+from station_app.planner import connection_planner
+from station_app.search import station_search
+
+READ_SIZE = 64 * 1024
+# a decode error this close to the end of the buffer may just be an
+# object cut off by the read, longer than any JSON literal
+TRUNCATION_SLACK = 16
+
+
+def iter_json_array(stream, read_size: int = READ_SIZE):
+    """Yield objects of a top-level JSON array without loading the
+    whole document, memory stays bounded by the largest object"""
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise CommandError("Fixture must be a JSON array")
+                started, position = True, position + 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if not (
+                    error.msg.startswith("Unterminated string")
+                    or error.pos >= len(buffer) - TRUNCATION_SLACK
+                ):
+                    raise CommandError(f"Invalid fixture JSON: {error}")
+            else:
+                position = end
+                yield obj
+                continue
+        chunk = stream.read(read_size)
+        if not chunk:
+            if position < len(buffer) or not started:
+                raise CommandError("Unexpected end of fixture")
+            return
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def dependency_order(models) -> list:
+    """Models sorted so that FK targets are loaded first"""
+    models = list(models)
+    pending = {
+        model: {
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.many_to_one and field.related_model in models
+        }
+        - {model}
+        for model in models
+    }
+    ordered = []
+    while pending:
+        ready = [model for model, deps in pending.items() if not deps]
+        if not ready:  # dependency cycle, load what is left as given
+            ready = list(pending)
+        for model in ready:
+            ordered.append(model)
+            del pending[model]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return ordered
+
+
+class ManyToManySpool:
+    """(pk, related pk) pairs of many-to-many fields spooled to one
+    file per field, read back once the models are loaded"""
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+        self.files = {}
+
+    def add(self, field, pk, related_pks) -> None:
+        if field not in self.files:
+            self.files[field] = open(
+                os.path.join(
+                    self.spool_dir,
+                    f"{field.model._meta.label_lower}.{field.name}.jsonl",
+                ),
+                "w+",
+            )
+        self.files[field].writelines(
+            json.dumps([pk, related_pk], default=str) + "\n"
+            for related_pk in related_pks
+        )
+
+    def items(self):
+        for field, spool in self.files.items():
+            spool.seek(0)
+            yield field, (tuple(json.loads(line)) for line in spool)
+
+    def close(self) -> None:
+        for spool in self.files.values():
+            spool.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load Django JSON fixtures with bounded memory: files are stream "
+        "parsed, models loaded in dependency order, validated in batches "
+        "and written with bulk inserts, all in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixtures", nargs="+")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--no-validate",
+            action="store_true",
+            help="Skip field and foreign key validation",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.using = options["database"]
+        self.chunk_size = options["chunk_size"]
+        self.validate = not options["no_validate"]
+        self.ticket_journeys = set()
+
+        with tempfile.TemporaryDirectory() as spool_dir:
+            spools = self.spool(options["fixtures"], spool_dir)
+            many_to_many = ManyToManySpool(spool_dir)
+            try:
+                with transaction.atomic(using=self.using):
+                    for model in dependency_order(spools):
+                        count = self.load_model(
+                            model, spools[model], many_to_many
+                        )
+                        self.stdout.write(
+                            f"{model._meta.label}: {count} objects"
+                        )
+                    self.load_many_to_many(many_to_many)
+                    self.after_load(list(spools))
+            finally:
+                many_to_many.close()
+
+        self.stdout.write(self.style.SUCCESS("Fixtures loaded."))
+
+    def spool(self, fixtures, spool_dir) -> dict:
+        """Split fixture objects into one JSON lines file per model"""
+        paths, files = {}, {}
+        try:
+            for fixture in fixtures:
+                with open(fixture, encoding="utf-8") as stream:
+                    for obj in iter_json_array(stream):
+                        try:
+                            model = apps.get_model(obj["model"])
+                        except (KeyError, LookupError, ValueError):
+                            raise CommandError(
+                                f"{fixture}: invalid model in {obj!r:.200}"
+                            )
+                        if model not in files:
+                            paths[model] = os.path.join(
+                                spool_dir, f"{model._meta.label_lower}.jsonl"
+                            )
+                            files[model] = open(paths[model], "w")
+                        files[model].write(json.dumps(obj) + "\n")
+        finally:
+            for spool_file in files.values():
+                spool_file.close()
+        return paths
+
+    def build(self, model, obj, many_to_many):
+        instance = model()
+        if "pk" in obj:
+            instance.pk = model._meta.pk.to_python(obj["pk"])
+        for name, value in obj.get("fields", {}).items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                if instance.pk is None:
+                    raise CommandError(
+                        f"{model._meta.label}: many-to-many values need a pk"
+                    )
+                many_to_many.add(field, instance.pk, value)
+            elif field.many_to_one or field.one_to_one:
+                setattr(
+                    instance,
+                    field.attname,
+                    None
+                    if value is None
+                    else field.target_field.to_python(value),
+                )
+            else:
+                try:
+                    value = field.to_python(value)
+                except ValidationError as error:
+                    raise CommandError(
+                        f"{model._meta.label} pk={instance.pk}: "
+                        f"{name}: {error}"
+                    )
+                if (
+                    isinstance(value, datetime)
+                    and settings.USE_TZ
+                    and timezone.is_naive(value)
+                ):
+                    value = timezone.make_aware(value)
+                setattr(instance, field.attname, value)
+        return instance
+
+    def check_batch(self, model, batch):
+        """Validate fields and foreign keys of a batch, with one query
+        per foreign key. Like loaddata, model clean() isn't run: it may
+        reject valid stored data, such as journeys already departed."""
+        for field in model._meta.concrete_fields:
+            if not (field.many_to_one or field.one_to_one):
+                continue
+            ids = {
+                getattr(instance, field.attname)
+                for instance in batch
+                if getattr(instance, field.attname) is not None
+            }
+            related = (
+                field.related_model._base_manager.using(self.using)
+                .select_related()
+                .in_bulk(ids)
+            )
+            for instance in batch:
+                related_id = getattr(instance, field.attname)
+                if related_id is None:
+                    continue
+                if related_id not in related:
+                    raise CommandError(
+                        f"{model._meta.label} pk={instance.pk}: "
+                        f"{field.name}={related_id} does not exist"
+                    )
+                setattr(instance, field.name, related[related_id])
+
+        fk_names = [
+            field.name
+            for field in model._meta.concrete_fields
+            if field.many_to_one or field.one_to_one
+        ]
+        for instance in batch:
+            try:
+                instance.clean_fields(exclude=fk_names)
+            except ValidationError as error:
+                raise CommandError(
+                    f"{model._meta.label} pk={instance.pk}: {error}"
+                )
+
+    def insert(self, model, batch):
+        """Insert as loaddata does (raw): keep given pks and auto_now
+        values, no save() or signals"""
+        with_pk = [instance for instance in batch if instance.pk is not None]
+        without_pk = [instance for instance in batch if instance.pk is None]
+        manager = model._base_manager.using(self.using)
+        if with_pk:
+            fields = model._meta.local_concrete_fields
+            connection = connections[self.using]
+            size = connection.ops.bulk_batch_size(fields, with_pk) or len(
+                with_pk
+            )
+            for start in range(0, len(with_pk), size):
+                manager._insert(
+                    with_pk[start : start + size],
+                    fields=fields,
+                    using=self.using,
+                    raw=True,
+                )
+        if without_pk:
+            manager.bulk_create(without_pk, batch_size=self.chunk_size)
+
+    def load_model(self, model, path, many_to_many) -> int:
+        count = 0
+        with open(path) as spool:
+            lines = (json.loads(line) for line in spool)
+            while batch := [
+                self.build(model, obj, many_to_many)
+                for obj in islice(lines, self.chunk_size)
+            ]:
+                if self.validate:
+                    self.check_batch(model, batch)
+                self.insert(model, batch)
+                count += len(batch)
+                if model is Ticket:
+                    self.ticket_journeys.update(
+                        ticket.journey_id for ticket in batch
+                    )
+        return count
+
+    def load_many_to_many(self, many_to_many):
+        for field, pairs in many_to_many.items():
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            manager = through._base_manager.using(self.using)
+            while batch := [
+                through(**{f"{source}_id": pk, f"{target}_id": related})
+                for pk, related in islice(pairs, self.chunk_size)
+            ]:
+                manager.bulk_create(batch, ignore_conflicts=True)
+
+    def after_load(self, models):
+        connection = connections[self.using]
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+        if self.ticket_journeys:
+            rebuild_seat_maps(self.ticket_journeys)
+        bump_versions(*models)
+        for index in (station_search, station_geo_index, connection_planner):
+            index.invalidate()
@@ -0,0 +1,231 @@
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station_app.models import Journey, Ticket
+from station_app.stats import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Flash sale load test: a pool of threads orders seats of one "
+        "journey on a running server as fast as possible. Reports "
+        "throughput, latency percentiles and statuses, then checks that "
+        "no seat was sold twice and the seat map matches the tickets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--journey",
+            type=int,
+            help="Journey to sell, defaults to the upcoming journey with "
+            "the most free seats",
+        )
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--seats",
+            type=int,
+            default=2,
+            help="Seats per order",
+        )
+        parser.add_argument(
+            "--hot-seats",
+            type=float,
+            default=0.2,
+            help="Share of the free seats every order picks from, lower "
+            "values make orders collide more",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=50,
+            help="Existing users the orders are spread over",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="Write the report as JSON")
+
+    def handle(self, *args, **options):
+        self.base_url = urlsplit(options["base_url"])
+        if self.base_url.scheme not in ("http", "https"):
+            raise CommandError("--base-url must be an http(s) URL")
+        self.timeout = options["timeout"]
+        self.connections = threading.local()
+
+        journey = self.journey(options["journey"])
+        tokens = [
+            str(AccessToken.for_user(user))
+            for user in get_user_model().objects.order_by("id")[
+                : options["users"]
+            ]
+        ]
+        if not tokens:
+            raise CommandError("No users, run generate_dataset first")
+        free = list(journey.seat_map.free())
+        hot_count = int(len(free) * options["hot_seats"])
+        hot = free[: max(options["seats"], hot_count)]
+        if len(hot) < options["seats"]:
+            raise CommandError(f"Journey {journey.id} is sold out")
+
+        rng = random.Random(options["seed"])
+        orders = [
+            (
+                rng.choice(tokens),
+                {
+                    "tickets": [
+                        {"journey": journey.id, "carriage": c, "seat": s}
+                        for c, s in rng.sample(hot, options["seats"])
+                    ]
+                },
+            )
+            for _ in range(options["requests"])
+        ]
+        tickets_before = Ticket.objects.filter(journey=journey).count()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            results = list(pool.map(lambda order: self.send(*order), orders))
+        elapsed = time.perf_counter() - start
+
+        report = self.report(results, elapsed, options)
+        report["journey"] = journey.id
+        report["tickets_sold"] = (
+            Ticket.objects.filter(journey=journey).count() - tickets_before
+        )
+        report["consistent"] = self.verify(journey)
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+        if not report["consistent"]:
+            raise CommandError("Seats sold twice or seat map out of sync")
+
+    @staticmethod
+    def journey(journey_id) -> Journey:
+        journeys = Journey.objects.select_related("train")
+        if journey_id is not None:
+            try:
+                return journeys.get(pk=journey_id)
+            except Journey.DoesNotExist:
+                raise CommandError(f"No journey {journey_id}")
+        journey = (
+            journeys.filter(departure_time__gt=timezone.now())
+            .order_by("seats_taken", "id")
+            .first()
+        )
+        if journey is None:
+            raise CommandError("No journeys, run generate_dataset first")
+        return journey
+
+    def send(self, token, body) -> dict:
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        url = self.base_url.path.rstrip("/") + reverse(
+            "station_app:orders-list"
+        )
+        sent = time.perf_counter()
+        try:
+            connection = self.connection()
+            connection.request("POST", url, json.dumps(body), headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as error:
+            self.connections.connection = None  # reconnect next time
+            status = type(error).__name__
+        else:
+            status = response.status
+        return {
+            "status": status,
+            "latency_ms": (time.perf_counter() - sent) * 1000,
+        }
+
+    def connection(self) -> http.client.HTTPConnection:
+        """Keep-alive connection of the current worker thread"""
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            connection_class = (
+                http.client.HTTPSConnection
+                if self.base_url.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = self.connections.connection = connection_class(
+                self.base_url.netloc, timeout=self.timeout
+            )
+        return connection
+
+    @staticmethod
+    def verify(journey) -> bool:
+        tickets = Ticket.objects.filter(journey=journey)
+        sold_twice = (
+            tickets.values("carriage", "seat")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .exists()
+        )
+        journey = Journey.objects.select_related("train").get(pk=journey.pk)
+        return not sold_twice and set(journey.seat_map.taken()) == set(
+            tickets.values_list("carriage", "seat")
+        )
+
+    @staticmethod
+    def report(results, elapsed, options) -> dict:
+        statuses = Counter(str(result["status"]) for result in results)
+        return {
+            "requests": len(results),
+            "concurrency": options["concurrency"],
+            "seats_per_order": options["seats"],
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(results) / elapsed, 2),
+            "booked": statuses.get("201", 0),
+            "rejected": statuses.get("400", 0),
+            "errors": sum(
+                count
+                for status, count in statuses.items()
+                if not status.isdigit() or int(status) >= 500
+            ),
+            "latency_ms": summarize([r["latency_ms"] for r in results]),
+            "statuses": dict(statuses),
+        }
+
+    def print_report(self, report):
+        latency = report["latency_ms"]
+        self.stdout.write(
+            f"{report['requests']} orders for journey {report['journey']} "
+            f"in {report['elapsed_s']} s, {report['throughput_rps']} req/s "
+            f"with {report['concurrency']} threads"
+        )
+        self.stdout.write(
+            f"booked {report['booked']}, rejected {report['rejected']}, "
+            f"errors {report['errors']}, tickets sold "
+            f"{report['tickets_sold']}"
+        )
+        self.stdout.write(
+            f"latency p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+            f"p99 {latency['p99']} ms"
+        )
+        style = (
+            self.style.SUCCESS if report["consistent"] else self.style.ERROR
+        )
+        self.stdout.write(
+            style(
+                "seat map consistent"
+                if report["consistent"]
+                else "seat map inconsistent"
+            )
+        )
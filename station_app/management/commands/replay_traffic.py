@@ -0,0 +1,261 @@
+import http.client
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station_app.stats import summarize
+from station_app.traffic import capture_settings
+
+UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+IDS = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint(record) -> str:
+    """Method and path with ids folded: GET /journeys/{id}/"""
+    return f"{record['method']} {IDS.sub('/{id}', record['path'])}"
+
+
+def load_capture(path, read_only: bool, limit: int | None) -> list[dict]:
+    records = []
+    try:
+        with open(path, encoding="utf-8") as capture:
+            for number, line in enumerate(capture, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise CommandError(f"{path}:{number}: invalid JSON")
+                if "method" not in record or "path" not in record:
+                    continue  # not a captured request
+                if read_only and record["method"] in UNSAFE_METHODS:
+                    continue
+                records.append(record)
+                if limit and len(records) >= limit:
+                    break
+    except FileNotFoundError:
+        raise CommandError(f"No capture at {path}")
+    return records
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay captured API traffic (see TrafficCaptureMiddleware) against "
+        "a running server with a pool of threads and report throughput, "
+        "latency percentiles and error rates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "capture",
+            nargs="?",
+            help="Capture file, defaults to the capture middleware's PATH",
+        )
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--speed",
+            type=float,
+            default=0,
+            help="Keep the captured request pacing, sped up by this "
+            "factor; 0 sends requests as fast as possible",
+        )
+        parser.add_argument("--limit", type=int)
+        parser.add_argument(
+            "--read-only",
+            action="store_true",
+            help="Skip POST, PUT, PATCH and DELETE requests",
+        )
+        parser.add_argument(
+            "--as-user",
+            help="Email of the user every request is sent as, by default "
+            "requests are sent as their captured user",
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="Write the report as JSON")
+
+    def handle(self, *args, **options):
+        path = options["capture"] or capture_settings()["PATH"]
+        records = load_capture(path, options["read_only"], options["limit"])
+        if not records:
+            raise CommandError(f"No requests to replay in {path}")
+
+        self.base_url = urlsplit(options["base_url"])
+        if self.base_url.scheme not in ("http", "https"):
+            raise CommandError("--base-url must be an http(s) URL")
+        self.timeout = options["timeout"]
+        self.tokens = self.issue_tokens(records, options["as_user"])
+        self.connections = threading.local()
+
+        schedule = self.schedule(records, options["speed"])
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            results = list(
+                pool.map(
+                    lambda item: self.send(start, *item),
+                    zip(schedule, records),
+                )
+            )
+        elapsed = time.perf_counter() - start
+
+        report = self.report(results, elapsed, options["concurrency"])
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+
+    def issue_tokens(self, records, as_user) -> dict:
+        """Access tokens per captured user id, minted locally"""
+        users = get_user_model().objects
+        if as_user:
+            try:
+                user = users.get(email=as_user)
+            except users.model.DoesNotExist:
+                raise CommandError(f"No user {as_user}")
+            token = str(AccessToken.for_user(user))
+            return defaultdict(lambda: token)
+        user_ids = {record.get("user_id") for record in records} - {None}
+        return defaultdict(
+            lambda: None,
+            {
+                user.pk: str(AccessToken.for_user(user))
+                for user in users.filter(pk__in=user_ids)
+            },
+        )
+
+    @staticmethod
+    def schedule(records, speed) -> list[float]:
+        """Send offset in seconds of every request"""
+        if not speed:
+            return [0.0] * len(records)
+        times = [
+            datetime.fromisoformat(record["timestamp"]).timestamp()
+            for record in records
+        ]
+        first = min(times)
+        return [(moment - first) / speed for moment in times]
+
+    def send(self, start, offset, record) -> dict:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        headers = {}
+        if token := self.tokens[record.get("user_id")]:
+            headers["Authorization"] = f"Bearer {token}"
+        body = None
+        if record.get("body") is not None:
+            body = json.dumps(record["body"]).encode()
+            headers["Content-Type"] = "application/json"
+        url = self.base_url.path.rstrip("/") + record["path"]
+        if record.get("query"):
+            url += "?" + record["query"]
+
+        sent = time.perf_counter()
+        try:
+            connection = self.connection()
+            connection.request(record["method"], url, body, headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as error:
+            self.connections.connection = None  # reconnect next time
+            status = type(error).__name__
+        else:
+            status = response.status
+        return {
+            "endpoint": endpoint(record),
+            "status": status,
+            "captured_status": record.get("status"),
+            "latency_ms": (time.perf_counter() - sent) * 1000,
+        }
+
+    def connection(self) -> http.client.HTTPConnection:
+        """Keep-alive connection of the current worker thread"""
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            connection_class = (
+                http.client.HTTPSConnection
+                if self.base_url.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = self.connections.connection = connection_class(
+                self.base_url.netloc, timeout=self.timeout
+            )
+        return connection
+
+    @staticmethod
+    def report(results, elapsed, concurrency) -> dict:
+        def is_error(result):
+            return not isinstance(result["status"], int) or (
+                result["status"] >= 500
+            )
+
+        by_endpoint = defaultdict(list)
+        for result in results:
+            by_endpoint[result["endpoint"]].append(result)
+        return {
+            "requests": len(results),
+            "concurrency": concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(results) / elapsed, 2),
+            "latency_ms": summarize([r["latency_ms"] for r in results]),
+            "error_rate": round(sum(map(is_error, results)) / len(results), 4),
+            "status_mismatch_rate": round(
+                sum(
+                    r["status"] != r["captured_status"]
+                    for r in results
+                    if r["captured_status"] is not None
+                )
+                / len(results),
+                4,
+            ),
+            "statuses": dict(
+                Counter(str(result["status"]) for result in results)
+            ),
+            "endpoints": {
+                name: {
+                    "latency_ms": summarize(
+                        [r["latency_ms"] for r in endpoint_results]
+                    ),
+                    "error_rate": round(
+                        sum(map(is_error, endpoint_results))
+                        / len(endpoint_results),
+                        4,
+                    ),
+                }
+                for name, endpoint_results in sorted(by_endpoint.items())
+            },
+        }
+
+    def print_report(self, report):
+        latency = report["latency_ms"]
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']} s, "
+            f"{report['throughput_rps']} req/s with "
+            f"{report['concurrency']} threads"
+        )
+        self.stdout.write(
+            f"latency p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+            f"p99 {latency['p99']} ms"
+        )
+        self.stdout.write(
+            f"errors {report['error_rate']:.2%}, status differs from "
+            f"capture {report['status_mismatch_rate']:.2%}, "
+            f"statuses {report['statuses']}"
+        )
+        for name, stats in report["endpoints"].items():
+            self.stdout.write(
+                f"  {name:50} n={stats['latency_ms']['count']:<6} "
+                f"p50 {stats['latency_ms']['p50']:>9} ms  "
+                f"p95 {stats['latency_ms']['p95']:>9} ms  "
+                f"errors {stats['error_rate']:.2%}"
+            )
@@ -0,0 +1,413 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import cache
+from typing import Iterator, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .profiling import is_admin
+
+DEFAULTS = {
+    "ENABLED": True,
+    # shared by all worker processes of a deployment, one file each
+    "DIR": os.path.join(tempfile.gettempdir(), "station_app_metrics"),
+    # bearer token the scraper must send; without one only admins can
+    # read /metrics/, unless PUBLIC opens it (local development only)
+    "TOKEN": None,
+    "PUBLIC": False,
+}
+
+PREFIX = "station_app"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = tuple(256 * 4**power for power in range(8))  # 256B..4MB
+
+
+class Histogram(NamedTuple):
+    help: str
+    buckets: tuple
+
+
+HISTOGRAMS = {
+    "request_duration_seconds": Histogram(
+        "Request latency by viewset action", LATENCY_BUCKETS
+    ),
+    "db_duration_seconds": Histogram(
+        "Time spent in SQL queries per request", LATENCY_BUCKETS
+    ),
+    "serializer_duration_seconds": Histogram(
+        "Time spent serializing and validating per request, "
+        "without queries run meanwhile",
+        LATENCY_BUCKETS,
+    ),
+    "response_size_bytes": Histogram(
+        "Response body size by viewset action", SIZE_BUCKETS
+    ),
+}
+
+
+def metrics_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "STATION_APP_METRICS", {})}
+
+
+HEADER = struct.Struct("<Q")  # bytes used
+KEY_LENGTH = struct.Struct("<I")
+VALUE = struct.Struct("<d")
+
+
+def read_entries(buffer, used: int) -> Iterator[tuple[str, int, float]]:
+    """(key, value offset, value) of every entry of a metrics file"""
+    position = HEADER.size
+    while position < used:
+        (length,) = KEY_LENGTH.unpack_from(buffer, position)
+        key_start = position + KEY_LENGTH.size
+        value_position = padded(key_start + length)
+        key = bytes(buffer[key_start : key_start + length]).decode()
+        yield key, value_position, VALUE.unpack_from(buffer, value_position)[0]
+        position = value_position + VALUE.size
+
+
+def padded(position: int) -> int:
+    return (position + 7) & ~7
+
+
+class MetricsFile:
+    """Memory mapped counters written by the threads of one process.
+
+    Writes are serialized by a lock. Entries are appended as (key
+    length, key, 8-byte aligned double) and the used size in the header
+    is updated last, so readers in other processes never see a
+    half-written entry and need no lock.
+    """
+
+    initial_size = 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size < self.initial_size:
+            os.ftruncate(self._fd, self.initial_size)
+            size = self.initial_size
+        self._map = mmap.mmap(self._fd, size)
+        self._used = HEADER.unpack_from(self._map)[0] or HEADER.size
+        self._positions = {
+            key: value_position
+            for key, value_position, _ in read_entries(self._map, self._used)
+        }
+
+    def add(self, key: str, amount: float) -> None:
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            VALUE.pack_into(
+                self._map,
+                position,
+                VALUE.unpack_from(self._map, position)[0] + amount,
+            )
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode()
+        value_position = padded(self._used + KEY_LENGTH.size + len(encoded))
+        end = value_position + VALUE.size
+        if end > len(self._map):
+            self._grow(end)
+        KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        start = self._used + KEY_LENGTH.size
+        self._map[start : start + len(encoded)] = encoded
+        VALUE.pack_into(self._map, value_position, 0.0)
+        HEADER.pack_into(self._map, 0, end)
+        self._used = end
+        self._positions[key] = value_position
+        return value_position
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def close(self) -> None:
+        with self._lock:
+            self._map.close()
+            os.close(self._fd)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def metrics_file(directory: str) -> MetricsFile:
+    """This process's file, reopened after a fork or a settings change"""
+    global _store
+    store = _store
+    if (
+        store is not None
+        and store.pid == os.getpid()
+        and os.path.dirname(store.path) == directory
+    ):
+        return store
+    with _store_lock:
+        store = _store
+        if (
+            store is None
+            or store.pid != os.getpid()
+            or os.path.dirname(store.path) != directory
+        ):
+            if store is not None and store.pid == os.getpid():
+                store.close()
+            os.makedirs(directory, exist_ok=True)
+            store = _store = MetricsFile(
+                os.path.join(directory, f"{os.getpid()}.db")
+            )
+    return store
+
+
+def observe(store: MetricsFile, name: str, action: str, value: float):
+    bucket = next(
+        (str(le) for le in HISTOGRAMS[name].buckets if value <= le), "+Inf"
+    )
+    store.add(f"{name}\t{action}\t{bucket}", 1)
+    store.add(f"{name}\t{action}\t_sum", value)
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory: str) -> dict[str, float]:
+    """Counters of every file in directory, summed over processes.
+
+    Files of processes that are gone are removed, so the directory
+    doesn't grow with every restart; DIR must not be shared between
+    hosts or pid namespaces.
+    """
+    totals = defaultdict(float)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return totals
+    for name in names:
+        if not name.endswith(".db"):
+            continue
+        # {pid}.db, or {pid}-{thread}.db written by older versions
+        pid = name[: -len(".db")].partition("-")[0]
+        if pid.isdigit() and not is_alive(int(pid)):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            with open(os.path.join(directory, name), "rb") as metrics:
+                buffer = metrics.read()
+        except FileNotFoundError:
+            continue
+        if len(buffer) < HEADER.size:
+            continue
+        used = min(HEADER.unpack_from(buffer)[0], len(buffer))
+        for key, _, value in read_entries(buffer, used):
+            totals[key] += value
+    return totals
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(totals: dict[str, float]) -> str:
+    """Prometheus text exposition format, cumulative buckets"""
+    series = defaultdict(lambda: defaultdict(dict))
+    for key, value in totals.items():
+        name, action, bucket = key.split("\t")
+        series[name][action][bucket] = value
+
+    lines = []
+    for name, histogram in HISTOGRAMS.items():
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {histogram.help}")
+        lines.append(f"# TYPE {metric} histogram")
+        for action, values in sorted(series[name].items()):
+            label = f'action="{escape_label(action)}"'
+            count = 0
+            for bucket in (*map(str, histogram.buckets), "+Inf"):
+                count += values.get(bucket, 0)
+                lines.append(
+                    f'{metric}_bucket{{{label},le="{bucket}"}} {int(count)}'
+                )
+            lines.append(f"{metric}_sum{{{label}}} {values.get('_sum', 0)!r}")
+            lines.append(f"{metric}_count{{{label}}} {int(count)}")
+    return "\n".join(lines) + "\n"
+
+
+@require_GET
+def metrics_view(request):
+    options = metrics_settings()
+    token = options["TOKEN"]
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            return HttpResponseForbidden()
+    elif not options["PUBLIC"] and not is_admin(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render(collect(options["DIR"])),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+class RequestTimings:
+    """Per-request accumulator, also the connections' execute wrapper"""
+
+    def __init__(self):
+        self.action = "unmatched"
+        self.db = 0.0
+        self.serializer = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def action_label(request, view_func) -> str:
+    """basename.action for viewsets (journeys.list), the URL name
+    for other views"""
+    actions = getattr(view_func, "actions", None)
+    basename = getattr(view_func, "initkwargs", {}).get("basename")
+    if actions and basename:
+        method = request.method.lower()
+        return f"{basename}.{actions.get(method, method)}"
+    return request.resolver_match.view_name or view_func.__name__
+
+
+class MetricsMiddleware:
+    """Latency, DB time, serializer time and response size histograms
+    per viewset action, see metrics_view for the scrape endpoint"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = metrics_settings()
+        if not options["ENABLED"]:
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        duration = time.perf_counter() - start
+
+        store = metrics_file(options["DIR"])
+        observe(store, "request_duration_seconds", timings.action, duration)
+        observe(store, "db_duration_seconds", timings.action, timings.db)
+        observe(
+            store,
+            "serializer_duration_seconds",
+            timings.action,
+            timings.serializer,
+        )
+        if not response.streaming:
+            observe(
+                store,
+                "response_size_bytes",
+                timings.action,
+                len(response.content),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if timings := current_timings.get():
+            timings.action = action_label(request, view_func)
+
+
+def timed(method):
+    def wrapper(self, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return method(self, *args, **kwargs)
+        start, db_before = time.perf_counter(), timings.db
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            timings.serializer += (
+                time.perf_counter() - start - (timings.db - db_before)
+            )
+
+    return wrapper
+
+
+@cache
+def timed_serializer(serializer_class):
+    """Subclass adding its representation and validation time to the
+    current request; nested serializers are counted by their parent"""
+    return type(
+        serializer_class.__name__,
+        (serializer_class,),
+        {
+            "__module__": serializer_class.__module__,
+            "__qualname__": serializer_class.__qualname__,
+            "to_representation": timed(serializer_class.to_representation),
+            "run_validation": timed(serializer_class.run_validation),
+        },
+    )
+
+
+class SerializerMetricsMixin:
+    """Feed serializer time of a GenericAPIView into MetricsMiddleware"""
+
+    def get_serializer(self, *args, **kwargs):
+        if getattr(self, "swagger_fake_view", False):
+            # schema generation names components after serializer classes
+            return super().get_serializer(*args, **kwargs)
+        serializer_class = timed_serializer(self.get_serializer_class())
+        kwargs.setdefault("context", self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.6 on 2026-10-17 22:51
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def encode_seats(carriage_num, places_in_carriage, seats):
+    """Seat map bitset as of this migration: seat (carriage, seat) is
+    bit (carriage - 1) * places_in_carriage + (seat - 1)."""
+    bits = bytearray((carriage_num * places_in_carriage + 7) // 8)
+    for carriage, seat in set(seats):
+        if 1 <= carriage <= carriage_num and 1 <= seat <= places_in_carriage:
+            index = (carriage - 1) * places_in_carriage + (seat - 1)
+            bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def fill_seat_maps(apps, schema_editor):
+    Journey = apps.get_model("station_app", "Journey")
+    Ticket = apps.get_model("station_app", "Ticket")
+
+    seats = defaultdict(list)
+    for journey_id, carriage, seat in Ticket.objects.values_list(
+        "journey_id", "carriage", "seat"
+    ).iterator():
+        seats[journey_id].append((carriage, seat))
+
+    journeys = []
+    for journey in Journey.objects.select_related("train").iterator():
+        journey.occupancy = encode_seats(
+            journey.train.carriage_num,
+            journey.train.places_in_carriage,
+            seats[journey.id],
+        )
+        journey.seats_taken = int.from_bytes(
+            journey.occupancy, "big"
+        ).bit_count()
+        journeys.append(journey)
+    Journey.objects.bulk_update(
+        journeys, ("occupancy", "seats_taken"), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("station_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="occupancy",
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="seats_taken",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,9 @@ from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .seatmap import SeatMap
 
 
 class Station(models.Model):
@@ -122,9 +125,37 @@ class Journey(models.Model):
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
     crew = models.ManyToManyField(Crew, related_name="journeys")
+    occupancy = models.BinaryField(default=bytes, editable=False)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-id"]
+        indexes = [
+            models.Index(
+                fields=["departure_time"], name="journey_departure_idx"
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="journey_route_departure_idx",
+            ),
+            models.Index(
+                fields=["train", "departure_time"],
+                name="journey_train_departure_idx",
+            ),
+        ]
+
+    @cached_property
+    def seat_map(self) -> SeatMap:
+        return SeatMap(
+            self.train.carriage_num,
+            self.train.places_in_carriage,
+            self.occupancy,
+        )
+
+    def store_seat_map(self) -> None:
+        """Copy the (possibly mutated) seat_map back to model fields"""
+        self.occupancy = self.seat_map.to_bytes()
+        self.seats_taken = self.seat_map.taken_count
 
     @staticmethod
     def validate_journey_date_times_fields(
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.db import transaction
+
+from .cache import invalidate
+from .models import Journey, Ticket
+from .seatmap import SeatMap
+
+SeatKey = tuple[int, int, int]  # (journey_id, carriage, seat)
+
+REBUILD_CHUNK_SIZE = 500
+
+_manual_sync = ContextVar("manual_sync", default=False)
+
+
+@contextmanager
+def manual_sync():
+    """Suspend signal driven seat map updates while the caller keeps
+    seat maps in step itself (bulk ticket writes)"""
+    token = _manual_sync.set(True)
+    try:
+        yield
+    finally:
+        _manual_sync.reset(token)
+
+
+def signal_sync_enabled() -> bool:
+    return not _manual_sync.get()
+
+
+def lock_journeys(journey_ids: Iterable[int]) -> dict[int, Journey]:
+    """Select journeys (with trains) for update in a stable order.
+
+    Must be called inside a transaction; the returned journeys' seat_map
+    can be mutated and written back with save_seat_maps().
+    """
+    return {
+        journey.id: journey
+        for journey in Journey.objects.select_for_update(of=("self",))
+        .select_related("train")
+        .filter(id__in=set(journey_ids))
+        .order_by("id")
+    }
+
+
+def save_seat_maps(journeys: Iterable[Journey]) -> None:
+    journeys = list(journeys)
+    for journey in journeys:
+        journey.store_seat_map()
+    Journey.objects.bulk_update(journeys, ("occupancy", "seats_taken"))
+    invalidate(Journey)
+
+
+def apply_ticket_changes(
+    taken: Iterable[SeatKey] = (),
+    released: Iterable[SeatKey] = (),
+) -> None:
+    """Keep journeys' seat maps in step with ticket inserts and deletes"""
+    taken, released = list(taken), list(released)
+    if not taken and not released:
+        return
+    with transaction.atomic():
+        journeys = lock_journeys(
+            journey_id for journey_id, _, _ in taken + released
+        )
+        for journey_id, carriage, seat in released:
+            if journey_id in journeys:
+                journeys[journey_id].seat_map.release(carriage, seat)
+        for journey_id, carriage, seat in taken:
+            if journey_id in journeys:
+                journeys[journey_id].seat_map.take(carriage, seat)
+        save_seat_maps(journeys.values())
+
+
+def rebuild_seat_maps(journey_ids: Iterable[int] = None) -> None:
+    """Recompute seat maps from Ticket rows, for all journeys by default"""
+    if journey_ids is None:
+        journey_ids = Journey.objects.values_list("id", flat=True)
+    journey_ids = list(journey_ids)
+    for start in range(0, len(journey_ids), REBUILD_CHUNK_SIZE):
+        chunk = journey_ids[start : start + REBUILD_CHUNK_SIZE]
+        with transaction.atomic():
+            journeys = lock_journeys(chunk)
+            seats = defaultdict(list)
+            for journey_id, carriage, seat in Ticket.objects.filter(
+                journey_id__in=chunk
+            ).values_list("journey_id", "carriage", "seat"):
+                seats[journey_id].append((carriage, seat))
+            for journey in journeys.values():
+                journey.seat_map = SeatMap.from_seats(
+                    journey.train.carriage_num,
+                    journey.train.places_in_carriage,
+                    seats[journey.id],
+                )
+            save_seat_maps(journeys.values())
@@ -0,0 +1,43 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DefaultSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over a unique indexed key: no COUNT(*) and no
+    OFFSET scans, so every page costs the same however deep it is"""
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "-id"
+
+
+class KeysetPaginationMixin:
+    """Serve keyset pages when asked for with ?pagination=cursor.
+
+    Page number pagination stays the default; next/previous links of
+    a keyset page carry both the opaque cursor and the mode parameter.
+    """
+
+    keyset_pagination_class = KeysetPagination
+    keyset_ordering = "-id"
+    pagination_mode_query_param = "pagination"
+
+    def use_keyset_pagination(self) -> bool:
+        query_params = getattr(self.request, "query_params", {})
+        return (
+            query_params.get(self.pagination_mode_query_param) == "cursor"
+            or self.keyset_pagination_class.cursor_query_param in query_params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.use_keyset_pagination():
+            self._paginator = self.keyset_pagination_class()
+            self._paginator.ordering = self.keyset_ordering
+        return super().paginator
@@ -0,0 +1,209 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from django.db.models import F
+
+from .indexes import ReferenceIndex
+from .models import Journey
+
+
+class Connection(NamedTuple):
+    departure_time: datetime
+    arrival_time: datetime
+    source_id: int
+    destination_id: int
+    journey_id: int
+
+    @classmethod
+    def from_journey(cls, journey: Journey) -> "Connection":
+        return cls(
+            journey.departure_time,
+            journey.arrival_time,
+            journey.route.source_id,
+            journey.route.destination_id,
+            journey.id,
+        )
+
+
+class Label(NamedTuple):
+    arrival_time: datetime
+    connection: Connection
+    previous: Optional["Label"]
+
+    def legs(self) -> list[Connection]:
+        legs, label = [], self
+        while label is not None:
+            legs.append(label.connection)
+            label = label.previous
+        return legs[::-1]
+
+
+class Timetable:
+    """Journeys as connections sorted by departure time"""
+
+    def __init__(self, connections=()):
+        self.connections = sorted(connections)
+        self.departures = [
+            connection.departure_time for connection in self.connections
+        ]
+        self.by_journey = {
+            connection.journey_id: connection
+            for connection in self.connections
+        }
+
+    def add(self, connection: Connection) -> None:
+        self.remove(connection.journey_id)
+        index = bisect_left(self.connections, connection)
+        self.connections.insert(index, connection)
+        self.departures.insert(index, connection.departure_time)
+        self.by_journey[connection.journey_id] = connection
+
+    def remove(self, journey_id: int) -> None:
+        connection = self.by_journey.pop(journey_id, None)
+        if connection is None:
+            return
+        index = bisect_left(self.connections, connection)
+        del self.connections[index]
+        del self.departures[index]
+
+    def scan(
+        self,
+        source_id: int,
+        destination_id: int,
+        departure_time: datetime,
+        min_transfer: timedelta,
+        max_changes: int,
+        horizon: timedelta,
+    ) -> list[list[Connection]]:
+        """Connection Scan: earliest arrival at destination for every
+        number of changes up to max_changes.
+
+        Returns the Pareto set of itineraries, each one arriving earlier
+        than any itinerary with fewer changes.
+        """
+        max_legs = max_changes + 1
+        # best[legs][station] is the earliest arrival using exactly legs
+        best = [{} for _ in range(max_legs + 1)]
+        latest_departure = departure_time + horizon
+
+        start = bisect_left(self.departures, departure_time)
+        for connection in self.connections[start:]:
+            direct = best[1].get(destination_id)
+            if connection.departure_time > latest_departure or (
+                direct and connection.departure_time >= direct.arrival_time
+            ):
+                break
+            for legs in range(max_legs, 0, -1):
+                if legs == 1:
+                    previous = None
+                    if connection.source_id != source_id:
+                        continue
+                else:
+                    previous = best[legs - 1].get(connection.source_id)
+                    if (
+                        previous is None
+                        or previous.arrival_time + min_transfer
+                        > connection.departure_time
+                    ):
+                        continue
+                current = best[legs].get(connection.destination_id)
+                if current is None or (
+                    connection.arrival_time < current.arrival_time
+                ):
+                    best[legs][connection.destination_id] = Label(
+                        connection.arrival_time, connection, previous
+                    )
+
+        itineraries, earliest = [], None
+        for legs in range(1, max_legs + 1):
+            label = best[legs].get(destination_id)
+            if label and (earliest is None or label.arrival_time < earliest):
+                earliest = label.arrival_time
+                itineraries.append(label.legs())
+        return itineraries
+
+
+class ConnectionPlanner(ReferenceIndex):
+    """Multi-leg trip search over an in-memory timetable.
+
+    The timetable is built once from Journey rows and kept up to date
+    incrementally by Journey save/delete signals.
+    """
+
+    max_age = 300
+
+    def build(self) -> Timetable:
+        return Timetable(
+            Connection(*row)
+            for row in Journey.objects.order_by().values_list(
+                "departure_time",
+                "arrival_time",
+                "route__source_id",
+                "route__destination_id",
+                "id",
+            )
+        )
+
+    def add_journey(self, journey: Journey) -> None:
+        with self._lock:
+            if (timetable := self._data) is not None:
+                timetable.add(Connection.from_journey(journey))
+
+    def remove_journey(self, journey_id: int) -> None:
+        with self._lock:
+            if (timetable := self._data) is not None:
+                timetable.remove(journey_id)
+
+    def plan(
+        self,
+        source_id: int,
+        destination_id: int,
+        departure_time: datetime,
+        min_transfer: timedelta = timedelta(minutes=15),
+        max_changes: int = 2,
+        limit: int = 3,
+        horizon: timedelta = timedelta(days=2),
+    ) -> list[list[Connection]]:
+        """Up to limit itineraries, repeating the scan after the first
+        departure of the previous results to find later options"""
+        timetable = self.data
+        itineraries, seen = [], set()
+        while len(itineraries) < limit:
+            found = timetable.scan(
+                source_id,
+                destination_id,
+                departure_time,
+                min_transfer,
+                max_changes,
+                horizon,
+            )
+            if not found:
+                break
+            for legs in found:
+                key = tuple(leg.journey_id for leg in legs)
+                if key not in seen:
+                    seen.add(key)
+                    itineraries.append(legs)
+            departure_time = min(
+                legs[0].departure_time for legs in found
+            ) + timedelta(microseconds=1)
+        itineraries = itineraries[:limit]
+        itineraries.sort(key=lambda legs: (legs[-1].arrival_time, len(legs)))
+        return itineraries
+
+
+def tickets_available(journey_ids) -> dict[int, int]:
+    """Free seats per journey read from seat counters, one query"""
+    return dict(
+        Journey.objects.filter(id__in=journey_ids)
+        .order_by()
+        .values_list(
+            "id",
+            F("train__carriage_num") * F("train__places_in_carriage")
+            - F("seats_taken"),
+        )
+    )
+
+
+connection_planner = ConnectionPlanner()
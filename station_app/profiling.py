@@ -0,0 +1,287 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+DEFAULTS = {
+    "DIR": os.path.join(tempfile.gettempdir(), "station_app_profiles"),
+    # oldest profiles are removed past either limit
+    "MAX_PROFILES": 50,
+    "MAX_BYTES": 50 * 1024 * 1024,
+    "SAMPLE_INTERVAL": 0.001,
+    "HEADER": "X-Profile",
+    "QUERY_PARAM": "_profile",
+}
+
+MODES = {"cprofile", "sample"}
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+# file kinds of a stored profile: pstats dump, collapsed stacks for
+# flamegraph.pl/speedscope and a plain text summary
+KINDS = {
+    "prof": "application/octet-stream",
+    "collapsed": "text/plain",
+    "txt": "text/plain",
+}
+
+
+def profiling_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "STATION_APP_PROFILING", {})}
+
+
+class ProfileStore:
+    """Profiles on disk: <id>.json metadata next to one file per kind"""
+
+    def __init__(self, directory: str, max_profiles: int, max_bytes: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_settings(cls) -> "ProfileStore":
+        options = profiling_settings()
+        return cls(
+            options["DIR"], options["MAX_PROFILES"], options["MAX_BYTES"]
+        )
+
+    def path(self, profile_id: str, kind: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id) or kind not in {*KINDS, "json"}:
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.{kind}")
+        return path if os.path.exists(path) else None
+
+    def save(self, meta: dict, files: dict[str, bytes]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {**meta, "files": sorted(files)}
+        for kind, content in files.items():
+            with open(self.file(meta["id"], kind), "wb") as profile_file:
+                profile_file.write(content)
+        # metadata last: a profile is listed once all its files exist
+        with open(self.file(meta["id"], "json"), "w") as meta_file:
+            json.dump(meta, meta_file)
+        self.prune()
+
+    def file(self, profile_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{kind}")
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        path = self.path(profile_id, "json")
+        if path is None:
+            return None
+        try:
+            with open(path) as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    def ids(self) -> list[str]:
+        """Stored profile ids, newest first (ids start with the time)"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            (
+                name[: -len(".json")]
+                for name in names
+                if name.endswith(".json")
+                and PROFILE_ID.match(name[: -len(".json")])
+            ),
+            reverse=True,
+        )
+
+    def list(self) -> list[dict]:
+        return [meta for meta in map(self.get, self.ids()) if meta is not None]
+
+    def delete(self, profile_id: str) -> None:
+        for kind in (*KINDS, "json"):
+            try:
+                os.remove(self.file(profile_id, kind))
+            except FileNotFoundError:
+                pass
+
+    def prune(self) -> None:
+        total = 0
+        for index, profile_id in enumerate(self.ids()):
+            size = sum(
+                os.path.getsize(path)
+                for kind in (*KINDS, "json")
+                if (path := self.path(profile_id, kind))
+            )
+            total += size
+            if index >= self.max_profiles or total > self.max_bytes:
+                self.delete(profile_id)
+
+
+def frame_name(code) -> str:
+    filename = code.co_filename
+    if "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(
+        ";", ":"
+    )
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.items()
+        )
+
+    def summary(self, limit: int = 40) -> str:
+        total = sum(self.stacks.values()) or 1
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        lines = [f"{total} samples every {self.interval * 1000:g} ms", ""]
+        for title, counts in (("self", own), ("inclusive", inclusive)):
+            lines.append(f"Top frames by {title} samples:")
+            lines.extend(
+                f"{count / total:7.1%} {count:6} {frame}"
+                for frame, count in counts.most_common(limit)
+            )
+            lines.append("")
+        return "\n".join(lines)
+
+
+def requested_mode(request, options) -> Optional[str]:
+    value = request.headers.get(options["HEADER"]) or request.GET.get(
+        options["QUERY_PARAM"]
+    )
+    if not value:
+        return None
+    value = value.lower()
+    if value in ("1", "true"):
+        return "cprofile"
+    return value if value in MODES else None
+
+
+def is_admin(request) -> bool:
+    """Authenticate like the API views do, before any view runs"""
+    drf_request = Request(
+        request,
+        authenticators=[
+            authentication()
+            for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    try:
+        return IsAdminUser().has_permission(drf_request, None)
+    except APIException:
+        return False
+
+
+class ProfilingMiddleware:
+    """Profile a single request on demand.
+
+    Admin users send the X-Profile header or the _profile query
+    parameter with "cprofile" (or "1") for a deterministic profile, or
+    "sample" for a low overhead stack sampler whose collapsed stacks
+    feed flamegraphs. The profile id is returned in X-Profile-Id, the
+    profile is served by the profiles admin endpoint. Other users'
+    flags are ignored.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = profiling_settings()
+        mode = requested_mode(request, options)
+        if mode is None or not is_admin(request):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            files = self.cprofile_files(profiler)
+        else:
+            with StackSampler(
+                threading.get_ident(), options["SAMPLE_INTERVAL"]
+            ) as sampler:
+                response = self.get_response(request)
+            files = {
+                "collapsed": sampler.collapsed().encode(),
+                "txt": sampler.summary().encode(),
+            }
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        now = timezone.now()
+        profile_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        ProfileStore.from_settings().save(
+            {
+                "id": profile_id,
+                "created_at": now.isoformat(),
+                "mode": mode,
+                "method": request.method,
+                "path": request.path,
+                "query": request.META.get("QUERY_STRING", ""),
+                "user_id": getattr(request.user, "pk", None),
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 3),
+            },
+            files,
+        )
+        response["X-Profile-Id"] = profile_id
+        return response
+
+    @staticmethod
+    def cprofile_files(profiler) -> dict[str, bytes]:
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(60)
+        return {
+            # what Stats.dump_stats writes, loadable by pstats/snakeviz
+            "prof": marshal.dumps(stats.stats),
+            "txt": summary.getvalue().encode(),
+        }
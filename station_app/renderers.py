@@ -0,0 +1,72 @@
+import math
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = (
+    # datetimes and other types orjson knows natively are rendered by
+    # DRF's encoder instead, so the output doesn't change
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_NON_STR_KEYS
+    if orjson
+    else 0
+)
+
+
+def has_non_finite(data) -> bool:
+    """Whether a NaN or infinite float is anywhere in data"""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(map(has_non_finite, data.values()))
+    if isinstance(data, (list, tuple)):
+        return any(map(has_non_finite, data))
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed.
+
+    Values orjson doesn't handle the way json.dumps does (datetimes,
+    Decimals, lazy strings...) go through DRF's JSONEncoder. Floats are
+    written by orjson: same values, but exponents are spelled
+    differently for magnitudes below 1e-4 or from 1e16 up (0.00001 and
+    1e16 where json.dumps gives 1e-05 and 1e+16). Everything else is
+    byte for byte JSONRenderer's output.
+
+    orjson writes NaN and infinities as null; with STRICT_JSON such
+    payloads are handed to JSONRenderer, which raises as it always did.
+    Indented output (browsable API, ?format=json; indent=4), ASCII
+    output and payloads orjson rejects fall back to JSONRenderer too.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # non-finite floats are among the nulls, if there are any
+        if self.strict and b"null" in ret and has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # escaped like JSONRenderer does, for a strict javascript subset
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
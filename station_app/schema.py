@@ -0,0 +1,17 @@
+from drf_spectacular.plumbing import get_lib_doc_excludes
+
+from .cache import CachedResponseMixin, ConditionalGetMixin
+from .metrics import SerializerMetricsMixin
+from .pagination import KeysetPaginationMixin
+
+
+def doc_excludes() -> list:
+    """Classes whose docstrings must not describe API operations: the
+    view mixins' docs are for developers, not API clients"""
+    return [
+        *get_lib_doc_excludes(),
+        CachedResponseMixin,
+        ConditionalGetMixin,
+        KeysetPaginationMixin,
+        SerializerMetricsMixin,
+    ]
@@ -0,0 +1,74 @@
+from dataclasses import dataclass, field
+
+from .indexes import ReferenceIndex
+from .models import Station
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass
+class StationNames:
+    names: dict[int, str] = field(default_factory=dict)
+    folded: dict[int, str] = field(default_factory=dict)
+    postings: dict[str, set[int]] = field(default_factory=dict)
+
+
+class StationSearchIndex(ReferenceIndex):
+    """Trigram index over station names.
+
+    search() has the semantics of name__icontains: trigrams of the term
+    narrow down candidates, which are then checked for the substring.
+    """
+
+    def build(self) -> StationNames:
+        index = StationNames()
+        for station_id, name in Station.objects.values_list("id", "name"):
+            folded = name.casefold()
+            index.names[station_id] = name
+            index.folded[station_id] = folded
+            for trigram in trigrams(folded):
+                index.postings.setdefault(trigram, set()).add(station_id)
+        return index
+
+    def _candidates(self, index: StationNames, term: str):
+        term_trigrams = trigrams(term)
+        if not term_trigrams:
+            return index.folded.keys()
+        postings = sorted(
+            (index.postings.get(trigram, set()) for trigram in term_trigrams),
+            key=len,
+        )
+        return set.intersection(*postings)
+
+    def search(self, term: str) -> list[int]:
+        """Ids of stations whose name contains term, case-insensitive"""
+        index = self.data
+        term = term.casefold()
+        return [
+            station_id
+            for station_id in self._candidates(index, term)
+            if term in index.folded[station_id]
+        ]
+
+    def autocomplete(self, term: str, limit: int = 10) -> list[dict]:
+        """Matching stations, names starting with term first"""
+        index = self.data
+        folded = term.casefold()
+
+        def rank(station_id):
+            name = index.folded[station_id]
+            if name.startswith(folded):
+                return 0, name
+            if f" {folded}" in name:
+                return 1, name
+            return 2, name
+
+        return [
+            {"id": station_id, "name": index.names[station_id]}
+            for station_id in sorted(self.search(term), key=rank)[:limit]
+        ]
+
+
+station_search = StationSearchIndex()
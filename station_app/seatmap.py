@@ -0,0 +1,199 @@
+from typing import Iterable, Iterator
+
+
+class SeatMap:
+    """Bitset of carriage x seat occupancy of a single journey.
+
+    Seat ``(carriage, seat)`` maps to bit
+    ``(carriage - 1) * places_in_carriage + (seat - 1)``, so the whole
+    map for a train is ``carriage_num * places_in_carriage`` bits.
+    """
+
+    def __init__(
+        self,
+        carriage_num: int,
+        places_in_carriage: int,
+        data: bytes = b"",
+    ) -> None:
+        self.carriage_num = carriage_num
+        self.places_in_carriage = places_in_carriage
+        size = (self.capacity + 7) // 8
+        self.bits = bytearray(bytes(data or b"")[:size]).ljust(size, b"\0")
+
+    @classmethod
+    def from_seats(
+        cls,
+        carriage_num: int,
+        places_in_carriage: int,
+        seats: Iterable[tuple[int, int]],
+    ) -> "SeatMap":
+        seat_map = cls(carriage_num, places_in_carriage)
+        for carriage, seat in seats:
+            seat_map.take(carriage, seat)
+        return seat_map
+
+    @property
+    def capacity(self) -> int:
+        return self.carriage_num * self.places_in_carriage
+
+    @property
+    def taken_count(self) -> int:
+        return int.from_bytes(self.bits, "big").bit_count()
+
+    @property
+    def free_count(self) -> int:
+        return self.capacity - self.taken_count
+
+    def in_range(self, carriage: int, seat: int) -> bool:
+        return (
+            1 <= carriage <= self.carriage_num
+            and 1 <= seat <= self.places_in_carriage
+        )
+
+    def _index(self, carriage: int, seat: int) -> int:
+        return (carriage - 1) * self.places_in_carriage + (seat - 1)
+
+    def is_taken(self, carriage: int, seat: int) -> bool:
+        if not self.in_range(carriage, seat):
+            return False
+        index = self._index(carriage, seat)
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def take(self, carriage: int, seat: int) -> bool:
+        """Mark the seat as taken, return False if it was already taken
+        or lies outside the train."""
+        if not self.in_range(carriage, seat) or self.is_taken(carriage, seat):
+            return False
+        index = self._index(carriage, seat)
+        self.bits[index >> 3] |= 1 << (index & 7)
+        return True
+
+    def release(self, carriage: int, seat: int) -> bool:
+        if not self.is_taken(carriage, seat):
+            return False
+        index = self._index(carriage, seat)
+        self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        return True
+
+    def taken(self) -> Iterator[tuple[int, int]]:
+        """Yield taken seats ordered by carriage and seat."""
+        places = self.places_in_carriage
+        for byte_index, byte in enumerate(self.bits):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    index = (byte_index << 3) + bit
+                    if index >= self.capacity:
+                        return
+                    yield index // places + 1, index % places + 1
+
+    def free(self, carriage: int = None) -> Iterator[tuple[int, int]]:
+        """Yield free seats ordered by carriage and seat, optionally
+        limited to one carriage."""
+        carriages = (
+            range(1, self.carriage_num + 1)
+            if carriage is None
+            else (carriage,)
+        )
+        for carriage_number in carriages:
+            for seat in range(1, self.places_in_carriage + 1):
+                if not self.is_taken(carriage_number, seat):
+                    yield carriage_number, seat
+
+    def carriage_bitmap(self, carriage: int) -> bytes:
+        """Taken bits of one carriage in the map's layout: seat s is bit
+        (s - 1) % 8 of byte (s - 1) // 8."""
+        places = self.places_in_carriage
+        bits = int.from_bytes(self.bits, "little") >> (carriage - 1) * places
+        return (bits & ((1 << places) - 1)).to_bytes(
+            (places + 7) // 8, "little"
+        )
+
+    def taken_runs(self, carriage: int) -> list[tuple[int, int]]:
+        """(first seat, last seat) of every block of adjacent taken
+        seats of a carriage."""
+        runs, first = [], 1
+        for start, length in self.free_runs(carriage):
+            if start > first:
+                runs.append((first, start - 1))
+            first = start + length
+        if first <= self.places_in_carriage:
+            runs.append((first, self.places_in_carriage))
+        return runs
+
+    def free_runs(self, carriage: int) -> list[tuple[int, int]]:
+        """(first seat, length) of every block of adjacent free seats
+        of a carriage."""
+        runs, start = [], None
+        for seat in range(1, self.places_in_carriage + 2):
+            if seat <= self.places_in_carriage and not self.is_taken(
+                carriage, seat
+            ):
+                if start is None:
+                    start = seat
+            elif start is not None:
+                runs.append((start, seat - start))
+                start = None
+        return runs
+
+    def allocate(self, party_size: int) -> list[tuple[int, int]]:
+        """Free seats for a party, seated as close together as possible.
+
+        The smallest block of adjacent free seats that fits the whole
+        party wins, which keeps large blocks for large parties. Failing
+        that the party is split over the largest blocks of the fewest
+        neighbouring carriages, a single carriage first. Empty when
+        fewer than party_size seats are free.
+        """
+        if not 0 < party_size <= self.free_count:
+            return []
+        runs = {
+            carriage: self.free_runs(carriage)
+            for carriage in range(1, self.carriage_num + 1)
+        }
+        fitting = [
+            (length, carriage, start)
+            for carriage, carriage_runs in runs.items()
+            for start, length in carriage_runs
+            if length >= party_size
+        ]
+        if fitting:
+            _, carriage, start = min(fitting)
+            return [
+                (carriage, seat) for seat in range(start, start + party_size)
+            ]
+
+        def fill(carriages) -> list[list[tuple[int, int]]]:
+            """Largest blocks of carriages until the party is seated"""
+            blocks = sorted(
+                (-length, carriage, start)
+                for carriage in carriages
+                for start, length in runs[carriage]
+            )
+            filled, left = [], party_size
+            for length, carriage, start in blocks:
+                if left <= 0:
+                    break
+                count = min(-length, left)
+                filled.append(
+                    [(carriage, seat) for seat in range(start, start + count)]
+                )
+                left -= count
+            return filled if left <= 0 else []
+
+        for width in range(1, self.carriage_num + 1):
+            fills = [
+                filled
+                for first in range(1, self.carriage_num - width + 2)
+                if (filled := fill(range(first, first + width)))
+            ]
+            if fills:
+                # fewest blocks, then the lowest carriages
+                return sorted(
+                    seat for block in min(fills, key=len) for seat in block
+                )
+        return []
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
@@ -1,5 +1,10 @@
+import base64
+import math
+
 from rest_framework import serializers
-from django.db import transaction
+from rest_framework.reverse import reverse
+from rest_framework.validators import UniqueTogetherValidator
+from django.db import IntegrityError, transaction
 
 
 from .models import (
@@ -12,15 +17,22 @@ from .models import (
     Order,
     Ticket,
 )
+from .booking import booking_coordinator, booking_settings
+from .cache import cached
+from .holds import check_holds, hold_settings, release_held
+from .occupancy import lock_journeys, manual_sync, save_seat_maps
+from .sparse import SparseFieldsetMixin
 
 
-class StationSerializer(serializers.ModelSerializer):
+class StationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Station
         fields = ("id", "name", "latitude", "longitude")
 
 
-class StationDetailSerializer(serializers.ModelSerializer):
+class StationDetailSerializer(
+    SparseFieldsetMixin, serializers.ModelSerializer
+):
     # five_departing_source_for = serializers.SerializerMethodField()
     # five_incoming_destination_for = serializers.SerializerMethodField()
 
@@ -52,7 +64,35 @@ class StationDetailSerializer(serializers.ModelSerializer):
         )
 
 
-class RouteSerializer(serializers.ModelSerializer):
+class NearbyStationsSerializer(serializers.Serializer):
+    near = serializers.CharField(help_text="latitude,longitude")
+    radius_km = serializers.FloatField(required=False, min_value=0)
+    k = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+
+    def validate_near(self, value):
+        try:
+            latitude, longitude = map(float, value.split(","))
+        except ValueError:
+            raise serializers.ValidationError(
+                "near must be latitude,longitude (ex. 49.84,24.03)"
+            )
+        if not (math.isfinite(latitude) and -90 <= latitude <= 90):
+            raise serializers.ValidationError(
+                "latitude must be between -90 and 90"
+            )
+        if not (math.isfinite(longitude) and -180 <= longitude <= 180):
+            raise serializers.ValidationError(
+                "longitude must be between -180 and 180"
+            )
+        return latitude, longitude
+
+    def validate_radius_km(self, value):
+        if not math.isfinite(value):
+            raise serializers.ValidationError("radius_km must be finite")
+        return value
+
+
+class RouteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     def validate(self, attrs):
         data = super().validate(attrs=attrs)
         Route.validate_route(
@@ -72,7 +112,7 @@ class RouteSerializer(serializers.ModelSerializer):
         )
 
 
-class CrewSerializer(serializers.ModelSerializer):
+class CrewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Crew
         fields = ("id", "first_name", "last_name")
@@ -90,7 +130,41 @@ class CrewImageSerializer(serializers.ModelSerializer):
         fields = ("id", "profile_image")
 
 
-class TrainSerializer(serializers.ModelSerializer):
+class TemplatedHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """HyperlinkedRelatedField that reverses its view once per serializer
+    and formats every integer pk into the resulting URL template instead
+    of resolving a URL per object"""
+
+    # reverse() with this pk gives the template, other pks are put in
+    # its place; use_templates=False resolves every URL as upstream does
+    PLACEHOLDER = 2_147_483_647
+    use_templates = True
+
+    def url_template(self, view_name, request, format) -> tuple[str, str]:
+        key = (view_name, request, format)
+        if getattr(self, "_url_template_key", None) != key:
+            url = self.reverse(
+                view_name,
+                kwargs={self.lookup_url_kwarg: self.PLACEHOLDER},
+                request=request,
+                format=format,
+            )
+            parts = url.split(str(self.PLACEHOLDER))
+            self._url_template = tuple(parts) if len(parts) == 2 else None
+            self._url_template_key = key
+        return self._url_template
+
+    def get_url(self, obj, view_name, request, format):
+        lookup_value = getattr(obj, self.lookup_field)
+        if not self.use_templates or type(lookup_value) is not int:
+            return super().get_url(obj, view_name, request, format)
+        template = self.url_template(view_name, request, format)
+        if template is None:
+            return super().get_url(obj, view_name, request, format)
+        return f"{template[0]}{lookup_value}{template[1]}"
+
+
+class TrainSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Train
         fields = (
@@ -108,7 +182,7 @@ class TrainListSerializer(TrainSerializer):
 
 
 class TrainDetailSerializer(TrainListSerializer):
-    train_type_link = serializers.HyperlinkedRelatedField(
+    train_type_link = TemplatedHyperlinkedRelatedField(
         source="train_type",
         view_name="station_app:trains-type-detail",
         read_only=True,
@@ -118,7 +192,7 @@ class TrainDetailSerializer(TrainListSerializer):
         fields = TrainSerializer.Meta.fields + ("train_type_link",)
 
 
-class TrainTypeSerializer(serializers.ModelSerializer):
+class TrainTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = TrainType
         fields = ("id", "name")
@@ -132,8 +206,65 @@ class OrderField(serializers.PrimaryKeyRelatedField):
         return Order.objects.filter(user=user)
 
 
-class TicketSerializer(serializers.ModelSerializer):
-    journey = serializers.PrimaryKeyRelatedField(
+class TicketListSerializer(serializers.ListSerializer):
+    """Resolves all referenced journeys with one query and rejects
+    duplicated seats before any ticket hits the database"""
+
+    journeys = None
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            journey_ids = set()
+            for ticket_data in data:
+                try:
+                    journey_ids.add(int(ticket_data.get("journey")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.journeys = Journey.objects.select_related("train").in_bulk(
+                journey_ids
+            )
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        seats = set()
+        for ticket_data in data:
+            seat = (
+                ticket_data["journey"].id,
+                ticket_data["carriage"],
+                ticket_data["seat"],
+            )
+            if seat in seats:
+                raise serializers.ValidationError(
+                    f"seat {seat[2]} in carriage {seat[1]} of journey "
+                    f"{seat[0]} is ordered more than once"
+                )
+            seats.add(seat)
+        return data
+
+
+class JourneyField(serializers.PrimaryKeyRelatedField):
+    """Takes journeys from TicketListSerializer batch when nested in one"""
+
+    def to_internal_value(self, data):
+        journeys = getattr(
+            getattr(self.parent, "parent", None), "journeys", None
+        )
+        if journeys is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            journey = journeys.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if journey is None:
+            self.fail("does_not_exist", pk_value=data)
+        return journey
+
+
+class TicketSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    journey = JourneyField(
         queryset=Journey.objects.select_related(
             "route",
             "route__source",
@@ -146,6 +277,18 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "carriage", "seat", "journey")
+        list_serializer_class = TicketListSerializer
+
+    def get_validators(self):
+        validators = super().get_validators()
+        if isinstance(self.parent, TicketListSerializer):
+            # seat conflicts are checked against the seat maps in bulk
+            return [
+                validator
+                for validator in validators
+                if not isinstance(validator, UniqueTogetherValidator)
+            ]
+        return validators
 
     def validate(self, attrs):
         data = super().validate(attrs=attrs)
@@ -157,6 +300,26 @@ class TicketSerializer(serializers.ModelSerializer):
         )
         return data
 
+    def update(self, instance, validated_data):
+        """A ticket moved to another seat must not land on a seat held
+        by another user; the holds are checked with the journey locked,
+        as orders do"""
+        seat = (
+            validated_data.get("journey", instance.journey).id,
+            validated_data.get("carriage", instance.carriage),
+            validated_data.get("seat", instance.seat),
+        )
+        if seat == (instance.journey_id, instance.carriage, instance.seat):
+            return super().update(instance, validated_data)
+        with transaction.atomic():
+            lock_journeys([seat[0]])
+            holds = check_holds(
+                instance.order.user_id, [seat], serializers.ValidationError
+            )
+            instance = super().update(instance, validated_data)
+        release_held(holds)
+        return instance
+
 
 class TicketSeatsSerializer(TicketSerializer):
     class Meta:
@@ -164,54 +327,269 @@ class TicketSeatsSerializer(TicketSerializer):
         fields = ("carriage", "seat")
 
 
-class OrderSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+class TakenPlacesField(serializers.Field):
+    """Taken seats of a journey read from its seat map, not Ticket rows.
+
+    The taken_places query parameter selects a compact encoding with
+    one item per carriage: "bitmap" gives base64 bitmaps (seat s is
+    bit (s - 1) % 8 of byte (s - 1) // 8), "ranges" gives
+    [first, last] seat ranges.
+    """
+
+    FORMATS = ("list", "bitmap", "ranges")
+    # the seat map is sized by the train
+    lookups = ("train",)
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_format(self) -> str:
+        request = self.context.get("request")
+        if request is None:
+            return "list"
+        value = request.query_params.get("taken_places", "list")
+        if value not in self.FORMATS:
+            raise serializers.ValidationError(
+                {"taken_places": [f"choose one of {', '.join(self.FORMATS)}"]}
+            )
+        return value
+
+    def to_representation(self, journey):
+        seat_map = journey.seat_map
+        value_format = self.get_format()
+        carriages = range(1, seat_map.carriage_num + 1)
+        if value_format == "bitmap":
+            return {
+                "format": value_format,
+                "carriages": [
+                    base64.b64encode(seat_map.carriage_bitmap(c)).decode()
+                    for c in carriages
+                ],
+            }
+        if value_format == "ranges":
+            return {
+                "format": value_format,
+                "carriages": [seat_map.taken_runs(c) for c in carriages],
+            }
+        return [
+            {"carriage": carriage, "seat": seat}
+            for carriage, seat in seat_map.taken()
+        ]
+
+
+class OrderTicketSerializer(TicketSerializer):
+    """Ticket nested in an order, id is writable to keep it on update"""
+
+    id = serializers.IntegerField(required=False)
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    tickets = OrderTicketSerializer(
+        many=True, read_only=False, allow_empty=False
+    )
+    # the orderer's own holds on the ordered seats, freed once sold
+    holds = None
 
     class Meta:
         model = Order
         fields = ("id", "created_at", "tickets")
 
+    @staticmethod
+    def seat_key(ticket_data: dict) -> tuple[int, int, int]:
+        return (
+            ticket_data["journey"].id,
+            ticket_data["carriage"],
+            ticket_data["seat"],
+        )
+
+    @staticmethod
+    def take_seats(journeys, seats, released=()):
+        """Mark seats as taken in locked journeys' seat maps, all of
+        them or, when any is taken already, none"""
+        for journey_id, carriage, seat in released:
+            journeys[journey_id].seat_map.release(carriage, seat)
+        taken = [
+            f"seat {seat} in carriage {carriage} of journey "
+            f"{journey_id} is already taken"
+            for journey_id, carriage, seat in seats
+            if journeys[journey_id].seat_map.is_taken(carriage, seat)
+        ]
+        if taken:
+            raise serializers.ValidationError({"tickets": taken})
+        for journey_id, carriage, seat in seats:
+            journeys[journey_id].seat_map.take(carriage, seat)
+
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        tickets_data = validated_data.pop("tickets")
+        for ticket_data in tickets_data:
+            ticket_data.pop("id", None)
+        seats = [self.seat_key(ticket_data) for ticket_data in tickets_data]
+        if booking_settings()["ENABLED"]:
+            order = booking_coordinator.book(
+                (seat[0] for seat in seats),
+                lambda journeys: self.place_order(
+                    journeys, validated_data, tickets_data, seats
+                ),
+                fallback=lambda: self.create_order(
+                    validated_data, tickets_data, seats
+                ),
+            )
+        else:
+            order = self.create_order(validated_data, tickets_data, seats)
+        release_held(self.holds)
+        return order
+
+    def check_holds(self, user_id, seats):
+        """Reject seats held by other users; called with the journeys
+        locked, so no hold can slip in between the check and the sale"""
+        self.holds = check_holds(user_id, seats, serializers.ValidationError)
+
+    def place_order(self, journeys, validated_data, tickets_data, seats):
+        """Order with its unsaved tickets, seats taken in the locked
+        journeys' seat maps"""
+        self.check_holds(validated_data["user"].pk, seats)
+        self.take_seats(journeys, seats)
+        order = Order.objects.create(**validated_data)
+        return order, [
+            Ticket(order=order, **ticket_data) for ticket_data in tickets_data
+        ]
+
+    def create_order(self, validated_data, tickets_data, seats):
+        try:
+            with transaction.atomic():
+                journeys = lock_journeys(seat[0] for seat in seats)
+                order, tickets = self.place_order(
+                    journeys, validated_data, tickets_data, seats
+                )
+                Ticket.objects.bulk_create(tickets)
+                save_seat_maps(journeys.values())
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"tickets": ["some of the seats are already taken"]}
+            )
+        return order
+
+    def diff_tickets(self, instance, tickets_data):
+        """Split the payload into tickets to create, update and delete.
+
+        Tickets are matched by id first, then by (journey, carriage, seat)
+        so resending an unchanged order keeps its tickets.
+        """
+        existing = {ticket.id: ticket for ticket in instance.tickets.all()}
+        by_seat = {
+            (ticket.journey_id, ticket.carriage, ticket.seat): ticket
+            for ticket in existing.values()
+        }
+        kept, to_create, to_update = set(), [], []
+        for ticket_data in sorted(tickets_data, key=lambda t: "id" not in t):
+            ticket_id = ticket_data.pop("id", None)
+            seat = self.seat_key(ticket_data)
+            if ticket_id is not None:
+                ticket = existing.get(ticket_id)
+                if ticket is None or ticket_id in kept:
+                    raise serializers.ValidationError(
+                        {"tickets": [f"invalid ticket id {ticket_id}"]}
+                    )
+            else:
+                ticket = by_seat.get(seat)
+                if ticket is not None and ticket.id in kept:
+                    ticket = None
+            if ticket is None:
+                to_create.append(Ticket(order=instance, **ticket_data))
+                continue
+            kept.add(ticket.id)
+            if (ticket.journey_id, ticket.carriage, ticket.seat) != seat:
+                to_update.append((ticket, ticket_data))
+        to_delete = [
+            ticket
+            for ticket_id, ticket in existing.items()
+            if ticket_id not in kept
+        ]
+        return to_create, to_update, to_delete
+
+    @staticmethod
+    def move_tickets(to_update):
+        """Save tickets moved to other seats in two passes: parking them
+        on seats no ticket can have (-id) first, so tickets swapping
+        seats never collide on (journey, carriage, seat), which isn't
+        a deferrable constraint"""
+        tickets = [ticket for ticket, _ in to_update]
+        if not tickets:
+            return
+        for ticket in tickets:
+            ticket.seat = -ticket.id
+        Ticket.objects.bulk_update(tickets, ("seat",))
+        for ticket, ticket_data in to_update:
+            for attr, value in ticket_data.items():
+                setattr(ticket, attr, value)
+        Ticket.objects.bulk_update(tickets, ("journey", "carriage", "seat"))
 
     def update(self, instance, validated_data):
-        with transaction.atomic():
-            instance.created_at = validated_data.get(
-                "created_at", instance.created_at
+        tickets_data = validated_data.pop("tickets", None)
+        if tickets_data is None:
+            return instance
+
+        to_create, to_update, to_delete = self.diff_tickets(
+            instance, tickets_data
+        )
+        released = [
+            (ticket.journey_id, ticket.carriage, ticket.seat)
+            for ticket in to_delete + [ticket for ticket, _ in to_update]
+        ]
+        seats = [self.seat_key(ticket_data) for _, ticket_data in to_update]
+        seats += [
+            (ticket.journey_id, ticket.carriage, ticket.seat)
+            for ticket in to_create
+        ]
+        try:
+            with transaction.atomic(), manual_sync():
+                journeys = lock_journeys(seat[0] for seat in seats + released)
+                self.check_holds(instance.user_id, seats)
+                self.take_seats(journeys, seats, released=released)
+                if to_delete:
+                    Ticket.objects.filter(
+                        id__in=[ticket.id for ticket in to_delete]
+                    ).delete()
+                self.move_tickets(to_update)
+                Ticket.objects.bulk_create(to_create)
+                save_seat_maps(journeys.values())
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"tickets": ["some of the seats are already taken"]}
             )
-            instance.save()
+        release_held(self.holds)
+        return instance
 
-            tickets_data = validated_data.get("tickets", [])
-            ticket_ids = [ticket.get("id") for ticket in tickets_data]
 
-            tickets_to_delete = instance.tickets.exclude(id__in=ticket_ids)
-            tickets_to_delete.delete()
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves pks through the reference data cache; cache_models are
+    the related tables pulled in by the queryset's select_related"""
 
-            for ticket_data in tickets_data:
-                ticket_id = ticket_data.get("id")
-                if ticket_id:
-                    ticket = instance.tickets.filter(id=ticket_id).first()
-                    if ticket:
-                        ticket.some_field = ticket_data.get("some_field")
-                        ticket.save()
-                else:
-                    Ticket.objects.create(order=instance, **ticket_data)
+    def __init__(self, cache_models=(), **kwargs):
+        self.cache_models = cache_models
+        super().__init__(**kwargs)
 
-        return instance
+    def to_internal_value(self, data):
+        fetch = super().to_internal_value
+        model = self.get_queryset().model
+        return cached(
+            f"{model._meta.label_lower}:pk:{data}",
+            (model, *self.cache_models),
+            lambda: fetch(data),
+        )
 
 
-class JourneySerializer(serializers.ModelSerializer):
+class JourneySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     tickets_available = serializers.IntegerField(read_only=True)
-    route = serializers.PrimaryKeyRelatedField(
-        queryset=Route.objects.select_related("source", "destination")
+    route = CachedPrimaryKeyRelatedField(
+        queryset=Route.objects.select_related("source", "destination"),
+        cache_models=(Station,),
     )
-    train = serializers.PrimaryKeyRelatedField(
-        queryset=Train.objects.select_related("train_type")
+    train = CachedPrimaryKeyRelatedField(
+        queryset=Train.objects.select_related("train_type"),
+        cache_models=(TrainType,),
     )
 
     class Meta:
@@ -237,10 +615,10 @@ class JourneySerializer(serializers.ModelSerializer):
 
 
 class JourneyListSerializer(JourneySerializer):
-    route_link = serializers.HyperlinkedRelatedField(
+    route_link = TemplatedHyperlinkedRelatedField(
         source="route", view_name="station_app:routes-detail", read_only=True
     )
-    train_link = serializers.HyperlinkedRelatedField(
+    train_link = TemplatedHyperlinkedRelatedField(
         source="train", view_name="station_app:trains-detail", read_only=True
     )
     source = serializers.SlugRelatedField(
@@ -260,17 +638,15 @@ class JourneyListSerializer(JourneySerializer):
 
 
 class JoureyDetailSerializer(JourneyListSerializer):
-    taken_places = TicketSeatsSerializer(
-        source="tickets", many=True, read_only=True
-    )
+    taken_places = TakenPlacesField()
 
     class Meta:
         model = Journey
         fields = JourneyListSerializer.Meta.fields + ("taken_places",)
 
 
-class OrderListSerializer(serializers.ModelSerializer):
-    tickets = serializers.HyperlinkedRelatedField(
+class OrderListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    tickets = TemplatedHyperlinkedRelatedField(
         many=True, view_name="station_app:tickets-detail", read_only=True
     )
     total_tickets = serializers.IntegerField()
@@ -282,7 +658,7 @@ class OrderListSerializer(serializers.ModelSerializer):
 
 class OrderDetailSerializer(OrderListSerializer):
     tickets = TicketSerializer(many=True, read_only=True)
-    tickets_link = serializers.HyperlinkedRelatedField(
+    tickets_link = TemplatedHyperlinkedRelatedField(
         source="tickets",
         many=True,
         read_only=True,
@@ -292,3 +668,161 @@ class OrderDetailSerializer(OrderListSerializer):
     class Meta:
         model = Order
         fields = OrderListSerializer.Meta.fields + ("tickets_link",)
+
+
+class ConnectionSearchSerializer(serializers.Serializer):
+    source = serializers.PrimaryKeyRelatedField(queryset=Station.objects.all())
+    destination = serializers.PrimaryKeyRelatedField(
+        queryset=Station.objects.all()
+    )
+    departure = serializers.DateTimeField(required=False)
+    min_transfer = serializers.IntegerField(
+        required=False, default=15, min_value=0, max_value=24 * 60
+    )
+    max_changes = serializers.IntegerField(
+        required=False, default=2, min_value=0, max_value=4
+    )
+    limit = serializers.IntegerField(
+        required=False, default=3, min_value=1, max_value=10
+    )
+
+    def validate(self, attrs):
+        data = super().validate(attrs=attrs)
+        Route.validate_route(
+            data["source"],
+            data["destination"],
+            serializers.ValidationError,
+        )
+        return data
+
+
+class ConnectionLegSerializer(serializers.Serializer):
+    journey = serializers.IntegerField(source="journey_id")
+    source = serializers.IntegerField(source="source_id")
+    destination = serializers.IntegerField(source="destination_id")
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    tickets_available = serializers.SerializerMethodField()
+
+    def get_tickets_available(self, leg):
+        return self.context["tickets_available"].get(leg.journey_id, 0)
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.SerializerMethodField()
+    arrival_time = serializers.SerializerMethodField()
+    changes = serializers.SerializerMethodField()
+    tickets_available = serializers.SerializerMethodField()
+    legs = ConnectionLegSerializer(source="*", many=True)
+
+    def get_departure_time(self, legs):
+        return serializers.DateTimeField().to_representation(
+            legs[0].departure_time
+        )
+
+    def get_arrival_time(self, legs):
+        return serializers.DateTimeField().to_representation(
+            legs[-1].arrival_time
+        )
+
+    @staticmethod
+    def get_changes(legs):
+        return len(legs) - 1
+
+    def get_tickets_available(self, legs):
+        return min(
+            self.context["tickets_available"].get(leg.journey_id, 0)
+            for leg in legs
+        )
+
+
+class SeatSerializer(serializers.Serializer):
+    carriage = serializers.IntegerField(min_value=1)
+    seat = serializers.IntegerField(min_value=1)
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    """Seats of one journey to hold, validated against its seat map"""
+
+    journey = serializers.PrimaryKeyRelatedField(
+        queryset=Journey.objects.select_related("train")
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate_seats(self, seats):
+        max_seats = hold_settings()["MAX_SEATS"]
+        if len(seats) > max_seats:
+            raise serializers.ValidationError(
+                f"at most {max_seats} seats can be held at once"
+            )
+        pairs = [(seat["carriage"], seat["seat"]) for seat in seats]
+        if len(set(pairs)) != len(pairs):
+            raise serializers.ValidationError("seats must be unique")
+        return pairs
+
+    def validate(self, attrs):
+        journey = attrs["journey"]
+        taken = []
+        for carriage, seat in attrs["seats"]:
+            Ticket.validate_ticket(
+                carriage, seat, journey.train, serializers.ValidationError
+            )
+            if journey.seat_map.is_taken(carriage, seat):
+                taken.append(
+                    f"seat {seat} in carriage {carriage} is already taken"
+                )
+        if taken:
+            raise serializers.ValidationError({"seats": taken})
+        return attrs
+
+
+class SeatHoldDetailSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    journey = serializers.IntegerField()
+    seats = serializers.SerializerMethodField()
+    expires_at = serializers.DateTimeField()
+
+    def get_seats(self, hold) -> list[dict]:
+        return [
+            {"carriage": carriage, "seat": seat}
+            for carriage, seat in hold["seats"]
+        ]
+
+
+class SeatAllocationSerializer(serializers.Serializer):
+    party_size = serializers.IntegerField(min_value=1)
+
+    def validate_party_size(self, value):
+        max_seats = hold_settings()["MAX_SEATS"]
+        if value > max_seats:
+            raise serializers.ValidationError(
+                f"at most {max_seats} seats can be allocated at once"
+            )
+        return value
+
+
+class AllocatedSeatsSerializer(serializers.Serializer):
+    journey = serializers.IntegerField()
+    seats = SeatSerializer(many=True)
+    adjacent = serializers.BooleanField()
+
+
+class ProfileSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    mode = serializers.ChoiceField(choices=("cprofile", "sample"))
+    method = serializers.CharField()
+    path = serializers.CharField()
+    query = serializers.CharField(allow_blank=True)
+    user_id = serializers.IntegerField(allow_null=True)
+    status = serializers.IntegerField()
+    duration_ms = serializers.FloatField()
+    files = serializers.SerializerMethodField()
+
+    def get_files(self, profile) -> dict[str, str]:
+        url = reverse(
+            "station_app:profiles-download",
+            args=[profile["id"]],
+            request=self.context["request"],
+        )
+        return {kind: f"{url}?kind={kind}" for kind in profile["files"]}
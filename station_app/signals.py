@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import (
+    Crew,
+    Journey,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+)
+from .occupancy import (
+    apply_ticket_changes,
+    rebuild_seat_maps,
+    signal_sync_enabled,
+)
+from .geo import station_geo_index
+from .planner import connection_planner
+from .search import station_search
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_seat(sender, instance, raw, **kwargs):
+    instance._previous_seat = None
+    if instance.pk and not raw and signal_sync_enabled():
+        instance._previous_seat = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values_list("journey_id", "carriage", "seat")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def take_ticket_seat(sender, instance, created, **kwargs):
+    if not signal_sync_enabled():
+        return
+    current = (instance.journey_id, instance.carriage, instance.seat)
+    previous = getattr(instance, "_previous_seat", None)
+    if previous == current:
+        return
+    apply_ticket_changes(
+        taken=[current], released=[previous] if previous else []
+    )
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, **kwargs):
+    if not signal_sync_enabled():
+        return
+    apply_ticket_changes(
+        released=[(instance.journey_id, instance.carriage, instance.seat)]
+    )
+
+
+@receiver(pre_save, sender=Journey)
+def remember_journey_train(sender, instance, raw, **kwargs):
+    instance._previous_train_id = None
+    if instance.pk and not raw:
+        instance._previous_train_id = (
+            Journey.objects.filter(pk=instance.pk)
+            .values_list("train_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Journey)
+def rebuild_journey_seat_map(sender, instance, created, raw, **kwargs):
+    """Train (and so the seat layout) changed"""
+    previous = getattr(instance, "_previous_train_id", None)
+    if not created and not raw and previous != instance.train_id:
+        rebuild_seat_maps([instance.pk])
+
+
+@receiver(post_save, sender=Train)
+def rebuild_train_seat_maps(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        rebuild_seat_maps(instance.journeys.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Journey)
+def add_journey_connection(sender, instance, **kwargs):
+    transaction.on_commit(lambda: connection_planner.add_journey(instance))
+
+
+@receiver(post_delete, sender=Journey)
+def remove_journey_connection(sender, instance, **kwargs):
+    journey_id = instance.id
+    transaction.on_commit(
+        lambda: connection_planner.remove_journey(journey_id)
+    )
+
+
+for signal in (post_save, post_delete):
+    signal.connect(station_search.invalidate, sender=Station)
+    signal.connect(station_geo_index.invalidate, sender=Station)
+    signal.connect(connection_planner.invalidate, sender=Route)
+    for model in (Station, Route, Train, TrainType, Crew, Journey):
+        signal.connect(invalidate, sender=model)
+
+
+@receiver(m2m_changed, sender=Journey.crew.through)
+def invalidate_journey_crew(sender, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate(Journey)
@@ -0,0 +1,150 @@
+from typing import Optional
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+FIELDS_QUERY_PARAM = "fields"
+OMIT_QUERY_PARAM = "omit"
+
+
+def field_names(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """Serializer output restricted by ?fields=a,b and ?omit=c.
+
+    Only the serializer a view responds with is restricted, nested ones
+    are left whole, and only for safe methods, so writes still validate
+    every field. Unknown names are a validation error.
+    """
+
+    def is_response_root(self) -> bool:
+        parent = self.parent
+        return parent is None or (
+            isinstance(parent, serializers.ListSerializer)
+            and parent.parent is None
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        query_params = getattr(request, "query_params", None)
+        if (
+            not query_params
+            or request.method not in SAFE_METHODS
+            or not self.is_response_root()
+        ):
+            return fields
+
+        only = field_names(query_params.get(FIELDS_QUERY_PARAM, ""))
+        omit = field_names(query_params.get(OMIT_QUERY_PARAM, ""))
+        errors = {}
+        for param, names in (
+            (FIELDS_QUERY_PARAM, only),
+            (OMIT_QUERY_PARAM, omit),
+        ):
+            if unknown := [name for name in names if name not in fields]:
+                errors[param] = [f"unknown fields: {', '.join(unknown)}"]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return {
+            name: field
+            for name, field in fields.items()
+            if (not only or name in only) and name not in omit
+        }
+
+
+def field_lookups(field) -> Optional[list[str]]:
+    """Queryset lookups read by a serializer field, None when unknown.
+
+    Fields with source="*" declare theirs with a lookups attribute;
+    primary key relations read the foreign key column only.
+    """
+    if field.source == "*":
+        lookups = getattr(field, "lookups", None)
+        return None if lookups is None else list(lookups)
+    path = "__".join(field.source_attrs)
+    if isinstance(field, ManyRelatedField):
+        return [path]
+    if isinstance(field, RelatedField) and field.use_pk_only_optimization():
+        return ["__".join(field.source_attrs[:-1])]
+    nested = getattr(field, "child", field)
+    if isinstance(nested, serializers.BaseSerializer):
+        lookups = serializer_lookups(nested)
+        if lookups is None:
+            return None
+        return [path, *(f"{path}__{lookup}" for lookup in lookups)]
+    return [path]
+
+
+def serializer_lookups(serializer) -> Optional[set[str]]:
+    """Queryset lookups read by the readable fields of serializer"""
+    if not isinstance(serializer, serializers.Serializer):
+        return None
+    lookups = set()
+    for field in serializer._readable_fields:
+        read = field_lookups(field)
+        if read is None:
+            return None
+        lookups.update(lookup for lookup in read if lookup)
+    return lookups
+
+
+def reads(lookups: set[str], path: str) -> bool:
+    """Whether any of lookups goes through path, or path through one"""
+    return any(
+        lookup == path
+        or lookup.startswith(f"{path}__")
+        or path.startswith(f"{lookup}__")
+        for lookup in lookups
+    )
+
+
+class SparseQuerysetMixin:
+    """Join, prefetch and annotate only what the response reads.
+
+    optional_select_related, optional_prefetch_related and
+    optional_annotations are applied to the queryset when a field of
+    the action's serializer (after ?fields= and ?omit=) reads them.
+    Skipping an aggregate annotation drops its GROUP BY too.
+    """
+
+    optional_select_related = ()
+    optional_prefetch_related = ()
+    optional_annotations = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        lookups = None
+        if not getattr(self, "swagger_fake_view", False):
+            lookups = serializer_lookups(
+                self.get_serializer_class()(
+                    context=self.get_serializer_context()
+                )
+            )
+
+        select_related = [
+            path
+            for path in self.optional_select_related
+            if lookups is None or reads(lookups, path)
+        ]
+        prefetch_related = [
+            path
+            for path in self.optional_prefetch_related
+            if lookups is None or reads(lookups, path)
+        ]
+        annotations = {
+            name: expression
+            for name, expression in self.optional_annotations.items()
+            if lookups is None or reads(lookups, name)
+        }
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
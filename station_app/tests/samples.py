@@ -1,11 +1,24 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-from station_app.models import Station, Route
+from station_app.cache import local_cache
+from station_app.models import (
+    Station,
+    Route,
+    Train,
+    TrainType,
+    Journey,
+    Order,
+)
 
 
 STATIONS_LIST_URL = reverse("station_app:stations-list")
 ROUTES_LIST_URL = reverse("station_app:routes-list")
+STATIONS_AUTOCOMPLETE_URL = reverse("station_app:stations-autocomplete")
 
 STATION_PAYLOAD = {
     "name": "Sample station",
@@ -14,6 +27,12 @@ STATION_PAYLOAD = {
 }
 
 
+def clear_caches():
+    """Cached responses outlive test transaction rollbacks"""
+    cache.clear()
+    local_cache.clear()
+
+
 def sample_station(count: int = 1, **params):
     defaults = {
         "name": "Sample station",
@@ -35,3 +54,66 @@ def sample_station(count: int = 1, **params):
 
 def station_detail_url(station_pk: int = 1):
     return reverse("station_app:stations-detail", args=[station_pk])
+
+
+JOURNEYS_LIST_URL = reverse("station_app:journeys-list")
+ORDERS_LIST_URL = reverse("station_app:orders-list")
+JOURNEYS_CONNECTIONS_URL = reverse("station_app:journeys-connections")
+
+
+def sample_route(**params):
+    defaults = {"distance": 500}
+    defaults.update(params)
+    existing = Station.objects.count()
+    for station_num, field in enumerate(
+        ("source", "destination"), start=existing + 1
+    ):
+        if field not in defaults:
+            defaults[field] = Station.objects.create(
+                name=f"Route station {station_num}", latitude=50, longitude=30
+            )
+    return Route.objects.create(**defaults)
+
+
+def sample_train(**params):
+    defaults = {
+        "name": "Sample train",
+        "carriage_num": 3,
+        "places_in_carriage": 10,
+    }
+    defaults.update(params)
+    if "train_type" not in defaults:
+        defaults["train_type"], _ = TrainType.objects.get_or_create(
+            name="Sample type"
+        )
+    return Train.objects.create(**defaults)
+
+
+def sample_journey(**params):
+    departure_time = timezone.now() + timedelta(days=1)
+    defaults = {
+        "departure_time": departure_time,
+        "arrival_time": departure_time + timedelta(hours=5),
+    }
+    defaults.update(params)
+    if "route" not in defaults:
+        defaults["route"] = sample_route()
+    if "train" not in defaults:
+        defaults["train"] = sample_train()
+    return Journey.objects.create(**defaults)
+
+
+def sample_order(user, **params):
+    return Order.objects.create(user=user, **params)
+
+
+def journey_detail_url(journey_pk: int):
+    return reverse("station_app:journeys-detail", args=[journey_pk])
+
+
+def journey_allocate_url(journey_pk: int):
+    return reverse("station_app:journeys-allocate", args=[journey_pk])
+
+
+def order_detail_url(order_pk: int):
+    return reverse("station_app:orders-detail", args=[order_pk])
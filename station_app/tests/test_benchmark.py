@@ -0,0 +1,104 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from station_app.models import Journey, Order, Station, Ticket
+from station_app.stats import percentile, summarize
+
+SMALL_DATASET = {
+    "stations": 10,
+    "routes": 20,
+    "train_types": 2,
+    "trains": 5,
+    "crew": 4,
+    "journeys": 30,
+    "users": 5,
+    "orders": 60,
+    "stdout": io.StringIO(),
+}
+
+
+class StatsTestCases(TestCase):
+    def test_percentile_interpolates(self):
+        values = [4, 1, 3, 2]
+
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 50), 2.5)
+        self.assertEqual(percentile(values, 100), 4)
+
+    def test_summarize_empty(self):
+        self.assertEqual(summarize([]), {"count": 0})
+
+
+class GenerateDatasetTestCases(TestCase):
+    def test_seat_maps_match_generated_tickets(self):
+        call_command("generate_dataset", **SMALL_DATASET)
+
+        self.assertEqual(Journey.objects.count(), 30)
+        for journey in Journey.objects.all():
+            self.assertEqual(
+                journey.seats_taken,
+                Ticket.objects.filter(journey=journey).count(),
+            )
+
+    def test_sold_out_journeys_get_no_empty_orders(self):
+        call_command(
+            "generate_dataset",
+            **{**SMALL_DATASET, "trains": 1, "journeys": 1, "orders": 1200},
+        )
+        journey = Journey.objects.select_related("train").get()
+
+        self.assertEqual(journey.seats_taken, journey.seat_map.capacity)
+        self.assertFalse(Order.objects.filter(tickets=None).exists())
+
+    def test_rerun_needs_flush(self):
+        call_command("generate_dataset", **SMALL_DATASET)
+
+        with self.assertRaises(CommandError):
+            call_command("generate_dataset", **SMALL_DATASET)
+        call_command("generate_dataset", flush=True, **SMALL_DATASET)
+
+        self.assertEqual(Journey.objects.count(), 30)
+        self.assertEqual(Station.objects.count(), 10)
+
+    def test_benchmark_writes_results_and_cleans_up(self):
+        call_command("generate_dataset", **SMALL_DATASET)
+        tickets = Ticket.objects.count()
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "run.json")
+            call_command(
+                "benchmark_endpoints",
+                iterations=3,
+                warmup=1,
+                output=output,
+                stdout=io.StringIO(),
+            )
+            with open(output) as result_file:
+                run = json.load(result_file)
+
+        self.assertEqual(
+            set(run["results"]),
+            {
+                "journey_search",
+                "journey_detail",
+                "order_create",
+                "order_list",
+                "ticket_list",
+            },
+        )
+        self.assertEqual(run["results"]["order_create"]["status"], [201])
+        self.assertEqual(
+            run["results"]["journey_detail"]["queries"]["count"], 3
+        )
+        self.assertEqual(Ticket.objects.count(), tickets)
+        for journey in Journey.objects.all():
+            self.assertEqual(
+                journey.seats_taken,
+                Ticket.objects.filter(journey=journey).count(),
+            )
@@ -0,0 +1,191 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from station_app.booking import Batch, Booking, BookingCoordinator
+from station_app.models import Journey, Order, Ticket
+from station_app.serializers import OrderSerializer
+from .samples import ORDERS_LIST_URL, clear_caches, sample_journey
+from .test_order_api_view import order_payload
+
+
+class BookingCoordinatorTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.journey = sample_journey()
+
+    def booking(self, *seats):
+        serializer = OrderSerializer()
+        tickets_data = [
+            {"journey": self.journey, "carriage": 1, "seat": seat}
+            for seat in seats
+        ]
+        return Booking(
+            lambda journeys: serializer.place_order(
+                journeys,
+                {"user": self.user},
+                tickets_data,
+                [(self.journey.id, 1, seat) for seat in seats],
+            )
+        )
+
+    def test_batch_books_in_arrival_order(self):
+        batch = Batch((self.journey.id,))
+        batch.bookings = [
+            self.booking(1, 2),
+            self.booking(2, 3),
+            self.booking(3, 4),
+        ]
+
+        BookingCoordinator.run(batch)
+
+        first, conflicting, last = batch.bookings
+        self.assertIsInstance(first.result, Order)
+        self.assertIsInstance(conflicting.error, ValidationError)
+        self.assertIsNone(conflicting.result)
+        self.assertIsInstance(last.result, Order)
+        self.assertTrue(
+            all(booking.done.is_set() for booking in batch.bookings)
+        )
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(
+            sorted(Ticket.objects.values_list("seat", flat=True)),
+            [1, 2, 3, 4],
+        )
+        journey = Journey.objects.get(pk=self.journey.pk)
+        self.assertEqual(journey.seats_taken, 4)
+
+    def test_failing_booking_doesnt_fail_the_batch(self):
+        def broken(journeys):
+            journeys[self.journey.id].seat_map.take(1, 5)
+            raise RuntimeError("broken order")
+
+        batch = Batch((self.journey.id,))
+        batch.bookings = [
+            self.booking(1),
+            Booking(broken),
+            self.booking(5),
+        ]
+
+        BookingCoordinator.run(batch)
+
+        first, failed, last = batch.bookings
+        self.assertIsInstance(failed.error, RuntimeError)
+        self.assertFalse(failed.retry)
+        self.assertIsInstance(first.result, Order)
+        self.assertIsInstance(last.result, Order)
+        self.assertEqual(
+            sorted(Ticket.objects.values_list("seat", flat=True)), [1, 5]
+        )
+
+    def test_lone_order_doesnt_wait(self):
+        coordinator = BookingCoordinator()
+        coordinator.run = lambda batch: [
+            setattr(booking, "result", booking.apply(None))
+            for booking in batch.bookings
+        ]
+
+        with override_settings(
+            STATION_APP_BOOKING_COORDINATOR={"MAX_WAIT": 5}
+        ):
+            start = time.monotonic()
+            result = coordinator.book(
+                (self.journey.id,), lambda journeys: 1, fallback=None
+            )
+
+        self.assertEqual(result, 1)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_concurrent_orders_join_one_batch(self):
+        batches = []
+        running, release = threading.Event(), threading.Event()
+
+        class RecordingCoordinator(BookingCoordinator):
+            @staticmethod
+            def run(batch):
+                batches.append(batch)
+                if len(batches) == 1:
+                    running.set()
+                    release.wait(5)
+                for booking in batch.bookings:
+                    booking.result = booking.apply(None)
+                    booking.done.set()
+
+        coordinator = RecordingCoordinator()
+        results = []
+
+        def book(seat):
+            results.append(
+                coordinator.book(
+                    (self.journey.id,), lambda journeys: seat, fallback=None
+                )
+            )
+
+        with override_settings(
+            STATION_APP_BOOKING_COORDINATOR={"MAX_WAIT": 5, "MAX_BATCH": 3}
+        ):
+            # a lone order runs at once and keeps its batch running
+            first = threading.Thread(target=book, args=(0,))
+            first.start()
+            running.wait(5)
+            threads = [
+                threading.Thread(target=book, args=(seat,))
+                for seat in (1, 2, 3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            release.set()
+            first.join()
+
+        # the full batch is run without waiting MAX_WAIT out
+        self.assertEqual([len(batch.bookings) for batch in batches], [1, 3])
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+
+
+@override_settings(STATION_APP_BOOKING_COORDINATOR={"ENABLED": True})
+class CoordinatedOrderCreateTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_create_order(self):
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (1, 2)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["tickets"]), 2)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_taken_seats_are_rejected(self):
+        self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (1, 2)),
+            format="json",
+        )
+
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (2, 3)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.count(), 2)
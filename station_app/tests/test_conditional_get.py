@@ -0,0 +1,126 @@
+import time
+from email.utils import formatdate
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from station_app.models import Ticket
+from .samples import (
+    JOURNEYS_LIST_URL,
+    STATIONS_LIST_URL,
+    clear_caches,
+    journey_detail_url,
+    sample_journey,
+    sample_order,
+)
+
+
+class Clock:
+    """Stand-in for the time module of station_app.cache"""
+
+    def __init__(self, now: int):
+        self.now = now
+
+    def time_ns(self) -> int:
+        return self.now
+
+
+class ConditionalGetTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_matching_etag_returns_304_without_queries(self):
+        for url in (
+            JOURNEYS_LIST_URL,
+            journey_detail_url(self.journey.pk),
+            STATIONS_LIST_URL,
+        ):
+            etag = self.client.get(url)["ETag"]
+
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+            self.assertEqual(response["ETag"], etag)
+
+    def book(self, seat: int):
+        Ticket.objects.create(
+            journey=self.journey,
+            order=sample_order(self.user),
+            carriage=1,
+            seat=seat,
+        )
+
+    def test_if_modified_since(self):
+        self.client.get(JOURNEYS_LIST_URL)
+        # the second of the last write is over
+        with mock.patch(
+            "station_app.cache.time", Clock(time.time_ns() + 2 * 10**9)
+        ):
+            last_modified = self.client.get(JOURNEYS_LIST_URL)["Last-Modified"]
+
+            with self.assertNumQueries(0):
+                response = self.client.get(
+                    JOURNEYS_LIST_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_within_the_second_of_a_response(self):
+        second = time.time_ns() // 10**9 + 5
+        clock = Clock(second * 10**9 + 100_000_000)
+        with mock.patch("station_app.cache.time", clock):
+            self.book(1)
+            clock.now += 100_000_000
+            response = self.client.get(JOURNEYS_LIST_URL)
+            # the second isn't over, a date now could hide the next write
+            self.assertNotIn("Last-Modified", response)
+
+            clock.now += 100_000_000
+            self.book(2)
+            clock.now = (second + 2) * 10**9
+            last_modified = self.client.get(JOURNEYS_LIST_URL)["Last-Modified"]
+            self.assertEqual(
+                last_modified, formatdate(second + 1, usegmt=True)
+            )
+
+            clock.now += 100_000_000
+            self.book(3)
+            clock.now = (second + 4) * 10**9
+            response = self.client.get(
+                JOURNEYS_LIST_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ticket_purchase_changes_journey_etag(self):
+        etag = self.client.get(JOURNEYS_LIST_URL)["ETag"]
+
+        Ticket.objects.create(
+            journey=self.journey,
+            order=sample_order(self.user),
+            carriage=1,
+            seat=1,
+        )
+        response = self.client.get(JOURNEYS_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_query_string_changes_etag(self):
+        self.assertNotEqual(
+            self.client.get(JOURNEYS_LIST_URL)["ETag"],
+            self.client.get(JOURNEYS_LIST_URL, {"page_size": 5})["ETag"],
+        )
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from station_app.models import Station
+from station_app.planner import connection_planner
+from .samples import (
+    JOURNEYS_CONNECTIONS_URL,
+    sample_journey,
+    sample_route,
+    sample_train,
+)
+
+
+class ConnectionPlannerTestCases(TestCase):
+    def setUp(self):
+        connection_planner.invalidate()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.a, self.b, self.c = (
+            Station.objects.create(name=name, latitude=0, longitude=0)
+            for name in "ABC"
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        train = sample_train()
+
+        def journey(source, destination, departure_hours, arrival_hours):
+            return sample_journey(
+                route=sample_route(source=source, destination=destination),
+                train=train,
+                departure_time=self.start + timedelta(hours=departure_hours),
+                arrival_time=self.start + timedelta(hours=arrival_hours),
+            )
+
+        self.a_b = journey(self.a, self.b, 1, 3)
+        self.b_c = journey(self.b, self.c, 3.5, 6)
+        self.a_c = journey(self.a, self.c, 2, 9)
+
+    def search(self, **params):
+        params = {
+            "source": self.a.id,
+            "destination": self.c.id,
+            "departure": self.start.isoformat(),
+            **params,
+        }
+        return self.client.get(JOURNEYS_CONNECTIONS_URL, params)
+
+    def journeys(self, response):
+        return [
+            [leg["journey"] for leg in itinerary["legs"]]
+            for itinerary in response.data
+        ]
+
+    def test_change_and_direct_itineraries(self):
+        response = self.search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.journeys(response),
+            [[self.a_b.id, self.b_c.id], [self.a_c.id]],
+        )
+        self.assertEqual(response.data[0]["changes"], 1)
+        self.assertEqual(response.data[0]["tickets_available"], 30)
+
+    def test_min_transfer_time(self):
+        response = self.search(min_transfer=45)
+
+        self.assertEqual(self.journeys(response), [[self.a_c.id]])
+
+    def test_max_changes(self):
+        response = self.search(max_changes=0)
+
+        self.assertEqual(self.journeys(response), [[self.a_c.id]])
+
+    def test_timetable_updates_incrementally(self):
+        connection_planner.data
+        faster = sample_journey(
+            route=self.a_c.route,
+            train=self.a_c.train,
+            departure_time=self.start + timedelta(hours=1, minutes=30),
+            arrival_time=self.start + timedelta(hours=4),
+        )
+        connection_planner.add_journey(faster)
+
+        self.assertEqual(self.journeys(self.search(limit=1)), [[faster.id]])
+
+        connection_planner.remove_journey(faster.id)
+
+        self.assertNotIn([faster.id], self.journeys(self.search()))
+
+    def test_same_source_and_destination(self):
+        response = self.search(destination=self.a.id)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,69 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from station_app.tests.test_benchmark import SMALL_DATASET
+
+
+class ExplainSnapshotsTestCases(TestCase):
+    def setUp(self):
+        call_command("generate_dataset", **SMALL_DATASET)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "plans.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def explain_snapshots(self, **options):
+        call_command(
+            "explain_snapshots",
+            snapshot_file=self.path,
+            stdout=io.StringIO(),
+            **options,
+        )
+
+    def test_unchanged_plans_pass(self):
+        self.explain_snapshots(update=True)
+
+        with open(self.path) as snapshot_file:
+            plans = json.load(snapshot_file)[connection.vendor]
+        self.assertIn("journeys.list.search", plans)
+        self.assertTrue(plans["orders.list"]["shape"])
+        self.assertTrue(
+            plans["journeys.list.prefetch.station_app_crew"]["shape"]
+        )
+        self.assertIn("orders.list.prefetch.station_app_ticket", plans)
+        self.explain_snapshots()
+
+    def test_missing_snapshot_fails(self):
+        with self.assertRaisesMessage(CommandError, "no snapshot"):
+            self.explain_snapshots()
+
+    def test_plan_shape_change_fails(self):
+        self.explain_snapshots(update=True)
+        with open(self.path) as snapshot_file:
+            snapshots = json.load(snapshot_file)
+        snapshots[connection.vendor]["tickets.list"]["shape"] = ["SCAN x"]
+        with open(self.path, "w") as snapshot_file:
+            json.dump(snapshots, snapshot_file)
+
+        with self.assertRaisesMessage(CommandError, "tickets.list"):
+            self.explain_snapshots()
+
+    def test_prefetch_plan_change_fails(self):
+        self.explain_snapshots(update=True)
+        with open(self.path) as snapshot_file:
+            snapshots = json.load(snapshot_file)
+        name = "journeys.list.prefetch.station_app_crew"
+        snapshots[connection.vendor][name]["shape"] = ["SCAN x"]
+        with open(self.path, "w") as snapshot_file:
+            json.dump(snapshots, snapshot_file)
+
+        with self.assertRaisesMessage(CommandError, name):
+            self.explain_snapshots()
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station_app.fastlist import ValuesSerializer, fast_list_settings
+from station_app.models import Crew, Ticket
+from station_app.serializers import (
+    JoureyDetailSerializer,
+    JourneyListSerializer,
+    RouteSerializer,
+    TicketSerializer,
+)
+from .samples import (
+    JOURNEYS_LIST_URL,
+    ROUTES_LIST_URL,
+    clear_caches,
+    sample_journey,
+    sample_order,
+)
+
+TICKETS_LIST_URL = reverse("station_app:tickets-list")
+
+
+class FastListTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        crew = [
+            Crew.objects.create(first_name=first, last_name=last)
+            for first, last in (("Ann", "Zed"), ("Bob", "Abe"), ("Cid", "Max"))
+        ]
+        order = sample_order(self.user)
+        for number in range(4):
+            journey = sample_journey()
+            journey.crew.set(crew[number % 3 :])
+            Ticket.objects.create(
+                journey=journey, order=order, carriage=1, seat=number + 1
+            )
+
+    def get(self, url, params, enabled):
+        clear_caches()
+        with override_settings(STATION_APP_FAST_LIST={"ENABLED": enabled}):
+            return self.client.get(url, params)
+
+    def test_output_is_byte_identical(self):
+        for url, params in (
+            (JOURNEYS_LIST_URL, {"page_size": 3}),
+            (JOURNEYS_LIST_URL, {"page_size": 3, "page": 2}),
+            (JOURNEYS_LIST_URL, {"pagination": "cursor", "page_size": 2}),
+            (ROUTES_LIST_URL, {}),
+            (TICKETS_LIST_URL, {}),
+            (TICKETS_LIST_URL, {"pagination": "cursor", "page_size": 3}),
+        ):
+            with self.subTest(url=url, params=params):
+                fast = self.get(url, params, enabled=True)
+                regular = self.get(url, params, enabled=False)
+
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, regular.content)
+
+    def test_journeys_are_read_without_instances(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(JOURNEYS_LIST_URL, {}, enabled=True)
+
+        self.assertEqual(len(response.data["results"]), 4)
+        # count, page rows and crew ids, only the serialized columns
+        queries = [q["sql"] for q in queries if "station_app_" in q["sql"]]
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any("occupancy" in sql for sql in queries))
+
+    @override_settings(STATION_APP_FAST_LIST={})
+    def test_off_by_default(self):
+        self.assertFalse(fast_list_settings()["ENABLED"])
+
+    def test_only_flat_serializers_compile(self):
+        for serializer_class in (
+            JourneyListSerializer,
+            RouteSerializer,
+            TicketSerializer,
+        ):
+            self.assertIsNotNone(
+                ValuesSerializer.compile(serializer_class(context={}))
+            )
+        self.assertIsNone(
+            ValuesSerializer.compile(JoureyDetailSerializer(context={}))
+        )
@@ -0,0 +1,82 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station_app.models import Ticket
+from station_app.serializers import TemplatedHyperlinkedRelatedField
+from .samples import (
+    JOURNEYS_LIST_URL,
+    ORDERS_LIST_URL,
+    clear_caches,
+    order_detail_url,
+    sample_journey,
+    sample_order,
+)
+
+
+class TemplatedHyperlinkTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.journeys = [sample_journey(), sample_journey()]
+        self.order = sample_order(self.user)
+        for seat in (1, 2):
+            Ticket.objects.create(
+                journey=self.journeys[0],
+                order=self.order,
+                carriage=1,
+                seat=seat,
+            )
+
+    def test_links_match_reverse(self):
+        journeys = self.client.get(JOURNEYS_LIST_URL).data["results"]
+        order = self.client.get(order_detail_url(self.order.id)).data
+
+        for journey in journeys:
+            self.assertEqual(
+                journey["route_link"],
+                "http://testserver"
+                + reverse(
+                    "station_app:routes-detail", args=[journey["route"]]
+                ),
+            )
+        self.assertEqual(
+            order["tickets_link"],
+            [
+                "http://testserver"
+                + reverse("station_app:tickets-detail", args=[ticket.id])
+                for ticket in self.order.tickets.order_by("id")
+            ],
+        )
+
+    def test_output_is_unchanged(self):
+        templated = self.client.get(ORDERS_LIST_URL).content
+        TemplatedHyperlinkedRelatedField.use_templates = False
+        try:
+            reversed_ = self.client.get(ORDERS_LIST_URL).content
+        finally:
+            TemplatedHyperlinkedRelatedField.use_templates = True
+
+        self.assertEqual(templated, reversed_)
+
+    def test_benchmark_serialization(self):
+        out = io.StringIO()
+
+        call_command(
+            "benchmark_serialization",
+            iterations=2,
+            warmup=0,
+            user=self.user.email,
+            stdout=out,
+        )
+
+        self.assertIn("journeys.list", out.getvalue())
+        self.assertIn("orders.list", out.getvalue())
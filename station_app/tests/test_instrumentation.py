@@ -0,0 +1,73 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from station_app.instrumentation import normalize_sql
+from station_app.tests.samples import (
+    JOURNEYS_LIST_URL,
+    clear_caches,
+    sample_journey,
+)
+
+
+class NormalizeSqlTestCases(TestCase):
+    def test_in_lists_and_limits_collapse(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) LIMIT 1"),
+        )
+
+
+class SQLInstrumentationTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "testpass")
+        )
+        sample_journey()
+
+    def test_server_timing_header_only_for_staff(self):
+        response = self.client.get(JOURNEYS_LIST_URL)
+
+        self.assertNotIn("Server-Timing", response)
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "staff@test.com", "testpass", is_staff=True
+            )
+        )
+        response = self.client.get(JOURNEYS_LIST_URL)
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("total;dur=", timing)
+
+    @override_settings(STATION_APP_INSTRUMENTATION={"SERVER_TIMING": True})
+    def test_server_timing_setting_sends_header_to_everyone(self):
+        response = self.client.get(JOURNEYS_LIST_URL)
+
+        self.assertIn("Server-Timing", response)
+
+    @override_settings(
+        STATION_APP_INSTRUMENTATION={"SAMPLE_RATE": 0, "SERVER_TIMING": True}
+    )
+    def test_unsampled_request_is_not_instrumented(self):
+        response = self.client.get(JOURNEYS_LIST_URL)
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(
+        STATION_APP_INSTRUMENTATION={"SLOW_REQUEST_MS": 0, "SAMPLE_RATE": 1}
+    )
+    def test_slow_request_is_logged(self):
+        with self.assertLogs("station_app.instrumentation", "WARNING") as logs:
+            self.client.get(JOURNEYS_LIST_URL)
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["path"], JOURNEYS_LIST_URL)
+        self.assertEqual(line["status"], 200)
+        self.assertGreater(line["queries"], 0)
+        self.assertIn("duplicates", line)
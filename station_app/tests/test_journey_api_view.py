@@ -0,0 +1,282 @@
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from station_app.models import Journey, Ticket
+from station_app.occupancy import rebuild_seat_maps
+from .samples import (
+    JOURNEYS_LIST_URL,
+    clear_caches,
+    journey_allocate_url,
+    journey_detail_url,
+    sample_journey,
+    sample_order,
+    sample_route,
+    sample_train,
+)
+
+
+class JourneySeatMapTestCases(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.order = sample_order(self.user)
+
+    def test_ticket_create_and_delete_update_seat_map(self):
+        ticket = Ticket.objects.create(
+            journey=self.journey, order=self.order, carriage=2, seat=5
+        )
+        journey = Journey.objects.get(pk=self.journey.pk)
+
+        self.assertEqual(journey.seats_taken, 1)
+        self.assertTrue(journey.seat_map.is_taken(2, 5))
+
+        ticket.delete()
+        journey = Journey.objects.get(pk=self.journey.pk)
+
+        self.assertEqual(journey.seats_taken, 0)
+        self.assertFalse(journey.seat_map.is_taken(2, 5))
+
+    def test_ticket_seat_change_moves_seat(self):
+        ticket = Ticket.objects.create(
+            journey=self.journey, order=self.order, carriage=1, seat=1
+        )
+        ticket.seat = 2
+        ticket.save()
+        journey = Journey.objects.get(pk=self.journey.pk)
+
+        self.assertEqual(list(journey.seat_map.taken()), [(1, 2)])
+
+    def test_train_change_rebuilds_seat_map(self):
+        Ticket.objects.create(
+            journey=self.journey, order=self.order, carriage=3, seat=10
+        )
+        self.journey.train = sample_train(
+            name="Bigger train", carriage_num=5, places_in_carriage=20
+        )
+        self.journey.save()
+        journey = Journey.objects.get(pk=self.journey.pk)
+
+        self.assertEqual(list(journey.seat_map.taken()), [(3, 10)])
+
+    def test_save_without_train_change_keeps_seat_map(self):
+        self.journey.departure_time += timedelta(hours=1)
+
+        with patch("station_app.signals.rebuild_seat_maps") as rebuild:
+            self.journey.save()
+
+        rebuild.assert_not_called()
+
+    def test_list_tickets_available_reads_seat_map(self):
+        for seat in (1, 2, 3):
+            Ticket.objects.create(
+                journey=self.journey, order=self.order, carriage=1, seat=seat
+            )
+
+        response = self.client.get(JOURNEYS_LIST_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["tickets_available"], 27)
+
+    def test_detail_taken_places(self):
+        Ticket.objects.create(
+            journey=self.journey, order=self.order, carriage=2, seat=7
+        )
+        Ticket.objects.create(
+            journey=self.journey, order=self.order, carriage=1, seat=4
+        )
+
+        response = self.client.get(journey_detail_url(self.journey.pk))
+
+        self.assertEqual(
+            response.data["taken_places"],
+            [{"carriage": 1, "seat": 4}, {"carriage": 2, "seat": 7}],
+        )
+
+    def test_detail_taken_places_compact_formats(self):
+        for carriage, seat in ((1, 1), (1, 2), (1, 3), (1, 10), (3, 9)):
+            Ticket.objects.create(
+                journey=self.journey,
+                order=self.order,
+                carriage=carriage,
+                seat=seat,
+            )
+        url = journey_detail_url(self.journey.pk)
+
+        bitmap = self.client.get(url, {"taken_places": "bitmap"})
+        ranges = self.client.get(url, {"taken_places": "ranges"})
+
+        self.assertEqual(
+            bitmap.data["taken_places"],
+            {"format": "bitmap", "carriages": ["BwI=", "AAA=", "AAE="]},
+        )
+        self.assertEqual(
+            ranges.data["taken_places"],
+            {
+                "format": "ranges",
+                "carriages": [[(1, 3), (10, 10)], [], [(9, 9)]],
+            },
+        )
+        self.assertEqual(
+            self.client.get(url, {"taken_places": "xml"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_rebuild_seat_maps(self):
+        Ticket.objects.create(
+            journey=self.journey, order=self.order, carriage=1, seat=1
+        )
+        Journey.objects.update(occupancy=b"", seats_taken=0)
+
+        rebuild_seat_maps()
+        journey = Journey.objects.get(pk=self.journey.pk)
+
+        self.assertEqual(journey.seats_taken, 1)
+
+
+class JourneyFilterTestCases(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_filter_by_departure_date(self):
+        day_start = timezone.make_aware(
+            datetime.combine(
+                timezone.localdate() + timedelta(days=3), time.min
+            )
+        )
+        route, train = sample_route(), sample_train()
+        inside = [
+            sample_journey(
+                route=route,
+                train=train,
+                departure_time=departure_time,
+                arrival_time=departure_time + timedelta(hours=1),
+            )
+            for departure_time in (
+                day_start,
+                day_start + timedelta(hours=23, minutes=59),
+            )
+        ]
+        for departure_time in (
+            day_start - timedelta(minutes=1),
+            day_start + timedelta(days=1),
+        ):
+            sample_journey(
+                route=route,
+                train=train,
+                departure_time=departure_time,
+                arrival_time=departure_time + timedelta(hours=1),
+            )
+
+        response = self.client.get(
+            JOURNEYS_LIST_URL,
+            {"departure-date": day_start.date().isoformat()},
+        )
+
+        self.assertEqual(
+            sorted(journey["id"] for journey in response.data["results"]),
+            sorted(journey.id for journey in inside),
+        )
+
+
+class JourneyAllocateTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        # 3 carriages of 10 seats
+        self.journey = sample_journey()
+        self.order = sample_order(self.user)
+
+    def take(self, *seats):
+        for carriage, seat in seats:
+            Ticket.objects.create(
+                journey=self.journey,
+                order=self.order,
+                carriage=carriage,
+                seat=seat,
+            )
+
+    def allocate(self, party_size):
+        return self.client.get(
+            journey_allocate_url(self.journey.id),
+            {"party_size": party_size},
+        )
+
+    def test_smallest_fitting_block_is_allocated(self):
+        self.take((1, 4), (2, 3))
+
+        res = self.allocate(3)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["adjacent"])
+        self.assertEqual(
+            [(seat["carriage"], seat["seat"]) for seat in res.data["seats"]],
+            [(1, 1), (1, 2), (1, 3)],
+        )
+
+    def test_party_is_split_over_neighbouring_carriages(self):
+        self.take(*((1, seat) for seat in range(1, 11)))
+        self.take(*((2, seat) for seat in range(1, 8)))
+        self.take(*((3, seat) for seat in range(1, 11, 2)), (3, 10))
+
+        res = self.allocate(5)
+
+        self.assertFalse(res.data["adjacent"])
+        self.assertEqual(
+            [(seat["carriage"], seat["seat"]) for seat in res.data["seats"]],
+            [(2, 8), (2, 9), (2, 10), (3, 2), (3, 4)],
+        )
+
+    def test_seats_held_by_other_users_are_skipped(self):
+        other_client = APIClient()
+        other_client.force_authenticate(
+            get_user_model().objects.create_user("other@test.com", "pass")
+        )
+        other_client.post(
+            reverse("station_app:seat-holds-list"),
+            {
+                "journey": self.journey.id,
+                "seats": [{"carriage": 1, "seat": 2}],
+            },
+            format="json",
+        )
+
+        res = self.allocate(2)
+
+        self.assertEqual(
+            [(seat["carriage"], seat["seat"]) for seat in res.data["seats"]],
+            [(1, 3), (1, 4)],
+        )
+
+    def test_party_larger_than_free_seats(self):
+        self.take(*((1, seat) for seat in range(1, 11)))
+        self.take(*((2, seat) for seat in range(1, 11)))
+        self.take(*((3, seat) for seat in range(1, 9)))
+
+        res = self.allocate(3)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.allocate(0).status_code, status.HTTP_400_BAD_REQUEST
+        )
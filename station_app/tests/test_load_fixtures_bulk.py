@@ -0,0 +1,168 @@
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from station_app.management.commands.load_fixtures_bulk import (
+    iter_json_array,
+)
+from station_app.models import Journey, Order, Route, Station, Ticket
+
+
+def fixture_objects(user_id):
+    departure_time = timezone.now() + timedelta(days=1)
+    objects = [
+        {"model": "station_app.ticket", "pk": pk, "fields": fields}
+        for pk, fields in enumerate(
+            (
+                {"carriage": 1, "seat": 1, "order": 1, "journey": 1},
+                {"carriage": 2, "seat": 5, "order": 1, "journey": 1},
+            ),
+            start=1,
+        )
+    ]
+    objects += [
+        {
+            "model": "station_app.order",
+            "pk": 1,
+            "fields": {"created_at": "2023-10-24 08:35:48", "user": user_id},
+        },
+        {
+            "model": "station_app.journey",
+            "pk": 1,
+            "fields": {
+                "route": 1,
+                "train": 1,
+                "departure_time": departure_time.isoformat(),
+                "arrival_time": (
+                    departure_time + timedelta(hours=3)
+                ).isoformat(),
+                "crew": [],
+            },
+        },
+        {
+            "model": "station_app.train",
+            "pk": 1,
+            "fields": {
+                "name": "Train 1",
+                "carriage_num": 2,
+                "places_in_carriage": 10,
+                "train_type": 1,
+            },
+        },
+        {"model": "station_app.traintype", "pk": 1, "fields": {"name": "IC"}},
+        {
+            "model": "station_app.route",
+            "pk": 1,
+            "fields": {"source": 1, "destination": 2, "distance": 540.5},
+        },
+    ]
+    objects += [
+        {
+            "model": "station_app.station",
+            "pk": pk,
+            "fields": {"name": name, "latitude": 50, "longitude": 30},
+        }
+        for pk, name in ((1, "Kyiv"), (2, "Lviv"))
+    ]
+    return objects
+
+
+class LoadFixturesBulkTestCases(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_fixture(self, objects):
+        path = os.path.join(self.directory.name, "fixture.json")
+        with open(path, "w") as fixture:
+            json.dump(objects, fixture, indent=4)
+        return path
+
+    def test_iter_json_array_small_reads(self):
+        objects = fixture_objects(self.user.id)
+        stream = io.StringIO(json.dumps(objects, indent=2))
+
+        self.assertEqual(list(iter_json_array(stream, read_size=7)), objects)
+
+    def test_load_in_dependency_order(self):
+        path = self.write_fixture(fixture_objects(self.user.id))
+
+        call_command(
+            "load_fixtures_bulk", path, chunk_size=1, stdout=io.StringIO()
+        )
+
+        self.assertEqual(Station.objects.count(), 2)
+        self.assertEqual(Route.objects.get().distance, 540.5)
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(Order.objects.get().created_at.year, 2023)
+        self.assertEqual(
+            list(Journey.objects.get().seat_map.taken()), [(1, 1), (2, 5)]
+        )
+
+    def test_invalid_foreign_key_rolls_back_everything(self):
+        objects = fixture_objects(self.user.id)
+        objects[0]["fields"]["journey"] = 42
+        path = self.write_fixture(objects)
+
+        with self.assertRaises(CommandError):
+            call_command("load_fixtures_bulk", path, stdout=io.StringIO())
+
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(Station.objects.exists())
+        self.assertFalse(Journey.objects.exists())
+
+    def test_field_validation_runs(self):
+        objects = fixture_objects(self.user.id)
+        objects[-1]["fields"]["name"] = "x" * 101
+        path = self.write_fixture(objects)
+
+        with self.assertRaises(CommandError):
+            call_command("load_fixtures_bulk", path, stdout=io.StringIO())
+
+    def test_departed_journey_loads(self):
+        objects = fixture_objects(self.user.id)
+        journey = next(
+            obj for obj in objects if obj["model"] == "station_app.journey"
+        )
+        journey["fields"]["departure_time"] = "2020-01-01T08:00:00+00:00"
+        journey["fields"]["arrival_time"] = "2020-01-01T11:00:00+00:00"
+        journey["fields"]["crew"] = [1]
+        objects.append(
+            {
+                "model": "station_app.crew",
+                "pk": 1,
+                "fields": {
+                    "first_name": "Ivan",
+                    "last_name": "Franko",
+                    "staff_member_since": "2020-01-01",
+                    "profile_image": "uploads/crew/franko.jpg",
+                },
+            }
+        )
+        path = self.write_fixture(objects)
+
+        call_command("load_fixtures_bulk", path, stdout=io.StringIO())
+
+        self.assertEqual(Journey.objects.get().departure_time.year, 2020)
+        self.assertEqual(Journey.objects.get().crew.count(), 1)
+
+    def test_iter_json_array_stops_at_malformed_object(self):
+        stream = io.StringIO('[{"a": 1}, {"b" 2}, ' + '{"c": 3}, ' * 1000)
+        objects = iter_json_array(stream, read_size=16)
+
+        self.assertEqual(next(objects), {"a": 1})
+        with self.assertRaises(CommandError):
+            next(objects)
+        self.assertLess(stream.tell(), 100)
@@ -0,0 +1,176 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from station_app.metrics import (
+    MetricsFile,
+    collect,
+    metrics_file,
+    render,
+)
+from station_app.tests.samples import (
+    JOURNEYS_LIST_URL,
+    clear_caches,
+    sample_journey,
+)
+
+METRICS_URL = reverse("metrics")
+
+
+class MetricsFileTestCases(TestCase):
+    def test_files_of_several_processes_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = MetricsFile(os.path.join(directory, f"{os.getpid()}.db"))
+            second = MetricsFile(os.path.join(directory, f"{os.getppid()}.db"))
+            first.add("request_duration_seconds\tjourneys.list\t0.01", 1)
+            first.add("request_duration_seconds\tjourneys.list\t0.01", 1)
+            second.add("request_duration_seconds\tjourneys.list\t0.01", 1)
+            second.add("request_duration_seconds\tjourneys.list\t+Inf", 1)
+            first.close()
+            second.close()
+
+            totals = collect(directory)
+
+        self.assertEqual(
+            totals["request_duration_seconds\tjourneys.list\t0.01"], 3
+        )
+        text = render(totals)
+        self.assertIn(
+            'station_app_request_duration_seconds_bucket{action="journeys'
+            '.list",le="0.01"} 3',
+            text,
+        )
+        self.assertIn(
+            'station_app_request_duration_seconds_count{action="journeys'
+            '.list"} 4',
+            text,
+        )
+
+    def test_reopened_file_keeps_counters(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"{os.getpid()}.db")
+            metrics = MetricsFile(path)
+            for index in range(5000):  # past the initial size
+                metrics.add(f"key-{index}", index)
+            metrics.close()
+
+            metrics = MetricsFile(path)
+            metrics.add("key-4999", 1)
+            metrics.close()
+
+            totals = collect(directory)
+
+        self.assertEqual(len(totals), 5000)
+        self.assertEqual(totals["key-4999"], 5000)
+
+    def test_threads_of_a_process_share_one_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stores = []
+
+            def count():
+                store = metrics_file(directory)
+                stores.append(store)
+                for _ in range(1000):
+                    store.add("key", 1)
+
+            threads = [threading.Thread(target=count) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            totals = collect(directory)
+            names = os.listdir(directory)
+
+        self.assertEqual(names, [f"{os.getpid()}.db"])
+        self.assertEqual(len(set(map(id, stores))), 1)
+        self.assertEqual(totals["key"], 8000)
+
+    def test_files_of_dead_processes_are_removed(self):
+        dead_pid = subprocess.run(
+            [sys.executable, "-c", "import os; print(os.getpid())"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        with tempfile.TemporaryDirectory() as directory:
+            for pid in (os.getpid(), dead_pid):
+                metrics = MetricsFile(os.path.join(directory, f"{pid}.db"))
+                metrics.add("key", 1)
+                metrics.close()
+
+            totals = collect(directory)
+
+            self.assertEqual(totals["key"], 1)
+            self.assertEqual(os.listdir(directory), [f"{os.getpid()}.db"])
+
+
+class MetricsEndpointTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            STATION_APP_METRICS={"DIR": self.directory.name, "PUBLIC": True}
+        )
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "testpass")
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+
+    def test_viewset_actions_are_measured(self):
+        sample_journey()
+        self.client.get(JOURNEYS_LIST_URL)
+
+        text = self.client.get(METRICS_URL).content.decode()
+
+        for metric in (
+            "request_duration_seconds",
+            "db_duration_seconds",
+            "serializer_duration_seconds",
+            "response_size_bytes",
+        ):
+            self.assertIn(
+                f'station_app_{metric}_count{{action="journeys.list"}} 1',
+                text,
+            )
+
+    def test_token_is_required_when_set(self):
+        with override_settings(
+            STATION_APP_METRICS={
+                "DIR": self.directory.name,
+                "TOKEN": "secret",
+            }
+        ):
+            self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+            response = self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_admins_only_without_a_token(self):
+        with override_settings(
+            STATION_APP_METRICS={"DIR": self.directory.name}
+        ):
+            self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+            self.assertEqual(APIClient().get(METRICS_URL).status_code, 403)
+            self.client.force_authenticate(
+                get_user_model().objects.create_superuser(
+                    "admin@test.com", "testpass"
+                )
+            )
+            response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, 200)
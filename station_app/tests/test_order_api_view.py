@@ -0,0 +1,222 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from station_app.models import Journey, Order, Ticket
+from .samples import (
+    ORDERS_LIST_URL,
+    order_detail_url,
+    sample_journey,
+    sample_order,
+)
+
+
+def order_payload(journey, seats, carriage=1):
+    return {
+        "tickets": [
+            {"journey": journey.pk, "carriage": carriage, "seat": seat}
+            for seat in seats
+        ]
+    }
+
+
+class OrderCreateTestCases(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_create_order(self):
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (1, 2, 3)),
+            format="json",
+        )
+        journey = Journey.objects.get(pk=self.journey.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["tickets"]), 3)
+        self.assertEqual(Ticket.objects.count(), 3)
+        self.assertEqual(journey.seats_taken, 3)
+
+    def test_create_order_query_count_does_not_grow(self):
+        def count_queries(seats, carriage):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    ORDERS_LIST_URL,
+                    order_payload(self.journey, seats, carriage),
+                    format="json",
+                )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(
+            count_queries(range(1, 2), 1), count_queries(range(1, 11), 2)
+        )
+
+    def test_create_order_taken_seat(self):
+        order = sample_order(self.user)
+        Ticket.objects.create(
+            journey=self.journey, order=order, carriage=1, seat=2
+        )
+
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (1, 2)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_create_order_duplicated_seat(self):
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (4, 4)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_create_order_seat_out_of_range(self):
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (11,)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_order_unknown_journey(self):
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            {"tickets": [{"journey": 999, "carriage": 1, "seat": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderUpdateTestCases(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        response = self.client.post(
+            ORDERS_LIST_URL,
+            order_payload(self.journey, (1, 2, 3)),
+            format="json",
+        )
+        self.order = Order.objects.get(pk=response.data["id"])
+
+    def update_order(self, payload):
+        return self.client.put(
+            order_detail_url(self.order.pk), payload, format="json"
+        )
+
+    def taken_seats(self):
+        return list(Journey.objects.get(pk=self.journey.pk).seat_map.taken())
+
+    def test_update_keeps_removes_and_adds_tickets(self):
+        kept = Ticket.objects.get(order=self.order, seat=1)
+
+        response = self.update_order(order_payload(self.journey, (1, 5)))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(self.order.tickets.values_list("seat", flat=True)), [1, 5]
+        )
+        self.assertTrue(Ticket.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(self.taken_seats(), [(1, 1), (1, 5)])
+
+    def test_update_moves_ticket_by_id(self):
+        ticket = Ticket.objects.get(order=self.order, seat=3)
+        payload = order_payload(self.journey, (1, 2))
+        payload["tickets"].append(
+            {
+                "id": ticket.pk,
+                "journey": self.journey.pk,
+                "carriage": 2,
+                "seat": 3,
+            }
+        )
+
+        response = self.update_order(payload)
+        ticket.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ticket.carriage, 2)
+        self.assertEqual(self.taken_seats(), [(1, 1), (1, 2), (2, 3)])
+
+    def test_update_swaps_seats_by_id(self):
+        first = Ticket.objects.get(order=self.order, seat=1)
+        second = Ticket.objects.get(order=self.order, seat=2)
+        payload = order_payload(self.journey, (3,))
+        for ticket, seat in ((first, 2), (second, 1)):
+            payload["tickets"].append(
+                {
+                    "id": ticket.pk,
+                    "journey": self.journey.pk,
+                    "carriage": 1,
+                    "seat": seat,
+                }
+            )
+
+        response = self.update_order(payload)
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((first.seat, second.seat), (2, 1))
+        self.assertEqual(self.taken_seats(), [(1, 1), (1, 2), (1, 3)])
+
+    def test_update_query_count_does_not_grow(self):
+        def count_queries(seats):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.update_order(
+                    order_payload(self.journey, seats, carriage=3)
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.assertEqual(count_queries((1, 2)), count_queries(range(3, 11)))
+
+    def test_update_taken_seat(self):
+        other_order = sample_order(self.user)
+        Ticket.objects.create(
+            journey=self.journey, order=other_order, carriage=1, seat=7
+        )
+
+        response = self.update_order(order_payload(self.journey, (1, 7)))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.order.tickets.count(), 3)
+
+    def test_update_unknown_ticket_id(self):
+        payload = order_payload(self.journey, (1,))
+        payload["tickets"][0]["id"] = 999
+
+        response = self.update_order(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partial_update_without_tickets_keeps_them(self):
+        response = self.client.patch(
+            order_detail_url(self.order.pk), {}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.order.tickets.count(), 3)
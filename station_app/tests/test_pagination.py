@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from station_app.models import Journey
+from .samples import (
+    JOURNEYS_LIST_URL,
+    sample_journey,
+    sample_route,
+    sample_train,
+)
+
+
+class KeysetPaginationTestCases(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        route, train = sample_route(), sample_train()
+        for _ in range(5):
+            sample_journey(route=route, train=train)
+
+    def test_default_pagination_is_page_number(self):
+        response = self.client.get(JOURNEYS_LIST_URL)
+
+        self.assertIn("count", response.data)
+
+    def test_cursor_pages_cover_all_journeys(self):
+        ids = []
+        url = f"{JOURNEYS_LIST_URL}?pagination=cursor&page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [journey["id"] for journey in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(
+            ids,
+            list(Journey.objects.order_by("-id").values_list("id", flat=True)),
+        )
+
+    def test_cursor_page_skips_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f"{JOURNEYS_LIST_URL}?pagination=cursor")
+
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in queries.captured_queries)
+        )
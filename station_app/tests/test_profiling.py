@@ -0,0 +1,108 @@
+import os
+import pstats
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station_app.profiling import ProfileStore
+from station_app.tests.samples import (
+    JOURNEYS_LIST_URL,
+    clear_caches,
+    sample_journey,
+)
+
+PROFILES_LIST_URL = reverse("station_app:profiles-list")
+
+
+class ProfileStoreTestCases(TestCase):
+    def test_oldest_profiles_are_pruned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ProfileStore(directory, max_profiles=2, max_bytes=10**6)
+            for second in range(3):
+                store.save(
+                    {"id": f"20261017T00000{second}-0123abcd"},
+                    {"txt": b"summary"},
+                )
+
+            self.assertEqual(
+                store.ids(),
+                ["20261017T000002-0123abcd", "20261017T000001-0123abcd"],
+            )
+            self.assertEqual(len(os.listdir(directory)), 4)
+
+    def test_ids_outside_the_store_are_rejected(self):
+        store = ProfileStore("/tmp", max_profiles=1, max_bytes=1)
+
+        self.assertIsNone(store.path("../etc/passwd", "txt"))
+        self.assertIsNone(store.get("20261017T000000-0123abcd"))
+
+
+class ProfilingMiddlewareTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            STATION_APP_PROFILING={"DIR": self.directory.name}
+        )
+        self.settings_override.enable()
+        sample_journey()
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "testpass"
+        )
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+
+    def authenticate(self, user):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+
+    def test_admin_request_is_profiled(self):
+        self.authenticate(self.admin)
+
+        response = self.client.get(JOURNEYS_LIST_URL, HTTP_X_PROFILE="1")
+
+        self.assertEqual(response.status_code, 200)
+        profile_id = response["X-Profile-Id"]
+        profiles = self.client.get(PROFILES_LIST_URL).data
+        self.assertEqual([profile["id"] for profile in profiles], [profile_id])
+        self.assertEqual(profiles[0]["path"], JOURNEYS_LIST_URL)
+        self.assertEqual(set(profiles[0]["files"]), {"prof", "txt"})
+
+        download = self.client.get(profiles[0]["files"]["prof"])
+        with tempfile.NamedTemporaryFile() as dump:
+            dump.write(b"".join(download.streaming_content))
+            dump.flush()
+            self.assertGreater(pstats.Stats(dump.name).total_calls, 0)
+
+    def test_sampling_profile_has_collapsed_stacks(self):
+        self.authenticate(self.admin)
+
+        response = self.client.get(JOURNEYS_LIST_URL, {"_profile": "sample"})
+
+        profile = self.client.get(
+            reverse(
+                "station_app:profiles-detail", args=[response["X-Profile-Id"]]
+            )
+        ).data
+        self.assertEqual(profile["mode"], "sample")
+        self.assertEqual(set(profile["files"]), {"collapsed", "txt"})
+
+    def test_flag_of_non_admin_is_ignored(self):
+        self.authenticate(self.user)
+
+        response = self.client.get(JOURNEYS_LIST_URL, HTTP_X_PROFILE="1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(self.client.get(PROFILES_LIST_URL).status_code, 403)
@@ -0,0 +1,132 @@
+import gzip
+import json
+import math
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from station_app.compression import negotiate
+from station_app.renderers import FastJSONRenderer
+from .samples import JOURNEYS_LIST_URL, clear_caches, sample_journey
+
+
+class FastJSONRendererTestCases(TestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            "departure": datetime(
+                2026, 10, 17, 8, 30, 15, 123456, tzinfo=timezone.utc
+            ),
+            "day": date(2026, 10, 17),
+            "duration": timedelta(hours=5),
+            "price": Decimal("12.50"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "name": gettext_lazy("Kyiv – Lviv"),
+            "separators": "line paragraph ",
+            1: [1.5, None, True, ("a", "b")],
+        }
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_floats(self):
+        data = {
+            "latitude": 49.8397,
+            "longitude": -24.029717,
+            "tiny": 1e-05,
+            "huge": 1e16,
+        }
+
+        rendered = FastJSONRenderer().render(data)
+
+        # same values; exponents are spelled by orjson
+        self.assertEqual(json.loads(rendered), data)
+        self.assertIn(b'"latitude":49.8397,"longitude":-24.029717', rendered)
+        self.assertIn(b'"tiny":0.00001,"huge":1e16', rendered)
+
+    def test_non_finite_floats_raise_as_in_json_renderer(self):
+        for value in (math.nan, math.inf, -math.inf):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({"results": [{"latitude": value}]})
+
+    def test_nulls_are_kept(self):
+        data = {"previous": None, "results": [{"latitude": 1.5}]}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indented_output_falls_back(self):
+        data = {"id": 1}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+
+class CompressionTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "testpass")
+        )
+        for _ in range(20):
+            sample_journey()
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate("gzip, br", ["br", "gzip"]), "br")
+        self.assertEqual(
+            negotiate("gzip;q=1, br;q=0.5", ["br", "gzip"]), "gzip"
+        )
+        self.assertEqual(negotiate("*", ["gzip"]), "gzip")
+        self.assertIsNone(negotiate("gzip;q=0", ["gzip"]))
+        self.assertIsNone(negotiate("", ["gzip"]))
+
+    def test_gzip_response(self):
+        identity = self.client.get(JOURNEYS_LIST_URL, {"page_size": 20})
+        response = self.client.get(
+            JOURNEYS_LIST_URL, {"page_size": 20}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertNotIn("Content-Encoding", identity)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+        not_modified = self.client.get(
+            JOURNEYS_LIST_URL,
+            {"page_size": 20},
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_html_is_not_compressed(self):
+        response = self.client.get(
+            JOURNEYS_LIST_URL,
+            HTTP_ACCEPT="text/html",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+
+        self.assertTrue(response["Content-Type"].startswith("text/html"))
+        self.assertGreater(len(response.content), 1024)
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_small_responses_are_not_compressed(self):
+        with override_settings(
+            REST_FRAMEWORK={"COMPRESSION": {"MIN_SIZE": 10**6}}
+        ):
+            response = self.client.get(
+                JOURNEYS_LIST_URL, HTTP_ACCEPT_ENCODING="gzip"
+            )
+
+        self.assertNotIn("Content-Encoding", response)
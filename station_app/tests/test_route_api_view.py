@@ -6,6 +6,7 @@ from rest_framework import status
 from station_app.models import Route, Station
 from station_app.serializers import RouteSerializer
 from .samples import (
+    clear_caches,
     ROUTES_LIST_URL,
     sample_station,
 )
@@ -13,6 +14,7 @@ from .samples import (
 
 class AuthenticatedStationTestCases(TestCase):
     def setUp(self):
+        clear_caches()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com",
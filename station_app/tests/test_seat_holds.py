@@ -0,0 +1,240 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station_app.cache import get_cache
+from station_app.holds import get_hold, user_lock_key
+from station_app.models import Ticket
+from station_app.tests.samples import (
+    ORDERS_LIST_URL,
+    clear_caches,
+    sample_journey,
+)
+
+SEAT_HOLDS_URL = reverse("station_app:seat-holds-list")
+
+
+def seat_hold_url(hold_id: str, action: str = "detail"):
+    return reverse(f"station_app:seat-holds-{action}", args=[hold_id])
+
+
+class SeatHoldTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.journey = sample_journey()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            "other@test.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def hold(self, *seats, client=None):
+        return (client or self.client).post(
+            SEAT_HOLDS_URL,
+            {
+                "journey": self.journey.id,
+                "seats": [
+                    {"carriage": carriage, "seat": seat}
+                    for carriage, seat in seats
+                ],
+            },
+            format="json",
+        )
+
+    def other_client(self):
+        client = APIClient()
+        client.force_authenticate(self.other_user)
+        return client
+
+    def order(self, *seats, client=None):
+        return (client or self.client).post(
+            ORDERS_LIST_URL,
+            {
+                "tickets": [
+                    {"journey": self.journey.id, "carriage": c, "seat": s}
+                    for c, s in seats
+                ]
+            },
+            format="json",
+        )
+
+    def test_hold_seats(self):
+        res = self.hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["journey"], self.journey.id)
+        self.assertEqual(
+            res.data["seats"],
+            [{"carriage": 1, "seat": 1}, {"carriage": 1, "seat": 2}],
+        )
+        self.assertIn("expires_at", res.data)
+        self.assertEqual(get_hold(res.data["id"])["user_id"], self.user.id)
+
+    def test_conflicting_hold_is_refused_as_a_whole(self):
+        self.hold((1, 2))
+
+        res = self.hold((1, 1), (1, 2), client=self.other_client())
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["seats"], ["seat 2 in carriage 1 is already held"]
+        )
+        # seat 1 was not left held by the refused hold
+        self.assertEqual(
+            self.hold((1, 1), client=self.other_client()).status_code,
+            status.HTTP_201_CREATED,
+        )
+
+    def test_taken_and_invalid_seats_are_not_held(self):
+        self.order((1, 1), client=self.other_client())
+
+        self.assertEqual(
+            self.hold((1, 1)).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.hold((9, 1)).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.hold((1, 2), (1, 2)).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_other_users_cant_order_held_seats(self):
+        self.hold((1, 1))
+
+        res = self.order((1, 1), client=self.other_client())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_ordering_own_held_seats_releases_them(self):
+        hold_id = self.hold((1, 1), (1, 2)).data["id"]
+
+        res = self.order((1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        # the unsold seat stays held, the sold one is free in the cache
+        self.assertEqual(
+            self.hold((1, 2), client=self.other_client()).status_code,
+            status.HTTP_409_CONFLICT,
+        )
+        self.assertIsNotNone(get_hold(hold_id))
+
+    def test_confirm_hold(self):
+        hold_id = self.hold((2, 3), (2, 4)).data["id"]
+
+        res = self.client.post(seat_hold_url(hold_id, "confirm"))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(
+                Ticket.objects.filter(order__user=self.user).values_list(
+                    "carriage", "seat"
+                )
+            ),
+            [(2, 3), (2, 4)],
+        )
+        self.assertIsNone(get_hold(hold_id))
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 2)
+
+    def test_release_hold(self):
+        hold_id = self.hold((1, 1)).data["id"]
+
+        res = self.client.delete(seat_hold_url(hold_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.hold((1, 1), client=self.other_client()).status_code,
+            status.HTTP_201_CREATED,
+        )
+
+    def test_holds_of_other_users_are_hidden(self):
+        hold_id = self.hold((1, 1)).data["id"]
+        client = self.other_client()
+
+        self.assertEqual(
+            client.get(seat_hold_url(hold_id)).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(
+            client.post(seat_hold_url(hold_id, "confirm")).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_ticket_cant_move_to_seat_held_by_other_user(self):
+        self.order((1, 1))
+        ticket = Ticket.objects.get(order__user=self.user)
+        self.hold((1, 2), client=self.other_client())
+        url = reverse("station_app:tickets-detail", args=[ticket.id])
+        payload = {"journey": self.journey.id, "carriage": 1, "seat": 2}
+
+        res = self.client.put(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.seat, 1)
+
+        payload["seat"] = 3
+        res = self.client.put(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_hold_waits_for_users_lock(self):
+        get_cache().add(user_lock_key(self.user.id), "other", 10)
+
+        with override_settings(
+            STATION_APP_SEAT_HOLDS={"USER_LOCK_WAIT": 0.05}
+        ):
+            res = self.hold((1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["detail"].code, "holds_busy")
+
+        get_cache().delete(user_lock_key(self.user.id))
+        self.assertEqual(self.hold((1, 1)).status_code, 201)
+
+    @override_settings(
+        STATION_APP_SEAT_HOLDS={
+            "MAX_SEATS_PER_JOURNEY": 4,
+            "MAX_SEATS_PER_USER": 6,
+        }
+    )
+    def test_held_seats_are_capped_per_user(self):
+        first = self.hold((1, 1), (1, 2), (1, 3))
+
+        res = self.hold((1, 4), (1, 5))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # other users aren't limited by the cap of this one
+        self.assertEqual(
+            self.hold((1, 4), (1, 5), client=self.other_client()).status_code,
+            status.HTTP_201_CREATED,
+        )
+        # seats freed by a release or an order count no more
+        self.client.delete(seat_hold_url(first.data["id"]))
+        self.assertEqual(
+            self.hold((1, 6), (1, 7), (1, 8)).status_code,
+            status.HTTP_201_CREATED,
+        )
+        self.assertEqual(
+            self.order((1, 6)).status_code, status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            self.hold((1, 9), (1, 10)).status_code, status.HTTP_201_CREATED
+        )
+
+        # 4 seats of this journey and 2 of another reach the user cap
+        self.journey = sample_journey()
+        self.assertEqual(
+            self.hold((2, 1), (2, 2)).status_code, status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            self.hold((2, 3)).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
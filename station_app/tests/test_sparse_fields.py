@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station_app.models import Crew, Ticket
+from station_app.serializers import JoureyDetailSerializer
+from station_app.sparse import serializer_lookups
+from .samples import (
+    JOURNEYS_LIST_URL,
+    ORDERS_LIST_URL,
+    clear_caches,
+    journey_detail_url,
+    sample_journey,
+    sample_order,
+)
+from .test_order_api_view import order_payload
+
+
+class SparseFieldsTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.journey.crew.add(
+            Crew.objects.create(first_name="Ann", last_name="Zed")
+        )
+        order = sample_order(self.user)
+        for seat in (1, 2):
+            Ticket.objects.create(
+                journey=self.journey, order=order, carriage=1, seat=seat
+            )
+
+    def get(self, url, params):
+        clear_caches()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        return response, " ".join(query["sql"] for query in captured)
+
+    def test_fields_prune_output_and_joins(self):
+        response, sql = self.get(
+            JOURNEYS_LIST_URL, {"fields": "id,departure_time"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.data["results"][0]), ["id", "departure_time"]
+        )
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("station_app_crew", sql)
+
+    def test_kept_annotation_joins_what_it_reads(self):
+        response, sql = self.get(
+            JOURNEYS_LIST_URL, {"fields": "id,tickets_available"}
+        )
+
+        self.assertEqual(
+            response.data["results"][0],
+            {"id": self.journey.id, "tickets_available": 28},
+        )
+        self.assertIn("station_app_train", sql)
+        self.assertNotIn("station_app_station", sql)
+
+    def test_omit(self):
+        response, sql = self.get(
+            journey_detail_url(self.journey.id), {"omit": "crew,taken_places"}
+        )
+
+        self.assertNotIn("crew", response.data)
+        self.assertNotIn("taken_places", response.data)
+        self.assertIn("tickets_available", response.data)
+        self.assertNotIn("station_app_crew", sql)
+
+    def test_omitted_aggregate_drops_group_by(self):
+        response, sql = self.get(ORDERS_LIST_URL, {})
+        self.assertEqual(response.data["results"][0]["total_tickets"], 2)
+        self.assertIn("GROUP BY", sql)
+
+        response, sql = self.get(
+            ORDERS_LIST_URL, {"omit": "total_tickets,tickets"}
+        )
+
+        self.assertEqual(
+            list(response.data["results"][0]), ["id", "created_at"]
+        )
+        self.assertNotIn("GROUP BY", sql)
+        self.assertNotIn("station_app_ticket", sql)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(
+            JOURNEYS_LIST_URL, {"fields": "id,seats", "omit": "price"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            {
+                "fields": ["unknown fields: seats"],
+                "omit": ["unknown fields: price"],
+            },
+        )
+
+    def test_writes_keep_every_field(self):
+        response = self.client.post(
+            f"{ORDERS_LIST_URL}?fields=id",
+            order_payload(self.journey, (3,)),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("tickets", response.data)
+
+    def test_serializer_lookups(self):
+        self.assertEqual(
+            serializer_lookups(JoureyDetailSerializer()),
+            {
+                "crew",
+                "tickets_available",
+                "route__source",
+                "route__destination",
+                "train",
+                "id",
+                "departure_time",
+                "arrival_time",
+            },
+        )
@@ -7,6 +7,7 @@ from station_app.models import Station
 from station_app.serializers import StationSerializer, StationDetailSerializer
 
 from .samples import (
+    clear_caches,
     sample_station,
     station_detail_url,
     STATION_PAYLOAD,
@@ -16,6 +17,7 @@ from .samples import (
 
 class AuthenticatedStationTestCases(TestCase):
     def setUp(self):
+        clear_caches()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com",
@@ -82,6 +84,7 @@ class AuthenticatedStationTestCases(TestCase):
 
 class AdminUserStationTestCases(TestCase):
     def setUp(self):
+        clear_caches()
         self.client = APIClient()
         self.user = get_user_model().objects.create_superuser(
             "test@test.com",
@@ -121,3 +124,33 @@ class AdminUserStationTestCases(TestCase):
         response = self.client.delete(station_detail_url())
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class StationCacheTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        sample_station()
+
+    def test_list_served_from_cache(self):
+        self.client.get(STATIONS_LIST_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(STATIONS_LIST_URL)
+
+        self.assertEqual(response.data["count"], 1)
+
+    def test_write_invalidates_cached_list(self):
+        self.client.get(STATIONS_LIST_URL)
+
+        self.client.post(
+            STATIONS_LIST_URL, {**STATION_PAYLOAD, "name": "Other station"}
+        )
+        response = self.client.get(STATIONS_LIST_URL)
+
+        self.assertEqual(response.data["count"], 2)
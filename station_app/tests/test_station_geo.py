@@ -0,0 +1,88 @@
+import random
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from station_app.geo import haversine_km, station_geo_index
+from station_app.models import Station
+from .samples import STATIONS_LIST_URL
+
+
+class StationGeoTestCases(TestCase):
+    def setUp(self):
+        station_geo_index.invalidate()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        generator = random.Random(7)
+        Station.objects.bulk_create(
+            Station(
+                name=f"Station {i}",
+                latitude=generator.uniform(44, 52),
+                longitude=generator.uniform(22, 40),
+            )
+            for i in range(200)
+        )
+
+    def by_distance(self, latitude, longitude):
+        return sorted(
+            (
+                haversine_km(
+                    latitude, longitude, station.latitude, station.longitude
+                ),
+                station.id,
+            )
+            for station in Station.objects.all()
+        )
+
+    def test_nearest_matches_brute_force(self):
+        for latitude, longitude in ((50.45, 30.52), (46.48, 30.72), (0, 0)):
+            expected = [
+                station_id
+                for _, station_id in self.by_distance(latitude, longitude)[:7]
+            ]
+            found = station_geo_index.nearest(latitude, longitude, 7)
+
+            self.assertEqual([station["id"] for station in found], expected)
+
+    def test_within_matches_brute_force(self):
+        expected = {
+            station_id
+            for distance, station_id in self.by_distance(49.84, 24.03)
+            if distance <= 300
+        }
+        found = station_geo_index.within(49.84, 24.03, 300)
+
+        self.assertEqual({station["id"] for station in found}, expected)
+
+    def test_near_endpoint(self):
+        response = self.client.get(
+            STATIONS_LIST_URL, {"near": "50.45,30.52", "k": 3}
+        )
+        distances = [
+            station["distance_km"] for station in response.data["results"]
+        ]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(distances), 3)
+        self.assertEqual(distances, sorted(distances))
+
+    def test_near_endpoint_invalid_point(self):
+        for params in (
+            {"near": "north"},
+            {"near": "nan,30"},
+            {"near": "50,inf"},
+            {"near": "91,30"},
+            {"near": "50,-180.5"},
+            {"near": "50,30", "radius_km": "nan"},
+        ):
+            response = self.client.get(STATIONS_LIST_URL, params)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
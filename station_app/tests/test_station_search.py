@@ -0,0 +1,87 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from station_app.indexes import ReferenceIndex
+from station_app.models import Station
+from station_app.search import station_search
+from .samples import (
+    JOURNEYS_LIST_URL,
+    STATIONS_AUTOCOMPLETE_URL,
+    sample_journey,
+    sample_route,
+)
+
+
+class StationSearchTestCases(TestCase):
+    def setUp(self):
+        station_search.invalidate()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        for name in ("Lviv", "Kyiv-Pasazhyrskyi", "Kyivska Rus", "Odesa"):
+            Station.objects.create(name=name, latitude=0, longitude=0)
+
+    def names(self, ids):
+        return sorted(
+            Station.objects.filter(id__in=ids).values_list("name", flat=True)
+        )
+
+    def test_search_matches_icontains(self):
+        for term in ("kyiv", "V", "ODE", "pasazh", "xyz", "rus"):
+            self.assertEqual(
+                self.names(station_search.search(term)),
+                sorted(
+                    Station.objects.filter(name__icontains=term).values_list(
+                        "name", flat=True
+                    )
+                ),
+            )
+
+    def test_index_refreshes_on_station_change(self):
+        self.assertEqual(station_search.search("dnipro"), [])
+
+        Station.objects.create(name="Dnipro", latitude=0, longitude=0)
+
+        self.assertEqual(
+            self.names(station_search.search("dnipro")), ["Dnipro"]
+        )
+
+    def test_data_survives_invalidate_during_build(self):
+        class Index(ReferenceIndex):
+            def build(self):
+                self.invalidate()
+                return ["built"]
+
+        index = Index()
+
+        self.assertEqual(index.data, ["built"])
+        self.assertEqual(index.data, ["built"])
+
+    def test_autocomplete(self):
+        response = self.client.get(STATIONS_AUTOCOMPLETE_URL, {"q": "kyiv"})
+
+        self.assertEqual(
+            [station["name"] for station in response.data],
+            ["Kyiv-Pasazhyrskyi", "Kyivska Rus"],
+        )
+
+    def test_journey_filter_by_source_name(self):
+        lviv = Station.objects.get(name="Lviv")
+        odesa = Station.objects.get(name="Odesa")
+        journey = sample_journey(
+            route=sample_route(source=lviv, destination=odesa)
+        )
+        sample_journey()
+
+        response = self.client.get(
+            JOURNEYS_LIST_URL, {"source": "lvi", "destination": "des"}
+        )
+
+        self.assertEqual(
+            [journey["id"] for journey in response.data["results"]],
+            [journey.id],
+        )
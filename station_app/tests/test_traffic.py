@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from station_app.traffic import REDACTED, redact
+from station_app.tests.samples import (
+    JOURNEYS_LIST_URL,
+    ORDERS_LIST_URL,
+    clear_caches,
+    sample_journey,
+)
+
+
+class RedactTestCases(TestCase):
+    def test_nested_fields_are_redacted(self):
+        self.assertEqual(
+            redact(
+                {"Password": "x", "tickets": [{"email": "a@b.c", "seat": 1}]},
+                frozenset({"password", "email"}),
+            ),
+            {
+                "Password": REDACTED,
+                "tickets": [{"email": REDACTED, "seat": 1}],
+            },
+        )
+
+
+class TrafficCaptureTestCases(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "requests.jsonl")
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def captured(self) -> list[dict]:
+        with open(self.path) as capture:
+            return [json.loads(line) for line in capture]
+
+    def test_requests_are_captured(self):
+        journey = sample_journey()
+        payload = {
+            "tickets": [{"carriage": 1, "seat": 1, "journey": journey.id}]
+        }
+
+        with override_settings(
+            STATION_APP_TRAFFIC_CAPTURE={
+                "ENABLED": True,
+                "PATH": self.path,
+                "SAMPLE_RATE": 1,
+            }
+        ):
+            self.client.get(JOURNEYS_LIST_URL, {"source": "Route"})
+            self.client.post(ORDERS_LIST_URL, payload, format="json")
+
+        listed, created = self.captured()
+        self.assertEqual(listed["method"], "GET")
+        self.assertEqual(listed["query"], "source=Route")
+        self.assertEqual(listed["user_id"], self.user.id)
+        self.assertEqual(created["body"], payload)
+        self.assertEqual(created["status"], 201)
+
+    def test_capture_is_off_by_default(self):
+        with override_settings(
+            STATION_APP_TRAFFIC_CAPTURE={"PATH": self.path}
+        ):
+            self.client.get(JOURNEYS_LIST_URL)
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+class ReplayTrafficTestCases(LiveServerTestCase):
+    def test_replay_reports_latency_and_errors(self):
+        clear_caches()
+        user = get_user_model().objects.create_user("test@test.com", "pass")
+        sample_journey()
+        records = [
+            {"method": "GET", "path": JOURNEYS_LIST_URL, "user_id": user.id},
+            {"method": "GET", "path": JOURNEYS_LIST_URL, "user_id": None},
+            {"method": "POST", "path": ORDERS_LIST_URL, "user_id": user.id},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            capture = os.path.join(directory, "requests.jsonl")
+            output = os.path.join(directory, "report.json")
+            with open(capture, "w") as capture_file:
+                capture_file.writelines(
+                    json.dumps(record) + "\n" for record in records
+                )
+
+            call_command(
+                "replay_traffic",
+                capture,
+                base_url=self.live_server_url,
+                concurrency=2,
+                read_only=True,
+                output=output,
+                stdout=io.StringIO(),
+            )
+            with open(output) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(report["requests"], 2)
+        self.assertEqual(report["statuses"], {"200": 1, "401": 1})
+        self.assertEqual(report["error_rate"], 0)
+        self.assertIn(f"GET {JOURNEYS_LIST_URL}", report["endpoints"])
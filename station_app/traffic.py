@@ -0,0 +1,104 @@
+import json
+import os
+import random
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULTS = {
+    "ENABLED": False,
+    "PATH": settings.BASE_DIR / "traffic" / "requests.jsonl",
+    "SAMPLE_RATE": 0.01,
+    "PATH_PREFIXES": ("/api/",),
+    # bodies larger than this are recorded by size only
+    "MAX_BODY_BYTES": 64 * 1024,
+    "REDACT_FIELDS": (
+        "password",
+        "token",
+        "access",
+        "refresh",
+        "email",
+        "first_name",
+        "last_name",
+    ),
+}
+
+REDACTED = "[redacted]"
+
+
+def capture_settings() -> dict:
+    return {
+        **DEFAULTS,
+        **getattr(settings, "STATION_APP_TRAFFIC_CAPTURE", {}),
+    }
+
+
+def redact(value, fields: frozenset):
+    """Copy of a JSON document with the values of sensitive keys hidden"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key.lower() in fields else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+class TrafficCaptureMiddleware:
+    """Append a sample of API requests to a JSON lines file for
+    replay_traffic. Headers are never recorded, JSON bodies are kept
+    with REDACT_FIELDS hidden, other bodies by size only."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = capture_settings()
+        if not (
+            options["ENABLED"]
+            and request.path.startswith(tuple(options["PATH_PREFIXES"]))
+            and random.random() < options["SAMPLE_RATE"]
+        ):
+            return self.get_response(request)
+
+        # read before the view consumes the stream, DRF reuses it
+        body = self.request_body(request, options)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        user = getattr(request, "user", None)
+        record = {
+            "timestamp": timezone.now().isoformat(),
+            "method": request.method,
+            "path": request.path,
+            "query": request.META.get("QUERY_STRING", ""),
+            "content_type": request.content_type,
+            **body,
+            "user_id": user.pk if user and user.is_authenticated else None,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 3),
+        }
+        os.makedirs(os.path.dirname(options["PATH"]), exist_ok=True)
+        with open(options["PATH"], "a", encoding="utf-8") as capture:
+            capture.write(json.dumps(record, separators=(",", ":")) + "\n")
+        return response
+
+    @staticmethod
+    def request_body(request, options) -> dict:
+        size = int(request.META.get("CONTENT_LENGTH") or 0)
+        if not size:
+            return {"body": None}
+        if (
+            request.content_type != "application/json"
+            or size > options["MAX_BODY_BYTES"]
+        ):
+            return {"body": None, "body_size": size}
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return {"body": None, "body_size": size}
+        fields = frozenset(field.lower() for field in options["REDACT_FIELDS"])
+        return {"body": redact(body, fields)}
@@ -9,6 +9,8 @@ from .views import (
     JourneyViewSet,
     OrderViewSet,
     TicketViewSet,
+    SeatHoldViewSet,
+    ProfileViewSet,
 )
 
 router = DefaultRouter()
@@ -20,6 +22,8 @@ router.register("crew", CrewViewSet, basename="crew")
 router.register("journeys", JourneyViewSet, basename="journeys")
 router.register("orders", OrderViewSet, basename="orders")
 router.register("tickets", TicketViewSet, basename="tickets")
+router.register("seat-holds", SeatHoldViewSet, basename="seat-holds")
+router.register("profiles", ProfileViewSet, basename="profiles")
 
 urlpatterns = router.urls
 
@@ -1,13 +1,15 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import viewsets
 from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import FileResponse, Http404
 from django.db.models import Count, F
+from django.utils import timezone
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
@@ -39,45 +41,140 @@ from .serializers import (
     TicketSerializer,
     OrderListSerializer,
     OrderDetailSerializer,
+    ConnectionSearchSerializer,
+    ItinerarySerializer,
+    NearbyStationsSerializer,
+    SeatAllocationSerializer,
+    AllocatedSeatsSerializer,
+    ProfileSerializer,
+    SeatHoldSerializer,
+    SeatHoldDetailSerializer,
 )
+from .cache import CachedResponseMixin, ConditionalGetMixin
+from .fastlist import FastListMixin
+from .geo import station_geo_index
+from .holds import (
+    available_seat_map,
+    get_hold,
+    place_hold,
+    release_hold,
+)
+from .metrics import SerializerMetricsMixin
+from .pagination import DefaultSetPagination, KeysetPaginationMixin
 from .permissions import IsAdminOrIfAuthenticatedReadOnly
+from .planner import connection_planner, tickets_available
+from .profiling import KINDS, ProfileStore
+from .search import station_search
+from .sparse import SparseQuerysetMixin
 
 
-class DefaultSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 1000
-
-
-class StationViewSet(viewsets.ModelViewSet):
+class StationViewSet(
+    SerializerMetricsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     pagination_class = DefaultSetPagination
+    response_models = (Station,)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return StationDetailSerializer
         return self.serializer_class
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "near",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Order stations by distance from latitude,longitude "
+                    "(ex. ?near=49.84,24.03)"
+                ),
+            ),
+            OpenApiParameter(
+                "radius_km",
+                type=OpenApiTypes.FLOAT,
+                description="With near: only stations within the radius",
+            ),
+            OpenApiParameter(
+                "k",
+                type=OpenApiTypes.INT,
+                description=(
+                    "With near: number of nearest stations (default 10 "
+                    "without radius_km)"
+                ),
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        if "near" in request.query_params:
+            return self.nearby(request)
+        return super().list(request, *args, **kwargs)
+
+    def nearby(self, request):
+        """Stations by haversine distance, served from the KD-tree"""
+        search = NearbyStationsSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        latitude, longitude = search.validated_data["near"]
+        k = search.validated_data.get("k")
 
-class RouteViewSet(viewsets.ModelViewSet):
+        if (radius_km := search.validated_data.get("radius_km")) is not None:
+            stations = station_geo_index.within(latitude, longitude, radius_km)
+            stations = stations[:k] if k else stations
+        else:
+            stations = station_geo_index.nearest(latitude, longitude, k or 10)
+
+        page = self.paginate_queryset(stations)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(stations)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type=OpenApiTypes.STR,
+                description="Part of station name (ex. ?q=lvi)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        """Stations matching q, served from the in-memory name index"""
+        term = request.query_params.get("q", "").strip()
+        if not term:
+            return Response([])
+        return Response(station_search.autocomplete(term))
+
+
+class RouteViewSet(
+    SerializerMetricsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    FastListMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Route.objects.all()
+    optional_select_related = ("source", "destination")
     serializer_class = RouteSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     pagination_class = DefaultSetPagination
-
-    def get_queryset(self):
-        if self.action in ("list", "retrieve"):
-            return self.queryset.select_related("source", "destination")
-        return self.queryset
+    response_models = (Route,)
 
 
-class CrewViewSet(viewsets.ModelViewSet):
+class CrewViewSet(
+    SerializerMetricsMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     pagination_class = DefaultSetPagination
+    response_models = (Crew,)
 
     def get_serializer_class(self):
         if self.action == "upload_image":
@@ -104,16 +201,19 @@ class CrewViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TrainViewSet(viewsets.ModelViewSet):
+class TrainViewSet(
+    SerializerMetricsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Train.objects.all()
+    optional_select_related = ("train_type",)
     serializer_class = TrainSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     pagination_class = DefaultSetPagination
-
-    def get_queryset(self):
-        if self.action in ("list", "retrieve"):
-            return self.queryset.select_related("train_type")
-        return self.queryset
+    response_models = (Train, TrainType)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -124,40 +224,56 @@ class TrainViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
 
-class TrainTypeViewSet(viewsets.ModelViewSet):
+class TrainTypeViewSet(
+    SerializerMetricsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet,
+):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     pagination_class = DefaultSetPagination
+    response_models = (TrainType,)
 
 
-class JourneyViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Journey.objects.select_related(
-            "route__source",
-            "route__destination",
-        )
-        .prefetch_related("crew")
-        .annotate(
-            tickets_available=(
-                F("train__carriage_num") * F("train__places_in_carriage")
-                - Count("tickets")
-            )
+class JourneyViewSet(
+    SerializerMetricsMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    KeysetPaginationMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Journey.objects.all()
+    optional_select_related = ("route__source", "route__destination", "train")
+    optional_prefetch_related = ("crew",)
+    optional_annotations = {
+        "tickets_available": (
+            F("train__carriage_num") * F("train__places_in_carriage")
+            - F("seats_taken")
         )
-    )
+    }
     serializer_class = JourneySerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     pagination_class = DefaultSetPagination
+    response_models = (Journey, Route, Station, Train, Crew)
 
     def get_queryset(self):
-        queryset = self.queryset
+        if self.action == "allocate":
+            return Journey.objects.select_related("train")
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = queryset.defer("occupancy")
         if source_station := self.request.query_params.get("source"):
             queryset = queryset.filter(
-                route__source__name__icontains=source_station
+                route__source_id__in=station_search.search(source_station)
             )
         if destination_station := self.request.query_params.get("destination"):
             queryset = queryset.filter(
-                route__destination__name__icontains=destination_station
+                route__destination_id__in=station_search.search(
+                    destination_station
+                )
             )
         if source_station_departure_date := self.request.query_params.get(
             "departure-date"
@@ -165,11 +281,23 @@ class JourneyViewSet(viewsets.ModelViewSet):
             source_station_departure_date = datetime.strptime(
                 source_station_departure_date, "%Y-%m-%d"
             ).date()
+            day_start, day_end = self.day_bounds(source_station_departure_date)
             queryset = queryset.filter(
-                departure_time__date=source_station_departure_date
+                departure_time__gte=day_start, departure_time__lt=day_end
             )
         return queryset
 
+    @staticmethod
+    def day_bounds(day):
+        """Half-open [start, end) datetime range of a day in the current
+        timezone, unlike __date it lets departure_time indexes be used"""
+        return (
+            timezone.make_aware(datetime.combine(day, time.min)),
+            timezone.make_aware(
+                datetime.combine(day + timedelta(days=1), time.min)
+            ),
+        )
+
     def get_serializer_class(self):
         if self.action == "list":
             return JourneyListSerializer
@@ -199,30 +327,124 @@ class JourneyViewSet(viewsets.ModelViewSet):
                     "Filter by departure-date (ex. ?departure-date=2023-10-21)"
                 ),
             ),
+            OpenApiParameter(
+                "pagination",
+                type=OpenApiTypes.STR,
+                enum=["cursor"],
+                description=(
+                    "Use keyset pagination with opaque next/previous "
+                    "cursors instead of page numbers (ex. ?pagination=cursor)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "taken_places",
+                type=OpenApiTypes.STR,
+                enum=["list", "bitmap", "ranges"],
+                description=(
+                    "Encoding of taken_places: a seat list, per carriage "
+                    "base64 bitmaps or per carriage [first, last] taken "
+                    "seat ranges (ex. ?taken_places=bitmap)"
+                ),
+            ),
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[ConnectionSearchSerializer],
+        responses=ItinerarySerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="connections")
+    def connections(self, request):
+        """Best trips between two stations, with up to max_changes
+        changes of at least min_transfer minutes each"""
+        search = ConnectionSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        itineraries = connection_planner.plan(
+            params["source"].id,
+            params["destination"].id,
+            params.get("departure") or timezone.now(),
+            min_transfer=timedelta(minutes=params["min_transfer"]),
+            max_changes=params["max_changes"],
+            limit=params["limit"],
+        )
+        serializer = ItinerarySerializer(
+            itineraries,
+            many=True,
+            context={
+                "request": request,
+                "tickets_available": tickets_available(
+                    {leg.journey_id for legs in itineraries for leg in legs}
+                ),
+            },
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[SeatAllocationSerializer],
+        responses=AllocatedSeatsSerializer,
+    )
+    @action(methods=["GET"], detail=True, url_path="allocate")
+    def allocate(self, request, pk=None):
+        """Free seats for a party of party_size, adjacent in one carriage
+        when possible, then in the fewest neighbouring carriages. Seats
+        held by other users are skipped; hold the result to book it"""
+        params = SeatAllocationSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        party_size = params.validated_data["party_size"]
+
+        journey = self.get_object()
+        seats = available_seat_map(journey, request.user.pk).allocate(
+            party_size
+        )
+        if not seats:
+            raise ValidationError(
+                {"party_size": [f"fewer than {party_size} seats are free"]}
+            )
+        carriages = {carriage for carriage, _ in seats}
+        serializer = AllocatedSeatsSerializer(
+            {
+                "journey": journey.id,
+                "seats": [
+                    {"carriage": carriage, "seat": seat}
+                    for carriage, seat in seats
+                ],
+                "adjacent": len(carriages) == 1
+                and seats[-1][1] - seats[0][1] == party_size - 1,
+            }
+        )
+        return Response(serializer.data)
+
 
 class OrderViewSet(
+    SerializerMetricsMixin,
+    KeysetPaginationMixin,
+    SparseQuerysetMixin,
     mixins.CreateModelMixin,
     mixins.UpdateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = (
-        Order.objects.prefetch_related("tickets")
-        .order_by("-created_at")
-        .annotate(total_tickets=Count("tickets"))
-    )
+    queryset = Order.objects.order_by("-created_at")
+    optional_prefetch_related = ("tickets",)
+    optional_annotations = {"total_tickets": Count("tickets")}
     serializer_class = OrderSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = DefaultSetPagination
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -236,6 +458,9 @@ class OrderViewSet(
 
 
 class TicketViewSet(
+    SerializerMetricsMixin,
+    FastListMixin,
+    KeysetPaginationMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -249,3 +474,122 @@ class TicketViewSet(
 
     def get_queryset(self):
         return self.queryset.filter(order__user=self.request.user)
+
+
+class SeatHoldViewSet(viewsets.ViewSet):
+    """Seats reserved for a while so they can't be sold to anyone else
+    until the hold is confirmed as an order, released or expires"""
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = SeatHoldSerializer
+    lookup_value_regex = r"[0-9a-f]{32}"
+
+    def get_hold(self, pk) -> dict:
+        hold = get_hold(pk)
+        if hold is None or hold["user_id"] != self.request.user.pk:
+            raise Http404
+        return hold
+
+    @extend_schema(responses={201: SeatHoldDetailSerializer})
+    def create(self, request):
+        serializer = self.serializer_class(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        hold = place_hold(
+            request.user.pk,
+            serializer.validated_data["journey"].id,
+            serializer.validated_data["seats"],
+        )
+        return Response(
+            SeatHoldDetailSerializer(hold).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(responses=SeatHoldDetailSerializer)
+    def retrieve(self, request, pk=None):
+        return Response(SeatHoldDetailSerializer(self.get_hold(pk)).data)
+
+    def destroy(self, request, pk=None):
+        release_hold(self.get_hold(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @extend_schema(request=None, responses={201: OrderSerializer})
+    @action(methods=["POST"], detail=True, url_path="confirm")
+    def confirm(self, request, pk=None):
+        """Order the held seats"""
+        hold = self.get_hold(pk)
+        serializer = OrderSerializer(
+            data={
+                "tickets": [
+                    {
+                        "journey": hold["journey"],
+                        "carriage": carriage,
+                        "seat": seat,
+                    }
+                    for carriage, seat in hold["seats"]
+                ]
+            },
+            context={"request": request},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        release_hold(hold)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """Request profiles recorded by ProfilingMiddleware"""
+
+    permission_classes = (IsAdminUser,)
+    serializer_class = ProfileSerializer
+    lookup_value_regex = r"[0-9]{8}T[0-9]{6}-[0-9a-f]{8}"
+
+    def get_profile(self, pk) -> dict:
+        profile = ProfileStore.from_settings().get(pk)
+        if profile is None:
+            raise Http404
+        return profile
+
+    def list(self, request):
+        serializer = self.serializer_class(
+            ProfileStore.from_settings().list(),
+            many=True,
+            context={"request": request},
+        )
+        return Response(serializer.data)
+
+    def retrieve(self, request, pk=None):
+        serializer = self.serializer_class(
+            self.get_profile(pk), context={"request": request}
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "kind",
+                type=OpenApiTypes.STR,
+                enum=[*KINDS],
+                description=(
+                    "prof: pstats dump, collapsed: collapsed stacks for "
+                    "flamegraphs, txt: summary (ex. ?kind=collapsed)"
+                ),
+            ),
+        ],
+        responses={(200, "application/octet-stream"): OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=True, url_path="download")
+    def download(self, request, pk=None):
+        """One file of a profile"""
+        profile = self.get_profile(pk)
+        kind = request.query_params.get("kind", "txt")
+        path = ProfileStore.from_settings().path(profile["id"], kind)
+        if kind not in KINDS or path is None:
+            raise Http404
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=f"{profile['id']}.{kind}",
+            content_type=KINDS[kind],
+        )
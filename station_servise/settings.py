@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -23,15 +24,18 @@ INSTALLED_APPS = [
     "rest_framework",
     "drf_spectacular",
     "django_extensions",
-    "debug_toolbar",
     "station_app.apps.StationAppConfig",
     "station_user.apps.StationUserConfig",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "station_app.compression.CompressionMiddleware",
+    "station_app.profiling.ProfilingMiddleware",
+    "station_app.metrics.MetricsMiddleware",
+    "station_app.instrumentation.SQLInstrumentationMiddleware",
+    "station_app.traffic.TrafficCaptureMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -101,11 +105,63 @@ MEDIA_ROOT = "/vol/app/media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Reference data (stations, routes, trains, train types) read-through
+# cache, any shared CACHES alias keeps several processes consistent
+STATION_APP_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+    "LRU_SIZE": 1024,
+}
+
+# Seats held while a booking is completed; holds are claimed with
+# cache.add, so several processes need a shared CACHES alias (Redis,
+# Memcached) for two holds on one seat to conflict
+STATION_APP_SEAT_HOLDS = {
+    "TTL": int(os.environ.get("SEAT_HOLD_TTL", 600)),
+    "MAX_SEATS": 10,
+    "MAX_SEATS_PER_JOURNEY": 10,
+    "MAX_SEATS_PER_USER": 30,
+    "USER_LOCK_WAIT": 2,
+}
+
+# Concurrent orders on the same journeys are booked in batches of one
+# transaction each, see station_app.booking and load_test_bookings
+STATION_APP_BOOKING_COORDINATOR = {
+    "ENABLED": os.environ.get("BOOKING_COORDINATOR") == "1",
+    "MAX_WAIT": 0.005,
+    "MAX_BATCH": 50,
+}
+
+# Journey, route and ticket lists can be serialized from values() rows
+# instead of model instances, with the same output (opt-in)
+STATION_APP_FAST_LIST = {
+    "ENABLED": os.environ.get("FAST_LIST") == "1",
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    # orjson when installed, same output as JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": (
+        "station_app.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    # station_app.compression.CompressionMiddleware, brotli needs the
+    # brotli package
+    "COMPRESSION": {
+        "MIN_SIZE": 1024,
+        "ENCODINGS": ("br", "gzip"),
+        "GZIP_LEVEL": 6,
+        "BROTLI_QUALITY": 4,
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -113,6 +169,7 @@ SPECTACULAR_SETTINGS = {
     "DESCRIPTION": "It is the best cinema API",
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
+    "GET_LIB_DOC_EXCLUDES": "station_app.schema.doc_excludes",
     "SWAGGER_UI_SETTINGS": {
         "deepLinking": True,
         "defaultModelRendering": "model",
@@ -127,13 +184,78 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
 }
 
+# Query count, DB time and N+1 patterns of sampled requests, reported
+# as Server-Timing headers and "station_app.instrumentation" log lines
+STATION_APP_INSTRUMENTATION = {
+    "SAMPLE_RATE": float(os.environ.get("SQL_SAMPLE_RATE", 1.0)),
+    "SLOW_REQUEST_MS": 500,
+    "DUPLICATE_THRESHOLD": 3,
+    "SERVER_TIMING": os.environ.get("SERVER_TIMING") == "1",
+}
+
+# Latency, DB time, serializer time and response size histograms per
+# viewset action, served in Prometheus text format on /metrics/
+STATION_APP_METRICS = {
+    "ENABLED": True,
+    "DIR": os.environ.get(
+        "METRICS_DIR",
+        os.path.join(tempfile.gettempdir(), "station_app_metrics"),
+    ),
+    "TOKEN": os.environ.get("METRICS_TOKEN"),
+    # METRICS_PUBLIC=1 opens /metrics/ without a token, local use only
+    "PUBLIC": os.environ.get("METRICS_PUBLIC") == "1",
+}
+
+# Admins profile single requests with the X-Profile header or the
+# _profile query parameter, profiles are listed on /profiles/
+STATION_APP_PROFILING = {
+    "DIR": os.environ.get(
+        "PROFILES_DIR",
+        os.path.join(tempfile.gettempdir(), "station_app_profiles"),
+    ),
+    "MAX_PROFILES": 50,
+    "MAX_BYTES": 50 * 1024 * 1024,
+}
+
+# Sampled API requests recorded for replay_traffic, headers are never
+# recorded and JSON bodies are redacted
+STATION_APP_TRAFFIC_CAPTURE = {
+    "ENABLED": os.environ.get("TRAFFIC_CAPTURE") == "1",
+    "PATH": BASE_DIR / "traffic" / "requests.jsonl",
+    "SAMPLE_RATE": float(os.environ.get("TRAFFIC_SAMPLE_RATE", 0.01)),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "station_app.instrumentation": {
+            "handlers": ["console"],
+            "level": os.environ.get("SQL_LOG_LEVEL", "WARNING"),
+        },
+    },
+}
+
+# debug_toolbar slows every request down, opt in with DEBUG_TOOLBAR=1
+DEBUG_TOOLBAR = DEBUG and os.environ.get("DEBUG_TOOLBAR") == "1"
+
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.common.CommonMiddleware"),
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
+
 INTERNAL_IPS = [
     "*",
 ]
 
 
 def show_toolbar(request):
-    return True
+    return DEBUG_TOOLBAR
 
 
 DEBUG_TOOLBAR_CONFIG = {
@@ -8,9 +8,10 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from station_app.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("__debug__/", include("debug_toolbar.urls")),
     path("api/care-express/", include("station_app.urls")),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -24,4 +25,8 @@ urlpatterns = [
         name="redoc",
     ),
     path("api/station-user/", include("station_user.urls")),
+    path("metrics/", metrics_view, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.DEBUG_TOOLBAR:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))